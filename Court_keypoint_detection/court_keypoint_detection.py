@@ -1,56 +1,227 @@
-from ultralytics import YOLO
 import sys
 sys.path.append('../')
-from utils import read_stub, save_stub
+from utils import read_stub, save_stub, iter_batches, skip_frames, StageCheckpoint
+from model_backends import load_detector
+from shot_detection import track_shots
+from .keypoint_propagation import KeypointFlowPropagator
 import numpy as np
 
+NUM_COURT_KEYPOINTS = 18
+
+
+def results_to_keypoints(results, num_keypoints=NUM_COURT_KEYPOINTS):
+    """
+    (len(results), K, 3) array of x, y, confidence of the best court detection
+    of each ultralytics result. The batch is stacked on the device and moved
+    to the host in a single transfer; frames without a court are all zeros.
+    """
+    import torch
+
+    rows = []
+    device = None
+    for result in results:
+        data = result.keypoints.data if result.keypoints is not None else None
+        if data is None or len(data) == 0:
+            rows.append(None)
+            continue
+        data = data[0]
+        if data.shape[-1] == 2:
+            # Model without keypoint confidences: every point counts as confident
+            data = torch.cat([data, data.new_ones((len(data), 1))], dim=1)
+        device = data.device
+        rows.append(data)
+
+    if device is None:
+        return np.zeros((len(rows), num_keypoints, 3), dtype=np.float32)
+    empty = torch.zeros((num_keypoints, 3), device=device)
+    return torch.stack([empty if row is None else row.float() for row in rows]).cpu().numpy()
+
+
+def empty_keypoints(num_keypoints=NUM_COURT_KEYPOINTS):
+    """
+    Keypoints of a frame without a court: all points undetected.
+    """
+    return np.zeros((num_keypoints, 3), dtype=np.float32)
+
+
+def keypoints_array(court_keypoints, num_keypoints=NUM_COURT_KEYPOINTS):
+    """
+    Stacks per-frame (K, 3) keypoints into one (frames, K, 3) float32 array.
+    """
+    return np.asarray(court_keypoints, dtype=np.float32).reshape(len(court_keypoints), num_keypoints, 3)
+
+
+def is_keypoints_array(court_keypoints, num_frames, num_keypoints=NUM_COURT_KEYPOINTS):
+    """
+    Whether a loaded stub holds the keypoints of `num_frames` frames in the
+    (frames, K, 3) array format. Stubs saved before it hold ultralytics
+    `Keypoints` objects and have to be recomputed.
+    """
+    if court_keypoints is None:
+        return False
+    if isinstance(court_keypoints, np.ndarray) and court_keypoints.shape == (num_frames, num_keypoints, 3):
+        return True
+    print("CourtKeypointDetector: court keypoint stub is not a (frames, "
+          f"{num_keypoints}, 3) array for {num_frames} frames (old format?), recomputing it")
+    return False
+
+
 class CourtKeypointDetector:
-    def __init__(self, model_path, conf_threshold=0.6):
+    def __init__(self, model_path, conf_threshold=0.6, keyframe_interval=1, max_residual=3.0,
+                 motion='homography'):
         """
         Initialize the CourtKeypointDetector with a YOLO model and confidence threshold.
+
+        With `keyframe_interval` N > 1 keypoints are only detected every N
+        frames and carried to the frames in between by optical flow (`motion`
+        being 'homography' or 'affine'); a frame is also detected as soon as
+        the flow residual exceeds `max_residual` pixels (None disables this).
         """
-        self.model = YOLO(model_path)
+        self.model_path = model_path
+        self._model = None
         self.conf_threshold = conf_threshold
         self.last_valid_keypoints = None  # Stores last valid keypoints for fallback
+        self.keyframe_interval = max(int(keyframe_interval), 1)
+        self.max_residual = max_residual
+        self.propagator = KeypointFlowPropagator(motion=motion)
+
+    @property
+    def model(self):
+        """
+        YOLO pose model, loaded on first use so cached runs never load it.
+        """
+        if self._model is None:
+            self._model = load_detector(self.model_path, task='pose')
+        return self._model
+
+    def filter_keypoints(self, keypoints):
+        """
+        Confidence filtering of a (frames, K, 3) x, y, confidence array of
+        consecutive frames. Points below the confidence threshold (or not
+        detected, at (0, 0)) take the last confident position of that point,
+        carried forward from `last_valid_keypoints`; this is one masked
+        selection for the whole batch. Returns a (frames, K, 3) array.
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float32)
+        if len(keypoints) == 0:
+            return keypoints
+
+        confident = (keypoints[..., 2] >= self.conf_threshold) & np.any(keypoints[..., :2] != 0, axis=2)
+        carried = self.last_valid_keypoints
+        if carried is None:
+            # Nothing to fall back to yet: the first frame is kept as detected
+            confident[0] = True
+            carried = np.zeros_like(keypoints[0])
+
+        # Frame of the last confident detection of every point (-1: none in this batch)
+        frame_index = np.arange(len(keypoints))[:, None]
+        last_confident = np.maximum.accumulate(np.where(confident, frame_index, -1), axis=0)
+        filtered = keypoints[np.maximum(last_confident, 0), np.arange(keypoints.shape[1])]
+        filtered = np.where((last_confident >= 0)[..., None], filtered, carried)
+
+        self.last_valid_keypoints = filtered[-1].copy()
+        return filtered
+
+    @property
+    def keyframe_mode(self):
+        return self.keyframe_interval > 1
+
+    def track_batch(self, frame_num, frames, detect):
+        """
+        Court keypoints of a batch of `frames` starting at video frame `frame_num`,
+        as a (frames, K, 3) array.
+
+        `detect(indices)` returns the raw (len(indices), K, 3) keypoints of
+        the given batch indices (see `results_to_keypoints`). In keyframe mode the scheduled keyframes of the batch are
+        detected together, the other frames are propagated from the last
+        keyframe, and a frame is detected on its own when propagation fails
+        or its residual exceeds `max_residual`.
+        """
+        if not self.keyframe_mode:
+            return self.filter_keypoints(detect(range(len(frames))))
+
+        scheduled = [i for i in range(len(frames)) if (frame_num + i) % self.keyframe_interval == 0]
+        keyframe_detections = dict(zip(scheduled, detect(scheduled))) if scheduled else {}
+
+        batch_keypoints = []
+        for i, frame in enumerate(frames):
+            detection = keyframe_detections.get(i)
+            keypoints = None
+            if detection is None and self.propagator.has_keyframe:
+                keypoints, residual = self.propagator.propagate(frame)
+                if self.max_residual is not None and residual > self.max_residual:
+                    keypoints = None
+
+            if keypoints is None:
+                if detection is None:
+                    detection = detect([i])[0]
+                keypoints = self.filter_keypoints(detection[None])[0]
+                self.propagator.reset(frame, keypoints)
+            else:
+                self.last_valid_keypoints = keypoints
+            batch_keypoints.append(keypoints)
+        return np.stack(batch_keypoints)
+
+    def get_tracking_state(self):
+        """
+        Temporal state to checkpoint (fallback keypoints and the keyframe propagator).
+        """
+        return self.last_valid_keypoints, self.propagator
+
+    def set_tracking_state(self, state):
+        """
+        Restores a state returned by `get_tracking_state`.
+        """
+        self.last_valid_keypoints, self.propagator = state
+
+    def reset_tracking_state(self):
+        """
+        Forgets the fallback keypoints and the keyframe (e.g. at a cut).
+        """
+        self.last_valid_keypoints = None
+        self.propagator.clear()
     
-    def get_court_keypoints(self, frames, read_from_stub=False, stub_path=None):
+    def get_court_keypoints(self, frames, read_from_stub=False, stub_path=None, batch_size=20,
+                            checkpoint_path=None, checkpoint_every=500, shots=None):
         """
-        Detect court keypoints for a list of frames.
+        Detect court keypoints for a list (or any iterable) of frames, consumed
+        one batch at a time, as a (frames, K, 3) array of x, y, confidence.
+        With `checkpoint_path`, progress and the fallback keypoints are
+        checkpointed so an interrupted run resumes from there.
+        In keyframe mode only keyframes are detected (see `track_batch`).
+        With `shots` (see shot_detection), non-court frames get zero keypoints
+        without running the model and no keypoints are carried across cuts.
         """
         court_keypoints = read_stub(read_from_stub, stub_path)
-        if court_keypoints is not None and len(court_keypoints) == len(frames):
+        if is_keypoints_array(court_keypoints, len(frames)):
             return court_keypoints
         
-        batch_size = 20
         court_keypoints = []
+        start_frame = 0
+        checkpoint = None
+        if checkpoint_path:
+            checkpoint = StageCheckpoint(checkpoint_path, every=checkpoint_every)
+            court_keypoints, state, start_frame = checkpoint.load()
+            if state is not None:
+                self.set_tracking_state(state)
         
-        for i in range(0, len(frames), batch_size):
-            detections_batch = self.model.predict(frames[i:i+batch_size], conf=self.conf_threshold)
-
-            for frame_idx, detection in enumerate(detections_batch, start=i):
-                kps = detection.keypoints
-                if hasattr(kps, 'confidence'):
-                    filtered_kps = []
-                    for idx, (point, conf) in enumerate(zip(kps.xy[0], kps.confidence)):
-                        if conf >= self.conf_threshold:
-                            filtered_kps.append(point.cpu().numpy())
-                        else:
-                            if self.last_valid_keypoints is not None and idx < len(self.last_valid_keypoints):
-                                filtered_kps.append(self.last_valid_keypoints[idx])
-                            else:
-                                filtered_kps.append(point.cpu().numpy())
-                    filtered_kps = np.array(filtered_kps)
-
-                    if np.all(filtered_kps == 0) and self.last_valid_keypoints is not None:
-                        filtered_kps = self.last_valid_keypoints
-
-                    court_keypoints.append(filtered_kps)
-                    self.last_valid_keypoints = filtered_kps
-
-                else:
-                    kp_array = kps.xy[0].cpu().numpy()
-                    court_keypoints.append(kp_array)
-                    self.last_valid_keypoints = kp_array
-
-        save_stub(stub_path, court_keypoints)
+        frame_num = start_frame
+        for batch in iter_batches(skip_frames(frames, start_frame), batch_size):
+            def track_run(begin, end):
+                def detect(indices):
+                    frames_to_detect = [batch[begin + i] for i in indices]
+                    return results_to_keypoints(self.model.predict(frames_to_detect, conf=self.conf_threshold))
+                return self.track_batch(frame_num + begin, batch[begin:end], detect)
+
+            court_keypoints.extend(track_shots(shots, self, frame_num, len(batch), track_run, empty_keypoints))
+            frame_num += len(batch)
+
+            if checkpoint:
+                checkpoint.update(court_keypoints, self.get_tracking_state())
+
+        court_keypoints = keypoints_array(court_keypoints)
+        if stub_path:
+            save_stub(stub_path, court_keypoints)
+        if checkpoint:
+            checkpoint.clear()
         return court_keypoints
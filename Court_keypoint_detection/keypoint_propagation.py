@@ -0,0 +1,154 @@
+"""
+keypoint_propagation.py
+
+Propagation of court keypoints between keyframes with sparse optical flow.
+
+A broadcast camera mostly pans and zooms, so consecutive frames are related
+by one global homography and the 18 court keypoints move coherently. On a
+keyframe, corner features are picked on a downscaled grayscale frame; they
+are tracked frame to frame with pyramidal Lucas-Kanade flow (with a
+forward-backward check), and the keyframe-to-current motion is estimated
+robustly (RANSAC) from the surviving tracks and applied to the keyframe's
+keypoints. The median reprojection error of the tracks under that motion is
+the tracking residual: when it grows, or too few tracks survive (a cut,
+heavy occlusion), the frame should be detected again.
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+MOTION_MODELS = ("homography", "affine")
+# Fewest point pairs RANSAC needs to fit each motion model
+MIN_MOTION_POINTS = {"homography": 4, "affine": 3}
+
+
+class KeypointFlowPropagator:
+    """
+    Keyframe keypoints plus the feature tracks that carry them to later frames.
+    """
+
+    def __init__(self,
+                 motion: str = "homography",
+                 flow_width: int = 640,
+                 max_features: int = 400,
+                 min_features: int = 30,
+                 max_backtrack_error: float = 1.0):
+        """
+        `flow_width` is the width frames are downscaled to for flow, `min_features`
+        the number of surviving tracks below which propagation gives up, and
+        `max_backtrack_error` the forward-backward flow tolerance (flow pixels).
+        """
+        if motion not in MOTION_MODELS:
+            raise ValueError(f"Unknown motion model {motion!r}, expected one of {MOTION_MODELS}")
+        self.motion = motion
+        self.flow_width = flow_width
+        self.max_features = max_features
+        self.min_features = max(min_features, MIN_MOTION_POINTS[motion])
+        self.max_backtrack_error = max_backtrack_error
+
+        self.keypoints = None
+        self.scale = 1.0
+        self.previous_gray = None
+        self.anchor_points = None   # feature positions in the keyframe (flow pixels)
+        self.current_points = None  # the same features in the previous frame
+        self.num_keyframes = 0
+        self.num_propagated = 0
+
+    @property
+    def has_keyframe(self) -> bool:
+        return self.keypoints is not None
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self.scale = min(self.flow_width / gray.shape[1], 1.0)
+        if self.scale < 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self, frame: np.ndarray, keypoints: np.ndarray) -> None:
+        """
+        Starts a new keyframe from a frame and its detected (K, 2) or (K, 3)
+        keypoints (x, y and optionally confidence, which is carried along).
+        """
+        gray = self._gray(frame)
+        features = cv2.goodFeaturesToTrack(gray, self.max_features, qualityLevel=0.01, minDistance=8)
+        features = np.empty((0, 2), np.float32) if features is None else features.reshape(-1, 2)
+
+        self.keypoints = np.asarray(keypoints, dtype=np.float32).copy()
+        self.previous_gray = gray
+        self.anchor_points = features
+        self.current_points = features.copy()
+        self.num_keyframes += 1
+
+    def clear(self) -> None:
+        """
+        Forgets the keyframe, so the next frame has to be detected.
+        """
+        self.keypoints = None
+        self.previous_gray = self.anchor_points = self.current_points = None
+
+    def _track(self, gray: np.ndarray) -> np.ndarray:
+        """
+        Tracks the current features into `gray`; returns the mask of reliable tracks.
+        """
+        if len(self.current_points) == 0:
+            # Keyframe without features (fade to black, flat frame): LK returns None for no points
+            return np.zeros(0, dtype=bool)
+        lk_params = dict(winSize=(21, 21), maxLevel=3,
+                         criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01))
+        points = self.current_points.reshape(-1, 1, 2)
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(self.previous_gray, gray, points, None, **lk_params)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.previous_gray, forward, None, **lk_params)
+
+        backtrack_error = np.linalg.norm((backward - points).reshape(-1, 2), axis=1)
+        reliable = (status.ravel() == 1) & (back_status.ravel() == 1) & (backtrack_error < self.max_backtrack_error)
+        self.current_points = forward.reshape(-1, 2)
+        return reliable
+
+    def _estimate_motion(self, source: np.ndarray, target: np.ndarray) -> Optional[np.ndarray]:
+        """
+        3x3 keyframe-to-frame transform in flow pixels, or None if it cannot be estimated.
+        """
+        if self.motion == "homography":
+            matrix, _ = cv2.findHomography(source, target, cv2.RANSAC, 3.0)
+            return matrix
+        matrix, _ = cv2.estimateAffine2D(source, target, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+        return None if matrix is None else np.vstack([matrix, [0.0, 0.0, 1.0]])
+
+    def propagate(self, frame: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Moves the keyframe keypoints into `frame`.
+
+        Returns (keypoints, residual): the residual is the median reprojection
+        error of the feature tracks in frame pixels, and is infinite (with no
+        keypoints) when the motion could not be estimated.
+        """
+        gray = self._gray(frame)
+        # Too few features left to estimate the motion (e.g. a flat keyframe): re-detect
+        if len(self.current_points) < self.min_features:
+            return None, float("inf")
+        reliable = self._track(gray)
+        self.anchor_points = self.anchor_points[reliable]
+        self.current_points = self.current_points[reliable]
+        self.previous_gray = gray
+        if len(self.current_points) < self.min_features:
+            return None, float("inf")
+
+        matrix = self._estimate_motion(self.anchor_points, self.current_points)
+        if matrix is None:
+            return None, float("inf")
+
+        projected = cv2.perspectiveTransform(self.anchor_points.reshape(-1, 1, 2), matrix).reshape(-1, 2)
+        residual = float(np.median(np.linalg.norm(projected - self.current_points, axis=1))) / self.scale
+
+        # The transform lives in flow pixels: scale keypoints in and out of it
+        detected = np.all(self.keypoints[:, :2] > 0, axis=1)
+        keypoints = self.keypoints.copy()
+        keypoints[~detected] = 0
+        if detected.any():
+            points = (self.keypoints[detected, :2] * self.scale).reshape(-1, 1, 2)
+            keypoints[detected, :2] = cv2.perspectiveTransform(points, matrix).reshape(-1, 2) / self.scale
+        self.num_propagated += 1
+        return keypoints, residual
@@ -1,7 +1,9 @@
 import sys
 from collections import deque, Counter
+import numpy as np
 sys.path.append('../')
-from utils.bbox_utils import measure_distance, get_center_of_bbox
+from utils.bbox_utils import measure_distance
+from utils.track_store import TrackStore
 
 class BallAquisitionDetector:
     def __init__(self):
@@ -104,10 +106,99 @@ class BallAquisitionDetector:
 
         return -1
 
+    def min_distances_to_ball(self, player_bboxes, ball_centers):
+        """
+        Vectorized `find_minimum_distance_to_ball` for (N, 4) player bboxes and
+        the (N, 2) ball centers they are compared with.
+        """
+        ball_center_x, ball_center_y = ball_centers.T
+        x1, y1, x2, y2 = player_bboxes.T
+        width = x2 - x1
+        height = y2 - y1
+
+        # Same key points as get_key_basketball_player_assignment_points; the
+        # alignment points only exist when the ball is inside the bbox span
+        half_w = np.floor_divide(width, 2)
+        half_h = np.floor_divide(height, 2)
+        cx = x1 + half_w
+        nan = np.full_like(x1, np.nan)
+        vertical = (y1 < ball_center_y) & (ball_center_y < y2)
+        horizontal = (x1 < ball_center_x) & (ball_center_x < x2)
+        points_x = np.stack([
+            np.where(vertical, x1, nan), np.where(vertical, x2, nan),
+            np.where(horizontal, ball_center_x, nan), np.where(horizontal, ball_center_x, nan),
+            cx, x2, x1, x2, x1, cx, x2, x1, cx, cx,
+        ], axis=1)
+        points_y = np.stack([
+            np.where(vertical, ball_center_y, nan), np.where(vertical, ball_center_y, nan),
+            np.where(horizontal, y1, nan), np.where(horizontal, y2, nan),
+            y1, y1, y1, y1 + half_h, y1 + half_h, y1 + half_h, y2, y2, y2, y1 + np.floor_divide(height, 3),
+        ], axis=1)
+        return np.nanmin(np.hypot(points_x - ball_center_x[:, None], points_y - ball_center_y[:, None]), axis=1)
+
+    def find_best_candidates(self, player_tracks, ball_tracks):
+        """
+        Best possession candidate of every frame at once (-1 when nobody
+        qualifies), same rules as `find_best_candidate_for_possession`.
+
+        Returns (candidates, has_ball) arrays of length len(ball_tracks).
+        """
+        num_frames = len(ball_tracks)
+        ball_bboxes = np.full((num_frames, 4), np.nan)
+        for frame_num, ball_frame in enumerate(ball_tracks):
+            bbox = ball_frame.get(1, {}).get('bbox')
+            if bbox:
+                ball_bboxes[frame_num] = bbox
+        has_ball = ~np.isnan(ball_bboxes[:, 0])
+        candidates = np.full(num_frames, -1, dtype=np.int64)
+
+        # Player rows of frames that have a ball
+        frames = player_tracks.frames
+        rows = np.flatnonzero((frames < num_frames) & has_ball[np.minimum(frames, num_frames - 1)])
+        if len(rows) == 0:
+            return candidates, has_ball
+        frames = frames[rows]
+        player_ids = player_tracks.track_ids[rows]
+        player_bboxes = player_tracks.bboxes[rows]
+        ball_bbox = ball_bboxes[frames]
+        # Integer centers, as get_center_of_bbox
+        ball_centers = np.trunc(np.stack([(ball_bbox[:, 0] + ball_bbox[:, 2]) / 2,
+                                          (ball_bbox[:, 1] + ball_bbox[:, 3]) / 2], axis=1))
+
+        # Containment ratio of the ball in each player bbox
+        inter_w = np.minimum(player_bboxes[:, 2], ball_bbox[:, 2]) - np.maximum(player_bboxes[:, 0], ball_bbox[:, 0])
+        inter_h = np.minimum(player_bboxes[:, 3], ball_bbox[:, 3]) - np.maximum(player_bboxes[:, 1], ball_bbox[:, 1])
+        ball_area = (ball_bbox[:, 2] - ball_bbox[:, 0]) * (ball_bbox[:, 3] - ball_bbox[:, 1])
+        containment = np.where((inter_w >= 0) & (inter_h >= 0), inter_w * inter_h, 0.0) / ball_area
+        min_dist = self.min_distances_to_ball(player_bboxes, ball_centers)
+
+        # Closest player within threshold (stable sort keeps the first of ties)
+        order = np.lexsort((min_dist, frames))
+        first = order[np.r_[True, frames[order][1:] != frames[order][:-1]]]
+        within = min_dist[first] < self.possession_threshold
+        candidates[frames[first[within]]] = player_ids[first[within]]
+
+        # High containment overrides: player with max distance among them (prefer containment)
+        high = containment > self.containment_threshold
+        if high.any():
+            high_rows = np.flatnonzero(high)
+            order = high_rows[np.lexsort((-min_dist[high_rows], frames[high_rows]))]
+            first = order[np.r_[True, frames[order][1:] != frames[order][:-1]]]
+            candidates[frames[first]] = player_ids[first]
+
+        return candidates, has_ball
+
     def detect_ball_possession(self, player_tracks, ball_tracks):
         """
         Detect which player has possession of the ball over frames.
+
+        `player_tracks` may be per-frame dicts or a TrackStore; candidates of
+        all frames are scored at once with array operations.
         """
+        player_tracks = TrackStore.from_tracks(player_tracks)
+        best_candidates, has_ball = self.find_best_candidates(player_tracks, ball_tracks)
+        best_candidates = best_candidates.tolist()
+        has_ball = has_ball.tolist()
         num_frames = len(ball_tracks)
         possession_list = [-1] * num_frames
         candidate_buffer = deque(maxlen=self.smoothing_window)
@@ -116,23 +207,13 @@ class BallAquisitionDetector:
         grace_counter = 0
 
         for frame_num in range(num_frames):
-            ball_info = ball_tracks[frame_num].get(1, {})
-            if not ball_info or not ball_info.get('bbox'):
+            if not has_ball[frame_num]:
                 if grace_counter < grace_period:
                     possession_list[frame_num] = last_valid_player
                     grace_counter += 1
                 continue
 
-            ball_bbox = ball_info['bbox']
-            ball_center = get_center_of_bbox(ball_bbox)
-
-            best_player_id = self.find_best_candidate_for_possession(
-                ball_center,
-                player_tracks[frame_num],
-                ball_bbox
-            )
-
-            candidate_buffer.append(best_player_id)
+            candidate_buffer.append(best_candidates[frame_num])
 
             if len(candidate_buffer) == self.smoothing_window:
                 common_candidate, count = Counter(candidate_buffer).most_common(1)[0]
@@ -0,0 +1,100 @@
+"""
+backend_report.py
+
+Throughput / accuracy comparison of the inference backends.
+
+Runs each YOLO model (player, ball, court keypoints) with every requested
+backend on the same frames and reports throughput in frames per second and
+the agreement with the PyTorch reference: box recall / precision / mean IoU
+for the detectors, mean keypoint error in pixels for the court model.
+
+Usage:
+    python benchmarks/backend_report.py input_videos/video_1.mp4 --backends torch onnx onnx-int8
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import stream_video, iter_batches
+from model_backends import BACKENDS, backend_model_path, load_detector
+from configs import PLAYER_DETECTOR_PATH, BALL_DETECTOR_PATH, COURT_KEYPOINT_DETECTOR_PATH
+from keyframe_report import compare_tracks
+
+MODELS = [
+    ('player', PLAYER_DETECTOR_PATH, 'detect'),
+    ('ball', BALL_DETECTOR_PATH, 'detect'),
+    ('court', COURT_KEYPOINT_DETECTOR_PATH, 'pose'),
+]
+
+
+def run_model(model, frames, task, conf, batch_size):
+    """
+    Returns (per-frame outputs, elapsed seconds). Outputs are box dicts in the
+    tracks format for detectors and (K, 2) keypoint arrays for pose models.
+    """
+    outputs = []
+    start = time.perf_counter()
+    for batch in iter_batches(frames, batch_size):
+        for result in model.predict(batch, conf=conf, verbose=False):
+            if task == 'pose':
+                xy = result.keypoints.xy.cpu().numpy()
+                outputs.append(xy[0] if len(xy) else None)
+            else:
+                boxes = result.boxes.xyxy.cpu().numpy().tolist()
+                outputs.append({i: {'bbox': bbox} for i, bbox in enumerate(boxes)})
+    return outputs, time.perf_counter() - start
+
+
+def keypoint_error(reference, candidate):
+    """
+    Mean pixel distance between keypoints of frames where both models found the court.
+    """
+    errors = [
+        np.linalg.norm(ref - cand, axis=1).mean()
+        for ref, cand in zip(reference, candidate)
+        if ref is not None and cand is not None and ref.shape == cand.shape
+    ]
+    return float(np.mean(errors)) if errors else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inference backend throughput / accuracy report')
+    parser.add_argument('input_video', type=str, help='Path to input video file')
+    parser.add_argument('--backends', type=str, nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--num_frames', type=int, default=200, help='Number of frames to run on')
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--conf', type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(stream_video(args.input_video), args.num_frames))
+
+    print(f"{'model':<8}{'backend':<12}{'fps':>8}{'speedup':>9}  accuracy vs torch")
+    for name, model_path, task in MODELS:
+        reference, reference_time = None, None
+        for backend in ['torch'] + [b for b in args.backends if b != 'torch']:
+            model = load_detector(backend_model_path(model_path, backend), task=task)
+            # Warm-up (session creation, CUDA init)
+            model.predict(frames[:args.batch_size], conf=args.conf, verbose=False)
+            outputs, elapsed = run_model(model, frames, task, args.conf, args.batch_size)
+
+            if reference is None:
+                reference, reference_time = outputs, elapsed
+                accuracy = "reference"
+            elif task == 'pose':
+                accuracy = f"mean keypoint error {keypoint_error(reference, outputs):.2f}px"
+            else:
+                mean_iou, recall, precision = compare_tracks(reference, outputs)
+                accuracy = f"recall {recall:.1%}, precision {precision:.1%}, mean IoU {mean_iou:.3f}"
+
+            if backend in args.backends:
+                print(f"{name:<8}{backend:<12}{len(frames) / elapsed:>8.1f}{reference_time / elapsed:>8.2f}x  {accuracy}")
+
+
+if __name__ == '__main__':
+    main()
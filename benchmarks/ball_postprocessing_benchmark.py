@@ -0,0 +1,120 @@
+"""
+ball_postprocessing_benchmark.py
+
+Benchmark of the ball tracker's post-processing on synthetic tracks.
+
+Generates a long synthetic ball trajectory (random walk with outliers,
+missed frames and a few jumps) plus several candidate detections per frame,
+then times the per-frame Python reference against the array
+implementation and checks that both give identical results. Interpolation
+is timed on its own.
+
+Usage:
+    python benchmarks/ball_postprocessing_benchmark.py --num_frames 100000
+"""
+
+import os
+import sys
+import copy
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trackers import BallTracker
+from trackers.ball_postprocessing import best_detection_per_frame
+
+
+def reference_remove_wrong_detections(ball_positions, max_dist_per_frame=25):
+    """
+    Previous frame-by-frame implementation, kept as the reference.
+    """
+    last_good_frame_index = -1
+    for i in range(len(ball_positions)):
+        current_bbox = ball_positions[i].get(1, {}).get('bbox', [])
+        if not current_bbox:
+            continue
+        if last_good_frame_index == -1:
+            last_good_frame_index = i
+            continue
+        last_bbox = ball_positions[last_good_frame_index].get(1, {}).get('bbox', [])
+        frame_gap = i - last_good_frame_index
+        if np.linalg.norm(np.array(current_bbox[:2]) - np.array(last_bbox[:2])) > max_dist_per_frame * frame_gap:
+            ball_positions[i] = {}
+        else:
+            last_good_frame_index = i
+    return ball_positions
+
+
+def reference_select_balls(frame_indices, confidence, xyxy, num_frames):
+    """
+    Previous per-detection loop keeping the most confident ball of each frame.
+    """
+    tracks = [{} for _ in range(num_frames)]
+    max_confidence = np.zeros(num_frames)
+    for frame, conf, bbox in zip(frame_indices.tolist(), confidence.tolist(), xyxy.tolist()):
+        if conf > max_confidence[frame]:
+            max_confidence[frame] = conf
+            tracks[frame] = {1: {'bbox': bbox}}
+    return tracks
+
+
+def synthetic_ball_positions(num_frames, rng):
+    positions = np.cumsum(rng.normal(0, 8, (num_frames, 2)), axis=0) + 1000
+    outliers = rng.random(num_frames) < 0.02
+    positions[outliers] += rng.normal(0, 400, (outliers.sum(), 2))
+    for jump in rng.choice(num_frames, 5, replace=False):
+        positions[jump:] += rng.normal(0, 800, 2)
+    missed = rng.random(num_frames) < 0.25
+    return [{} if miss else {1: {'bbox': [x, y, x + 12.0, y + 12.0]}}
+            for miss, (x, y) in zip(missed, positions.tolist())]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ball post-processing benchmark')
+    parser.add_argument('--num_frames', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ball_tracker = BallTracker('unused.pt')  # the model is never loaded
+
+    # Candidate selection: 0-4 detections per frame
+    counts = rng.integers(0, 5, args.num_frames)
+    frame_indices = np.repeat(np.arange(args.num_frames), counts)
+    confidence = rng.random(len(frame_indices)).astype(np.float32)
+    xyxy = rng.random((len(frame_indices), 4)).astype(np.float32) * 1000
+
+    reference_tracks, reference_time = timed(reference_select_balls, frame_indices, confidence, xyxy, args.num_frames)
+    best, array_time = timed(best_detection_per_frame, frame_indices, confidence, args.num_frames)
+    tracks = [{1: {'bbox': xyxy[index].tolist()}} if index >= 0 else {} for index in best.tolist()]
+    assert tracks == reference_tracks, "candidate selection differs from the reference"
+    print(f"select balls      ({len(frame_indices)} detections): "
+          f"reference {reference_time * 1000:8.1f} ms, arrays {array_time * 1000:8.1f} ms "
+          f"({reference_time / array_time:.0f}x)")
+
+    # Outlier removal
+    ball_positions = synthetic_ball_positions(args.num_frames, rng)
+    reference, reference_time = timed(reference_remove_wrong_detections, copy.deepcopy(ball_positions))
+    result, array_time = timed(ball_tracker.remove_wrong_detections, copy.deepcopy(ball_positions))
+    assert result == reference, "outlier removal differs from the reference"
+    removed = sum(1 for before, after in zip(ball_positions, result) if before and not after)
+    print(f"remove wrong      ({removed} removed):     "
+          f"reference {reference_time * 1000:8.1f} ms, arrays {array_time * 1000:8.1f} ms "
+          f"({reference_time / array_time:.0f}x)")
+
+    # Interpolation (no pandas reference: pandas is no longer a dependency)
+    interpolated, array_time = timed(ball_tracker.interpolate_ball_positions, result, 60)
+    filled = sum(1 for before, after in zip(result, interpolated) if after and not before)
+    print(f"interpolate       ({filled} filled):    arrays {array_time * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
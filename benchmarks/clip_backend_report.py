@@ -0,0 +1,92 @@
+"""
+clip_backend_report.py
+
+Throughput / accuracy comparison of the team classifier backends.
+
+Collects player crops from the first frames of a video (player tracks from
+a stub, or from the player detector), embeds them with the PyTorch CLIP
+image encoder as the reference and with every requested ONNX backend, and
+reports throughput in crops per second (preprocessing included) and the
+agreement with the reference: fraction of crops given the same team and
+mean cosine similarity of the image embeddings.
+
+Usage:
+    python benchmarks/clip_backend_report.py input_videos/video_1.mp4 --backends onnx onnx-int8
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import stream_video
+from trackers import PlayerTracker
+from team_assigner import TeamAssigner, OnnxTeamAssigner
+from configs import PLAYER_DETECTOR_PATH
+
+
+def collect_crops(frames, player_tracks, num_crops):
+    """
+    Up to `num_crops` RGB player crops, in frame order.
+    """
+    crops = []
+    for frame, player_track in zip(frames, player_tracks):
+        for track in player_track.values():
+            crops.append(TeamAssigner.crop_player(frame, track['bbox']))
+        if len(crops) >= num_crops:
+            break
+    return crops[:num_crops]
+
+
+def run_backend(team_assigner, crops):
+    """
+    Returns (embeddings, teams, elapsed seconds) of the crops.
+    """
+    # Warm-up (model loading, session creation)
+    team_assigner.embed_crops(crops[:team_assigner.batch_size])
+    start = time.perf_counter()
+    embeddings = team_assigner.embed_crops(crops)
+    elapsed = time.perf_counter() - start
+    teams = (embeddings @ team_assigner.text_embeddings.T).argmax(axis=1) + 1
+    return embeddings, teams, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Team classifier backend throughput / accuracy report')
+    parser.add_argument('input_video', type=str, help='Path to input video file')
+    parser.add_argument('--backends', type=str, nargs='+', default=['onnx', 'onnx-int8'],
+                        choices=['onnx', 'onnx-int8'])
+    parser.add_argument('--player_tracks_stub', type=str, default='stubs/player_track_stubs.pkl',
+                        help='Player tracks stub (detected and saved there if missing)')
+    parser.add_argument('--num_frames', type=int, default=300, help='Number of frames to take crops from')
+    parser.add_argument('--num_crops', type=int, default=1000)
+    parser.add_argument('--batch_size', type=int, default=64)
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(stream_video(args.input_video), args.num_frames))
+    player_tracks = PlayerTracker(PLAYER_DETECTOR_PATH).get_object_tracks(frames, read_from_stub=True,
+                                                                         stub_path=args.player_tracks_stub)
+    crops = collect_crops(frames, player_tracks, args.num_crops)
+    if not crops:
+        print("No player crops found in the first frames")
+        return
+
+    reference, reference_teams, reference_time = run_backend(TeamAssigner(batch_size=args.batch_size), crops)
+    print(f"{len(crops)} crops, batch size {args.batch_size}")
+    print(f"{'backend':<12}{'crops/s':>9}{'speedup':>9}{'same team':>11}{'cosine':>9}")
+    print(f"{'torch':<12}{len(crops) / reference_time:>9.1f}{1.0:>8.2f}x{1.0:>11.1%}{1.0:>9.4f}")
+    for backend in args.backends:
+        embeddings, teams, elapsed = run_backend(OnnxTeamAssigner(backend=backend, batch_size=args.batch_size),
+                                                 crops)
+        agreement = np.mean(teams == reference_teams)
+        cosine = np.mean(np.sum(embeddings * reference, axis=1))
+        print(f"{backend:<12}{len(crops) / elapsed:>9.1f}{reference_time / elapsed:>8.2f}x"
+              f"{agreement:>11.1%}{cosine:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
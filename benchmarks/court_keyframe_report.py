@@ -0,0 +1,124 @@
+"""
+court_keyframe_report.py
+
+Accuracy-vs-speed report of the court keypoint detector's keyframe mode.
+
+Runs per-frame keypoint detection once as the reference, then keyframe mode
+for each requested interval, and reports wall time, the fraction of frames
+that were detected, the mean distance between propagated and detected
+keypoints, and how far the resulting homographies move points on the
+tactical view (a grid of image points projected with both homographies).
+
+Usage:
+    python benchmarks/court_keyframe_report.py input_videos/video_1.mp4 --intervals 5 10 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import stream_video
+from Court_keypoint_detection import CourtKeypointDetector
+from tactical_view import TacticalViewConverter
+from configs import COURT_KEYPOINT_DETECTOR_PATH
+
+
+def frame_homography(keypoints: np.ndarray, court_points: np.ndarray):
+    """
+    Image-to-tactical homography from the keypoints with positive coordinates,
+    or None with fewer than 4 of them.
+    """
+    keypoints = np.asarray(keypoints, dtype=np.float32)[:, :2]
+    valid = np.all(keypoints > 0, axis=1)
+    if valid.sum() < 4:
+        return None
+    homography, _ = cv2.findHomography(keypoints[valid], court_points[valid], cv2.RANSAC, 5.0)
+    return homography
+
+
+def compare_keypoints(reference, candidate, court_points, frame_shape, grid_size=5):
+    """
+    Returns (mean keypoint distance in pixels, mean tactical-view distance of a
+    grid of image points, fraction of reference homographies reproduced).
+    """
+    height, width = frame_shape[:2]
+    xs, ys = np.meshgrid(np.linspace(0.1, 0.9, grid_size) * width, np.linspace(0.4, 0.95, grid_size) * height)
+    grid = np.stack([xs.ravel(), ys.ravel()], axis=1).astype(np.float32).reshape(-1, 1, 2)
+
+    keypoint_errors, tactical_errors = [], []
+    num_reference = num_reproduced = 0
+    for reference_keypoints, candidate_keypoints in zip(reference, candidate):
+        reference_keypoints = np.asarray(reference_keypoints, dtype=np.float32)[:, :2]
+        candidate_keypoints = np.asarray(candidate_keypoints, dtype=np.float32)[:, :2]
+        both = np.all(reference_keypoints > 0, axis=1) & np.all(candidate_keypoints > 0, axis=1)
+        keypoint_errors.extend(np.linalg.norm(reference_keypoints[both] - candidate_keypoints[both], axis=1))
+
+        reference_h = frame_homography(reference_keypoints, court_points)
+        if reference_h is None:
+            continue
+        num_reference += 1
+        candidate_h = frame_homography(candidate_keypoints, court_points)
+        if candidate_h is None:
+            continue
+        num_reproduced += 1
+        reference_grid = cv2.perspectiveTransform(grid, reference_h).reshape(-1, 2)
+        candidate_grid = cv2.perspectiveTransform(grid, candidate_h).reshape(-1, 2)
+        tactical_errors.append(np.median(np.linalg.norm(reference_grid - candidate_grid, axis=1)))
+
+    mean_keypoint_error = float(np.mean(keypoint_errors)) if keypoint_errors else 0.0
+    mean_tactical_error = float(np.mean(tactical_errors)) if tactical_errors else 0.0
+    reproduced = num_reproduced / num_reference if num_reference else 1.0
+    return mean_keypoint_error, mean_tactical_error, reproduced
+
+
+def run_detector(frames, model_path, keyframe_interval, max_residual, motion, batch_size):
+    detector = CourtKeypointDetector(model_path, keyframe_interval=keyframe_interval,
+                                     max_residual=max_residual, motion=motion)
+    start = time.perf_counter()
+    keypoints = detector.get_court_keypoints(frames, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    keyframes = detector.propagator.num_keyframes if detector.keyframe_mode else len(frames)
+    return keypoints, elapsed, keyframes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Court keypoint keyframe mode accuracy-vs-speed report')
+    parser.add_argument('input_video', type=str, help='Path to input video file')
+    parser.add_argument('--model', type=str, default=COURT_KEYPOINT_DETECTOR_PATH, help='Court keypoint weights')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[5, 10, 20],
+                        help='Keyframe intervals to compare with full detection')
+    parser.add_argument('--max_residual', type=float, default=3.0,
+                        help='Re-detection threshold on the optical flow residual (pixels)')
+    parser.add_argument('--motion', type=str, default='homography', choices=['homography', 'affine'])
+    parser.add_argument('--max_frames', type=int, default=None, help='Only use the first N frames')
+    parser.add_argument('--batch_size', type=int, default=20)
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(stream_video(args.input_video), args.max_frames))
+    court_points = np.array(TacticalViewConverter(court_image_path=None).key_points, dtype=np.float32)
+
+    # Warm-up so model loading / CUDA init is not counted in the reference
+    CourtKeypointDetector(args.model).get_court_keypoints(frames[:args.batch_size], batch_size=args.batch_size)
+
+    reference, reference_time, _ = run_detector(frames, args.model, 1, None, args.motion, args.batch_size)
+
+    print(f"{'mode':<24}{'time (s)':>10}{'speedup':>9}{'detected':>10}{'kp err':>8}{'tactical err':>14}{'H kept':>8}")
+    print(f"{'full detection':<24}{reference_time:>10.2f}{1.0:>8.2f}x{1.0:>10.1%}{0.0:>8.2f}{0.0:>14.2f}{1.0:>8.1%}")
+    for interval in args.intervals:
+        keypoints, elapsed, keyframes = run_detector(frames, args.model, interval, args.max_residual,
+                                                     args.motion, args.batch_size)
+        keypoint_error, tactical_error, reproduced = compare_keypoints(reference, keypoints, court_points,
+                                                                       frames[0].shape)
+        mode = f"keyframe N={interval} r={args.max_residual}"
+        print(f"{mode:<24}{elapsed:>10.2f}{reference_time / elapsed:>8.2f}x{keyframes / len(frames):>10.1%}"
+              f"{keypoint_error:>8.2f}{tactical_error:>14.2f}{reproduced:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+import_time_guard.py
+
+Cold-start guard for fully cached runs.
+
+Imports `main` and constructs every stage the way `main.py` does (all team
+assigner backends included), in a fresh interpreter, then checks that no
+heavy inference module (ultralytics, torch, transformers, supervision,
+pandas, onnxruntime) was imported. That is the real guard; startup time is
+only checked against a generous budget relative to a bare interpreter start
+(`python -c pass`) on the same machine, so slow CI runners do not fail it.
+Exits with status 1 when either check fails, so it can run in CI.
+
+Usage:
+    python benchmarks/import_time_guard.py --budget 50 --repeat 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("ultralytics", "torch", "transformers", "supervision", "pandas", "onnxruntime")
+
+STARTUP_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import main
+from configs import PLAYER_DETECTOR_PATH, BALL_DETECTOR_PATH, COURT_KEYPOINT_DETECTOR_PATH
+player_tracker = main.PlayerTracker(PLAYER_DETECTOR_PATH)
+ball_tracker = main.BallTracker(BALL_DETECTOR_PATH)
+court_keypoint_detector = main.CourtKeypointDetector(COURT_KEYPOINT_DETECTOR_PATH)
+team_assigner = main.TeamAssigner()
+main.ColorTeamAssigner()
+main.OnnxTeamAssigner()
+main.SharedDetectionStage(player_tracker, ball_tracker, court_keypoint_detector)
+elapsed = time.perf_counter() - start
+heavy = [name for name in %r if name in sys.modules]
+print(json.dumps({"seconds": elapsed, "heavy_modules": heavy}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_startup():
+    """
+    Startup time and heavy modules imported, measured in a fresh interpreter.
+    """
+    output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_bare_startup():
+    """
+    Wall time of a bare interpreter start (`python -c pass`).
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start guard for fully cached runs')
+    parser.add_argument('--budget', type=float, default=50.0,
+                        help='Maximum startup time, in bare interpreter starts')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of fresh interpreters (best time is kept)')
+    args = parser.parse_args()
+
+    runs = [measure_startup() for _ in range(args.repeat)]
+    best = min(run["seconds"] for run in runs)
+    heavy = sorted({name for run in runs for name in run["heavy_modules"]})
+    budget = args.budget * min(measure_bare_startup() for _ in range(args.repeat))
+
+    print(f"Startup (import + stage construction): best {best:.3f}s over {args.repeat} runs, "
+          f"budget {budget:.3f}s ({args.budget:g} bare interpreter starts)")
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if best > budget:
+        print(f"FAIL: startup exceeds the budget by {best - budget:.3f}s")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
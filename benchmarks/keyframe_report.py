@@ -0,0 +1,108 @@
+"""
+keyframe_report.py
+
+Accuracy-vs-speed report of the player tracker's keyframe mode.
+
+Runs full per-frame detection once as the reference, then keyframe mode for
+each requested interval, and reports wall time, the fraction of frames that
+were detected and how well the propagated boxes match the reference boxes
+(greedy IoU matching per frame).
+
+Usage:
+    python benchmarks/keyframe_report.py input_videos/video_1.mp4 --intervals 2 3 5 10
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import stream_video
+from trackers import PlayerTracker
+from configs import PLAYER_DETECTOR_PATH
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU of (N, 4) and (M, 4) xyxy boxes.
+    """
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def compare_tracks(reference, candidate, iou_threshold=0.5):
+    """
+    Greedy per-frame IoU matching of candidate boxes against reference boxes.
+    Returns (mean IoU of matches, recall, precision).
+    """
+    ious = []
+    num_reference = num_candidate = 0
+    for reference_tracks, candidate_tracks in zip(reference, candidate):
+        reference_boxes = np.array([t['bbox'] for t in reference_tracks.values()]).reshape(-1, 4)
+        candidate_boxes = np.array([t['bbox'] for t in candidate_tracks.values()]).reshape(-1, 4)
+        num_reference += len(reference_boxes)
+        num_candidate += len(candidate_boxes)
+        if len(reference_boxes) == 0 or len(candidate_boxes) == 0:
+            continue
+
+        iou = box_iou(reference_boxes, candidate_boxes)
+        while iou.size and iou.max() >= iou_threshold:
+            row, col = np.unravel_index(iou.argmax(), iou.shape)
+            ious.append(iou[row, col])
+            iou[row, :] = -1
+            iou[:, col] = -1
+
+    mean_iou = float(np.mean(ious)) if ious else 0.0
+    recall = len(ious) / num_reference if num_reference else 1.0
+    precision = len(ious) / num_candidate if num_candidate else 1.0
+    return mean_iou, recall, precision
+
+
+def run_tracker(frames, model_path, keyframe_interval, max_uncertainty, batch_size):
+    tracker = PlayerTracker(model_path, keyframe_interval=keyframe_interval, max_uncertainty=max_uncertainty)
+    start = time.perf_counter()
+    tracks = tracker.get_object_tracks(frames, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    keyframes = tracker.propagator.num_keyframes if tracker.keyframe_mode else len(frames)
+    return tracks, elapsed, keyframes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keyframe mode accuracy-vs-speed report')
+    parser.add_argument('input_video', type=str, help='Path to input video file')
+    parser.add_argument('--model', type=str, default=PLAYER_DETECTOR_PATH, help='Player detector weights')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[2, 3, 5, 10],
+                        help='Keyframe intervals to compare with full detection')
+    parser.add_argument('--max_uncertainty', type=float, default=None,
+                        help='Adaptive re-detection threshold (fraction of box height)')
+    parser.add_argument('--max_frames', type=int, default=None, help='Only use the first N frames')
+    parser.add_argument('--batch_size', type=int, default=20)
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(stream_video(args.input_video), args.max_frames))
+
+    # Warm-up so model loading / CUDA init is not counted in the reference
+    PlayerTracker(args.model).get_object_tracks(frames[:args.batch_size], batch_size=args.batch_size)
+
+    reference, reference_time, _ = run_tracker(frames, args.model, 1, None, args.batch_size)
+
+    print(f"{'mode':<24}{'time (s)':>10}{'speedup':>9}{'detected':>10}{'mean IoU':>10}{'recall':>8}{'precision':>11}")
+    print(f"{'full detection':<24}{reference_time:>10.2f}{1.0:>8.2f}x{1.0:>10.1%}{1.0:>10.3f}{1.0:>8.1%}{1.0:>11.1%}")
+    for interval in args.intervals:
+        tracks, elapsed, keyframes = run_tracker(frames, args.model, interval, args.max_uncertainty, args.batch_size)
+        mean_iou, recall, precision = compare_tracks(reference, tracks)
+        mode = f"keyframe N={interval}" + (f" u={args.max_uncertainty}" if args.max_uncertainty is not None else "")
+        print(f"{mode:<24}{elapsed:>10.2f}{reference_time / elapsed:>8.2f}x{keyframes / len(frames):>10.1%}"
+              f"{mean_iou:>10.3f}{recall:>8.1%}{precision:>11.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+resume_check.py
+
+Checks that an interrupted, checkpointed player tracking run resumes with the
+same tracks and track IDs as an uninterrupted run.
+
+Three fresh interpreters run the player tracker on the same frames: the
+reference run, a run whose frame source fails after `--interrupt_at` frames
+(leaving its checkpoint log behind), and a run resuming from that log. Fresh
+interpreters matter: supervision releases with class-level track id counters
+start again from zero in a new process unless the checkpoint restores them.
+Exits with status 1 when the resumed tracks differ from the reference.
+
+Usage:
+    python benchmarks/resume_check.py input_videos/video_1.mp4 --num_frames 300 --interrupt_at 170
+"""
+
+import os
+import sys
+import pickle
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_SCRIPT = """
+import sys, pickle, itertools
+from utils import stream_video
+from trackers import PlayerTracker
+from configs import PLAYER_DETECTOR_PATH
+
+video_path, num_frames, interrupt_at, checkpoint_path, checkpoint_every, output_path = sys.argv[1:]
+frames = list(itertools.islice(stream_video(video_path), int(num_frames)))
+
+def interrupted(frames, stop):
+    for frame_num, frame in enumerate(frames):
+        if frame_num == stop:
+            raise KeyboardInterrupt
+        yield frame
+
+if int(interrupt_at) >= 0:
+    frames = interrupted(frames, int(interrupt_at))
+try:
+    tracks = PlayerTracker(PLAYER_DETECTOR_PATH).get_object_tracks(
+        frames, checkpoint_path=checkpoint_path or None, checkpoint_every=int(checkpoint_every))
+except KeyboardInterrupt:
+    sys.exit(0)
+with open(output_path, 'wb') as f:
+    pickle.dump(tracks, f)
+"""
+
+
+def run_tracker(video_path, num_frames, interrupt_at, checkpoint_path, checkpoint_every, output_path):
+    subprocess.run([sys.executable, "-c", RUN_SCRIPT, video_path, str(num_frames), str(interrupt_at),
+                    checkpoint_path, str(checkpoint_every), output_path], cwd=ROOT, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkpoint resume check of the player tracker')
+    parser.add_argument('input_video', type=str, help='Path to input video file')
+    parser.add_argument('--num_frames', type=int, default=300)
+    parser.add_argument('--interrupt_at', type=int, default=170, help='Frame at which the first run fails')
+    parser.add_argument('--checkpoint_every', type=int, default=40)
+    args = parser.parse_args()
+
+    video_path = os.path.abspath(args.input_video)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint_path = os.path.join(tmp_dir, 'player_tracks.ckpt')
+        reference_path = os.path.join(tmp_dir, 'reference.pkl')
+        resumed_path = os.path.join(tmp_dir, 'resumed.pkl')
+
+        run_tracker(video_path, args.num_frames, -1, '', args.checkpoint_every, reference_path)
+        run_tracker(video_path, args.num_frames, args.interrupt_at, checkpoint_path, args.checkpoint_every,
+                    resumed_path)
+        if not os.path.exists(checkpoint_path):
+            print("FAIL: the interrupted run left no checkpoint (interrupt later than --checkpoint_every)")
+            sys.exit(1)
+        run_tracker(video_path, args.num_frames, -1, checkpoint_path, args.checkpoint_every, resumed_path)
+
+        with open(reference_path, 'rb') as f:
+            reference = pickle.load(f)
+        with open(resumed_path, 'rb') as f:
+            resumed = pickle.load(f)
+
+    mismatches = [frame_num for frame_num, (ref, res) in enumerate(zip(reference, resumed)) if ref != res]
+    print(f"{len(reference)} frames, interrupted at frame {args.interrupt_at}, "
+          f"checkpoint every {args.checkpoint_every} frames")
+    if len(reference) != len(resumed) or mismatches:
+        first = mismatches[0] if mismatches else min(len(reference), len(resumed))
+        print(f"FAIL: resumed tracks differ from the reference on {len(mismatches)} frames (first: {first})")
+        sys.exit(1)
+    print("OK: resumed tracks and track ids match the uninterrupted run")
+
+
+if __name__ == '__main__':
+    main()
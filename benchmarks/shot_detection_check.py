@@ -0,0 +1,80 @@
+"""
+shot_detection_check.py
+
+Check of the shot detector on a synthetic broadcast.
+
+Builds a panning court view interrupted by a one-frame camera flash, a
+three-frame flash and a real crowd shot, runs `ShotDetector.detect_shots`
+and checks that only the two real cuts (into and out of the crowd shot) are
+found, and that the crowd shot is the only non-court shot. Flashes must not
+cut: a cut resets every stage's temporal state and gives players new ids.
+Exits with status 1 on failure.
+
+Usage:
+    python benchmarks/shot_detection_check.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shot_detection import ShotDetector
+
+HEIGHT, WIDTH = 360, 640
+FLASHES = [(30, 1), (60, 3)]  # (first frame, length)
+CROWD_SHOT = (90, 130)
+NUM_FRAMES = 170
+
+
+def court_frame(frame_num):
+    """
+    Stands (dark blue with red seats) above a wooden floor with painted lines,
+    panning right, with sensor noise.
+    """
+    frame = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    frame[:HEIGHT // 2] = (90, 40, 30)
+    frame[:HEIGHT // 2, (np.arange(WIDTH) + frame_num * 3) % 160 < 60] = (40, 40, 170)
+    frame[HEIGHT // 2:] = (70, 140, 200)
+    frame[HEIGHT // 2:, (np.arange(WIDTH) + frame_num * 3) % 160 < 4] = (255, 255, 255)
+    noise = np.random.default_rng(frame_num).normal(0, 12, frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def crowd_frame(frame_num):
+    """
+    Close-up of a crowd: noisy skin and shirt colors over the whole frame.
+    """
+    rng = np.random.default_rng(frame_num)
+    colors = np.array([(60, 110, 190), (40, 160, 60), (200, 60, 120), (30, 30, 30)], dtype=np.uint8)
+    blocks = colors[rng.integers(0, len(colors), size=(HEIGHT // 20, WIDTH // 20))]
+    return np.repeat(np.repeat(blocks, 20, axis=0), 20, axis=1)
+
+
+def synthetic_broadcast():
+    frames = []
+    for frame_num in range(NUM_FRAMES):
+        if CROWD_SHOT[0] <= frame_num < CROWD_SHOT[1]:
+            frames.append(crowd_frame(frame_num))
+        elif any(start <= frame_num < start + length for start, length in FLASHES):
+            frames.append(np.full((HEIGHT, WIDTH, 3), 250, dtype=np.uint8))
+        else:
+            frames.append(court_frame(frame_num))
+    return frames
+
+
+def main():
+    shots = ShotDetector().detect_shots(synthetic_broadcast())
+    cuts = shots.cuts.tolist()
+    non_court = sorted({int(shot_id) for shot_id in shots.shot_ids[~shots.is_court]})
+
+    print(f"cuts: {cuts} (expected {list(CROWD_SHOT)}), non-court shots: {non_court} (expected [1])")
+    if cuts != list(CROWD_SHOT) or non_court != [1]:
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1 @@
-from .configs import STUBS_DEFAULT_PATH,PLAYER_DETECTOR_PATH,BALL_DETECTOR_PATH,COURT_KEYPOINT_DETECTOR_PATH,OUTPUT_VIDEO_PATH
+from .configs import STUBS_DEFAULT_PATH,PLAYER_DETECTOR_PATH,BALL_DETECTOR_PATH,COURT_KEYPOINT_DETECTOR_PATH,OUTPUT_VIDEO_PATH,TEAM_CLIP_ENCODER_PATH,TEAM_TEXT_EMBEDDINGS_PATH
@@ -3,3 +3,5 @@ PLAYER_DETECTOR_PATH = 'models/player_detector.pt'
 BALL_DETECTOR_PATH = 'models/ball_detector_model.pt'
 COURT_KEYPOINT_DETECTOR_PATH = 'models/court_keypoint_detector.pt'
 OUTPUT_VIDEO_PATH = 'output_videos/output_video.mp4'
+TEAM_CLIP_ENCODER_PATH = 'models/fashion_clip_image_encoder.onnx'
+TEAM_TEXT_EMBEDDINGS_PATH = 'models/fashion_clip_text_embeddings.npz'
@@ -12,7 +12,12 @@ class BallTracksDrawer:
         """
         Draws ball pointers on each video frame based on tracking and possession info.
         """
-        output_video_frames = []
+        return list(self.draw_stream(video_frames, tracks, ball_aquisition))
+
+    def draw_stream(self, video_frames, tracks, ball_aquisition):
+        """
+        Same as `draw`, but yields annotated frames one at a time.
+        """
         for frame_num, frame in enumerate(video_frames):
             frame = frame.copy()
             ball_dict = tracks[frame_num]
@@ -29,5 +34,4 @@ class BallTracksDrawer:
 
                 frame = draw_triangle(frame, ball["bbox"], color)
 
-            output_video_frames.append(frame)
-        return output_video_frames
+            yield frame
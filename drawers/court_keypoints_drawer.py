@@ -1,4 +1,4 @@
-import supervision as sv
+import numpy as np
 
 
 class CourtKeypointsDrawer:
@@ -9,7 +9,10 @@ class CourtKeypointsDrawer:
     def __init__(self, keypoint_color: str = "#FF2C2C"):
         """
         Initialize the drawer with customizable color.
+        supervision is only imported here, when the drawer is actually used.
         """
+        import supervision as sv
+
         self.keypoint_color = keypoint_color
         self.vertex_annotator = sv.VertexAnnotator(
             color=sv.Color.from_hex(self.keypoint_color),
@@ -26,16 +29,24 @@ class CourtKeypointsDrawer:
         """
         Annotates keypoints on each frame.
         """
-        output_frames = []
+        return list(self.draw_stream(frames, court_keypoints))
+
+    def draw_stream(self, frames, court_keypoints):
+        """
+        Same as `draw`, but yields annotated frames one at a time.
+        """
+        import supervision as sv
 
         for index, frame in enumerate(frames):
             annotated_frame = frame.copy()
-            keypoints = court_keypoints[index]
-            keypoints_numpy=keypoints.cpu().numpy()
+            # Per-frame (K, 2) or (K, 3) x, y[, confidence] array
+            keypoints = np.asarray(court_keypoints[index], dtype=np.float32)
+            key_points = sv.KeyPoints(
+                xy=keypoints[None, :, :2],
+                confidence=keypoints[None, :, 2] if keypoints.shape[-1] > 2 else None
+            )
             # Annotate keypoints and optionally labels
-            annotated_frame = self.vertex_annotator.annotate(scene=annotated_frame, key_points=keypoints)
-            annotated_frame = self.vertex_label_annotator.annotate(scene=annotated_frame, key_points=keypoints_numpy)
-
-            output_frames.append(annotated_frame)
+            annotated_frame = self.vertex_annotator.annotate(scene=annotated_frame, key_points=key_points)
+            annotated_frame = self.vertex_label_annotator.annotate(scene=annotated_frame, key_points=key_points)
 
-        return output_frames
+            yield annotated_frame
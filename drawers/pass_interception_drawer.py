@@ -1,5 +1,5 @@
 import cv2
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 
 class PassInterceptionDrawer:
@@ -51,11 +51,19 @@ class PassInterceptionDrawer:
         """
         Draw pass and interception stats on each video frame.
         """
-        output_frames = []
+        return list(self.draw_stream(video_frames, passes, interceptions))
+
+    def draw_stream(
+        self,
+        video_frames: Iterable,
+        passes: List[int],
+        interceptions: List[int],
+    ) -> Iterator:
+        """
+        Same as `draw`, but yields annotated frames one at a time.
+        """
         for frame_num, frame in enumerate(video_frames):
-            frame_drawn = self.draw_frame(frame.copy(), frame_num, passes, interceptions)
-            output_frames.append(frame_drawn)
-        return output_frames
+            yield self.draw_frame(frame.copy(), frame_num, passes, interceptions)
 
     def draw_frame(
         self,
@@ -5,7 +5,7 @@ Draws tracked player positions on video frames using ellipses and highlights the
 """
 
 import cv2
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 from .utils import draw_ellipse, draw_triangle
 
 
@@ -32,8 +32,18 @@ class PlayerTracksDrawer:
         """
         Draws ellipses around tracked player positions and a triangle for the player in possession.
         """
-        output_video_frames = []
+        return list(self.draw_stream(video_frames, tracks, player_assignment, ball_aquisition))
 
+    def draw_stream(
+        self,
+        video_frames: Iterable[Any],
+        tracks: List[Dict[int, Dict[str, Any]]],
+        player_assignment: List[Dict[int, int]],
+        ball_aquisition: List[int]
+    ) -> Iterator[Any]:
+        """
+        Same as `draw`, but yields annotated frames one at a time.
+        """
         for frame_num, frame in enumerate(video_frames):
             frame_copy = frame.copy()
             player_dict = tracks[frame_num]
@@ -53,6 +63,4 @@ class PlayerTracksDrawer:
                 if bbox:
                     frame_copy = draw_ellipse(frame_copy, bbox, color=color)
 
-            output_video_frames.append(frame_copy)
-
-        return output_video_frames
+            yield frame_copy
@@ -1,8 +1,12 @@
 # tactical_view_drawer.py
 
 import cv2
+import sys
 import numpy as np
 
+sys.path.append("../")
+from utils.track_store import TrackStore
+
 class TacticalViewDrawer:
     def __init__(self, team_1_color=[255, 245, 238], team_2_color=[128, 0, 0]):
         print("[TacticalViewDrawer] Initialization")
@@ -41,38 +45,30 @@ class TacticalViewDrawer:
     def _interpolate_missing_positions(self, tactical_player_positions):
         """
         Linearly interpolate missing player positions frame-by-frame.
+
+        Each player track is interpolated over all frames with np.interp;
+        before its first / after its last appearance the nearest known
+        position is held.
         """
-        total_frames = len(tactical_player_positions)
-        player_tracks = {}
-
-        # Build player tracks from input frames
-        for f_idx, frame_dict in enumerate(tactical_player_positions):
-            if not frame_dict:
-                continue
-            for pid, pos in frame_dict.items():
-                if pid not in player_tracks:
-                    player_tracks[pid] = {}
-                player_tracks[pid][f_idx] = np.array(pos)
+        positions = tactical_player_positions
+        if not isinstance(positions, TrackStore):
+            positions = TrackStore.from_frame_dicts(positions)
 
+        total_frames = len(positions)
+        all_frames = np.arange(total_frames)
         interpolated_positions = [{} for _ in range(total_frames)]
 
-        for pid, frames in player_tracks.items():
-            sorted_frames = sorted(frames.keys())
-            for i in range(total_frames):
-                if i in frames:
-                    interpolated_positions[i][pid] = frames[i]
-                else:
-                    prev = next((j for j in reversed(range(0, i)) if j in frames), None)
-                    next_ = next((j for j in range(i + 1, total_frames) if j in frames), None)
-
-                    if prev is not None and next_ is not None:
-                        alpha = (i - prev) / (next_ - prev)
-                        interp_pos = (1 - alpha) * frames[prev] + alpha * frames[next_]
-                        interpolated_positions[i][pid] = interp_pos
-                    elif prev is not None:
-                        interpolated_positions[i][pid] = frames[prev]
-                    elif next_ is not None:
-                        interpolated_positions[i][pid] = frames[next_]
+        # Players in order of first appearance
+        tracks = sorted(positions.iter_tracks(), key=lambda track: track[1][0])
+        for pid, rows in tracks:
+            known_frames = positions.frames[rows]
+            known_positions = positions.values[rows]
+            track_positions = np.stack([
+                np.interp(all_frames, known_frames, known_positions[:, 0]),
+                np.interp(all_frames, known_frames, known_positions[:, 1]),
+            ], axis=1)
+            for i, pos in enumerate(track_positions):
+                interpolated_positions[i][pid] = pos
 
         return interpolated_positions
 
@@ -94,12 +90,19 @@ class TacticalViewDrawer:
         Returns:
             list: Video frames with tactical view overlay drawn.
         """
+        return list(self.draw_stream(video_frames, court_image_path, width, height, tactical_court_keypoints,
+                                     tactical_player_positions, player_assignment, ball_acquisition))
+
+    def draw_stream(self, video_frames, court_image_path, width, height, tactical_court_keypoints,
+                    tactical_player_positions=None, player_assignment=None, ball_acquisition=None):
+        """
+        Same as `draw`, but yields annotated frames one at a time.
+        """
         court_img = cv2.imread(court_image_path)
         if court_img is None:
             raise ValueError("Court image could not be loaded.")
 
         court_img = cv2.resize(court_img, (width, height))
-        output_frames = []
 
         if tactical_player_positions:
             tactical_player_positions = self._interpolate_missing_positions(tactical_player_positions)
@@ -197,6 +200,4 @@ class TacticalViewDrawer:
                     if pid == self.last_ball_holder:
                         cv2.circle(frame, (x, y), 12, (0, 0, 255), 2)  # Red circle for ball holder
 
-            output_frames.append(frame)
-
-        return output_frames
+            yield frame
@@ -26,15 +26,20 @@ class TeamBallControlDrawer:
         """
         Draw possession statistics on frames.
         """
+        return list(self.draw_stream(video_frames, player_assignment, ball_aquisition))
+
+    def draw_stream(self, video_frames, player_assignment, ball_aquisition):
+        """
+        Same as `draw`, but yields annotated frames one at a time.
+        """
         team_ball_control = self.get_team_ball_control(player_assignment, ball_aquisition)
-        output_frames = []
 
         for frame_num, frame in enumerate(video_frames):
+            # Frames from a memory-mapped frame cache are read-only
+            if not frame.flags.writeable:
+                frame = frame.copy()
             # Include first frame as well
-            frame_with_stats = self.draw_frame(frame, frame_num, team_ball_control)
-            output_frames.append(frame_with_stats)
-
-        return output_frames
+            yield self.draw_frame(frame, frame_num, team_ball_control)
 
     
 
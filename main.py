@@ -1,9 +1,14 @@
 import os
 import argparse
-from utils import read_video, save_video
-from trackers import PlayerTracker, BallTracker
-from team_assigner import TeamAssigner
+from utils import read_video, stream_video, save_video, get_video_properties, FrameCache, StageCache, TrackStore
+from utils.columnar_stubs import COLUMNAR_SUFFIX
+from utils.video_writer import FFMPEG_PRESETS
+from trackers import PlayerTracker, BallTracker, OnlineBallTracker
+from team_assigner import TeamAssigner, ColorTeamAssigner, OnnxTeamAssigner
 from Court_keypoint_detection import CourtKeypointDetector
+from shared_detection import SharedDetectionStage
+from shot_detection import ShotDetector
+from model_backends import BACKENDS, backend_model_path
 from ball_acquisition import BallAquisitionDetector
 from pass_interception_detector import PassAndInterceptionDetector
 from tactical_view import TacticalViewConverter
@@ -29,51 +34,251 @@ def parse_args():
                         help='Path to output video file')
     parser.add_argument('--stub_path', type=str, default=STUBS_DEFAULT_PATH,
                         help='Path to stub directory')
+    parser.add_argument('--stream', action='store_true',
+                        help='Decode frames lazily in batches instead of loading the whole video in memory')
+    parser.add_argument('--prefetch', type=int, default=0,
+                        help='With --stream, size of the background decode queue (0 decodes inline)')
+    parser.add_argument('--frame_cache', type=str, default=None,
+                        help='Directory of memory-mapped decoded frames; decodes once and reuses on later runs')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Content-addressed stub cache directory (keyed by video, weights, parameters and code); '
+                             'overrides --stub_path')
+    parser.add_argument('--cache_max_gb', type=float, default=5.0,
+                        help='Maximum size of --cache_dir before least recently used entries are evicted')
+    parser.add_argument('--stub_format', type=str, default='pkl', choices=['pkl', 'columnar'],
+                        help='On-disk format of stubs: pickle or memory-mapped columnar arrays')
+    parser.add_argument('--resume', action='store_true',
+                        help='Checkpoint stage progress next to the stubs and resume interrupted stages')
+    parser.add_argument('--separate_detection', action='store_true',
+                        help='Run the player, ball and court keypoint models in separate passes '
+                             'instead of one shared-preprocessing pass')
+    parser.add_argument('--shot_detection', action='store_true',
+                        help='Segment the video into shots first; frames of non-court shots (replays, crowd, '
+                             'close-ups) are skipped and tracking state is reset at every cut')
+    parser.add_argument('--keyframe_interval', type=int, default=1,
+                        help='Detect players every N frames and propagate boxes in between (1 detects every frame)')
+    parser.add_argument('--max_uncertainty', type=float, default=None,
+                        help='In keyframe mode, also detect when the expected box drift exceeds this fraction '
+                             'of the box height')
+    parser.add_argument('--court_keyframe_interval', type=int, default=1,
+                        help='Detect court keypoints every N frames and carry them in between with optical flow '
+                             '(1 detects every frame)')
+    parser.add_argument('--court_max_residual', type=float, default=3.0,
+                        help='In court keyframe mode, also detect when the optical flow residual exceeds this '
+                             'many pixels')
+    parser.add_argument('--ball_roi_redetection', action='store_true',
+                        help='Re-detect missed or low-confidence balls on native-resolution crops around the '
+                             'predicted ball (or on tiles of the frame)')
+    parser.add_argument('--online_ball_tracking', action='store_true',
+                        help='Track the ball frame by frame with a gated Kalman filter instead of whole-video '
+                             'outlier removal and interpolation')
+    parser.add_argument('--team_backend', type=str, default='clip',
+                        choices=['clip', 'clip-onnx', 'clip-onnx-int8', 'color'],
+                        help='Team classifier: CLIP on every crop (PyTorch, or its ONNX / INT8 ONNX image encoder '
+                             'exported by team_assigner/clip_onnx_export.py), or torso color clustering with CLIP '
+                             'only for ambiguous crops')
+    parser.add_argument('--team_workers', type=int, default=1,
+                        help='Processes assigning teams in parallel over frame ranges (needs --frame_cache)')
+    parser.add_argument('--team_track_voting', action='store_true',
+                        help='Classify each player track once from a few sampled crops instead of every '
+                             '50 frames')
+    parser.add_argument('--team_crops_per_track', type=int, default=5,
+                        help='With --team_track_voting, number of crops sampled per track for the vote')
+    parser.add_argument('--ball_max_gap', type=float, default=2.0,
+                        help='Longest gap (in seconds) the ball position is interpolated across; longer gaps, '
+                             'e.g. replays, stay empty')
+    parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS,
+                        help='Inference backend of the YOLO models: PyTorch weights, or their ONNX / INT8 ONNX '
+                             'exports (see model_backends/onnx_export.py)')
+    parser.add_argument('--encoder', type=str, default='opencv', choices=['opencv', 'ffmpeg'],
+                        help='Video encoder backend for the output video')
+    parser.add_argument('--preset', type=str, default='veryfast', choices=FFMPEG_PRESETS,
+                        help='Encoder preset for the ffmpeg backend, from fastest to smallest output')
     return parser.parse_args()
 
+def get_stub_paths(args, stage_cache, player_tracker, ball_tracker, court_keypoint_detector, team_assigner,
+                   shot_detector=None):
+    """
+    Returns the stub path of each stage: fixed names under --stub_path, or
+    content-addressed paths when a stage cache is used.
+    """
+    extension = COLUMNAR_SUFFIX if args.stub_format == 'columnar' else '.pkl'
+
+    if stage_cache is None:
+        return {
+            'player_tracks': os.path.join(args.stub_path, 'player_track_stubs' + extension),
+            # The online tracker's output is already gated: never mix it with BallTracker's
+            'ball_tracks': os.path.join(args.stub_path, ('online_ball_track_stubs' if args.online_ball_tracking
+                                                         else 'ball_track_stubs') + extension),
+            'court_keypoints': os.path.join(args.stub_path, 'court_key_points_stub' + extension),
+            'player_assignment': os.path.join(args.stub_path, 'player_assignment_stub' + extension),
+            'shots': os.path.join(args.stub_path, 'shots_stub' + extension),
+        }
+
+    keys = {}
+    # Detection stages depend on the shots they skip and restart at
+    keys['shots'] = None
+    if shot_detector is not None:
+        keys['shots'] = stage_cache.key('shots', args.input_video, None,
+                                        {'cut_threshold': shot_detector.cut_threshold,
+                                         'min_shot_length': shot_detector.min_shot_length,
+                                         'court_threshold': shot_detector.court_threshold},
+                                        code=shot_detector)
+    keys['player_tracks'] = stage_cache.key('player_tracks', args.input_video, player_tracker.model_path,
+                                            {'conf': player_tracker.conf,
+                                             'keyframe_interval': player_tracker.keyframe_interval,
+                                             'max_uncertainty': player_tracker.max_uncertainty,
+                                             'shots': keys['shots']},
+                                            code=player_tracker)
+    ball_params = {'tracker': type(ball_tracker).__name__,
+                   'conf': ball_tracker.conf,
+                   'roi_redetection': ball_tracker.roi_redetection,
+                   'low_confidence': ball_tracker.low_confidence,
+                   'roi_size': ball_tracker.roi_size,
+                   'shots': keys['shots']}
+    if isinstance(ball_tracker, OnlineBallTracker):
+        ball_params.update(gate=ball_tracker.gate,
+                           max_coast=ball_tracker.max_coast,
+                           init_confidence=ball_tracker.init_confidence,
+                           size_smoothing=ball_tracker.size_smoothing)
+    keys['ball_tracks'] = stage_cache.key('ball_tracks', args.input_video, ball_tracker.model_path,
+                                          ball_params, code=ball_tracker)
+    keys['court_keypoints'] = stage_cache.key('court_keypoints', args.input_video, court_keypoint_detector.model_path,
+                                              {'conf': court_keypoint_detector.conf_threshold,
+                                               'keyframe_interval': court_keypoint_detector.keyframe_interval,
+                                               'max_residual': court_keypoint_detector.max_residual,
+                                               'motion': court_keypoint_detector.propagator.motion,
+                                               'shots': keys['shots']},
+                                              code=court_keypoint_detector)
+    # Team assignment depends on the player tracks it classifies
+    keys['player_assignment'] = stage_cache.key('player_assignment', args.input_video,
+                                                getattr(team_assigner, 'encoder_path', None),
+                                                {'team_1': team_assigner.team_1_class_name,
+                                                 'team_2': team_assigner.team_2_class_name,
+                                                 'backend': type(team_assigner).__name__,
+                                                 'track_voting': team_assigner.track_voting,
+                                                 'crops_per_track': team_assigner.crops_per_track,
+                                                 'player_tracks': keys['player_tracks']},
+                                                code=team_assigner)
+    return {stage: stage_cache.stub_path(stage, key, extension) for stage, key in keys.items() if key is not None}
+
 def main():
     args = parse_args()
+    video_properties = get_video_properties(args.input_video)
     
-    # Read Video
-    video_frames = read_video(args.input_video)
+    # Read Video (streamed frames are re-decoded by each stage instead of kept in memory,
+    # cached frames are decoded once and memory-mapped by every stage)
+    if args.frame_cache:
+        video_frames = FrameCache(args.frame_cache).open(args.input_video, prefetch=args.prefetch)
+    elif args.stream:
+        video_frames = stream_video(args.input_video, prefetch=args.prefetch)
+    else:
+        video_frames = read_video(args.input_video)
     
     ## Initialize Tracker
-    player_tracker = PlayerTracker(PLAYER_DETECTOR_PATH)
-    ball_tracker = BallTracker(BALL_DETECTOR_PATH)
+    player_tracker = PlayerTracker(backend_model_path(PLAYER_DETECTOR_PATH, args.backend),
+                                   keyframe_interval=args.keyframe_interval,
+                                   max_uncertainty=args.max_uncertainty)
+    ball_tracker_class = OnlineBallTracker if args.online_ball_tracking else BallTracker
+    ball_tracker = ball_tracker_class(backend_model_path(BALL_DETECTOR_PATH, args.backend),
+                                      roi_redetection=args.ball_roi_redetection)
 
     ## Initialize Keypoint Detector
-    court_keypoint_detector = CourtKeypointDetector(COURT_KEYPOINT_DETECTOR_PATH)
+    court_keypoint_detector = CourtKeypointDetector(backend_model_path(COURT_KEYPOINT_DETECTOR_PATH, args.backend),
+                                                    keyframe_interval=args.court_keyframe_interval,
+                                                    max_residual=args.court_max_residual)
+
+    ## Initialize Team Assigner
+    team_options = dict(track_voting=args.team_track_voting,
+                        crops_per_track=args.team_crops_per_track,
+                        num_workers=args.team_workers)
+    if args.team_backend == 'color':
+        team_assigner = ColorTeamAssigner(**team_options)
+    elif args.team_backend.startswith('clip-'):
+        team_assigner = OnnxTeamAssigner(backend=args.team_backend[len('clip-'):], **team_options)
+    else:
+        team_assigner = TeamAssigner(**team_options)
+
+    shot_detector = ShotDetector() if args.shot_detection else None
+
+    # Resolve stub paths
+    stage_cache = None
+    if args.cache_dir:
+        stage_cache = StageCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3))
+    stub_paths = get_stub_paths(args, stage_cache, player_tracker, ball_tracker,
+                                court_keypoint_detector, team_assigner, shot_detector)
+    # Checkpoints live next to the stub they will become
+    checkpoint_paths = {}
+    if args.resume:
+        checkpoint_paths = {stage: path + '.ckpt' for stage, path in stub_paths.items()}
+
+    # Shot segmentation pre-pass: one cheap read of downscaled frames
+    shots = None
+    if shot_detector is not None:
+        shots = shot_detector.detect_shots(video_frames, read_from_stub=True, stub_path=stub_paths['shots'])
+        print(f"Shots: {shots.num_shots}, non-court frames: {int((~shots.is_court).sum())}/{len(shots)}")
 
     # Run Detectors
-    player_tracks = player_tracker.get_object_tracks(video_frames,
-                                       read_from_stub=True,
-                                       stub_path=os.path.join(args.stub_path, 'player_track_stubs.pkl')
-                                      )
-    
-    ball_tracks = ball_tracker.get_object_tracks(video_frames,
-                                                 read_from_stub=True,
-                                                 stub_path=os.path.join(args.stub_path, 'ball_track_stubs.pkl')
-                                                )
-    ## Run KeyPoint Extractor
-    court_keypoints_per_frame = court_keypoint_detector.get_court_keypoints(video_frames,
-                                                                    read_from_stub=True,
-                                                                    stub_path=os.path.join(args.stub_path, 'court_key_points_stub.pkl')
-                                                                    )
+    if args.separate_detection:
+        player_tracks = player_tracker.get_object_tracks(video_frames,
+                                           read_from_stub=True,
+                                           stub_path=stub_paths['player_tracks'],
+                                           checkpoint_path=checkpoint_paths.get('player_tracks'),
+                                           shots=shots
+                                          )
+        
+        ball_tracks = ball_tracker.get_object_tracks(video_frames,
+                                                     read_from_stub=True,
+                                                     stub_path=stub_paths['ball_tracks'],
+                                                     checkpoint_path=checkpoint_paths.get('ball_tracks'),
+                                                     shots=shots
+                                                    )
+        ## Run KeyPoint Extractor
+        court_keypoints_per_frame = court_keypoint_detector.get_court_keypoints(video_frames,
+                                                                        read_from_stub=True,
+                                                                        stub_path=stub_paths['court_keypoints'],
+                                                                        checkpoint_path=checkpoint_paths.get('court_keypoints'),
+                                                                        shots=shots
+                                                                        )
+    else:
+        # One sweep: each batch is read and preprocessed once for all three models
+        shared_detection_stage = SharedDetectionStage(player_tracker, ball_tracker, court_keypoint_detector)
+        shared_checkpoint_path = stub_paths['player_tracks'] + '.shared.ckpt' if args.resume else None
+        player_tracks, ball_tracks, court_keypoints_per_frame = shared_detection_stage.detect(
+            video_frames,
+            read_from_stub=True,
+            stub_paths=stub_paths,
+            checkpoint_path=shared_checkpoint_path,
+            shots=shots
+        )
 
-    # Remove Wrong Ball Detections
-    ball_tracks = ball_tracker.remove_wrong_detections(ball_tracks)
-    # Interpolate Ball Tracks
-    ball_tracks = ball_tracker.interpolate_ball_positions(ball_tracks)
+    # Array-backed player tracks for the downstream modules
+    player_tracks = TrackStore.from_tracks(player_tracks)
+
+    # The online tracker already gates outliers and bridges short gaps
+    if not args.online_ball_tracking:
+        # Remove Wrong Ball Detections
+        ball_tracks = ball_tracker.remove_wrong_detections(ball_tracks, shots=shots)
+        # Interpolate Ball Tracks (never across a cut)
+        ball_tracks = ball_tracker.interpolate_ball_positions(
+            ball_tracks,
+            max_gap=int(round(args.ball_max_gap * video_properties['fps'])),
+            shots=shots
+        )
    
 
     # Assign Player Teams
-    team_assigner = TeamAssigner()
     player_assignment = team_assigner.get_player_teams_across_frames(video_frames,
                                                                     player_tracks,
                                                                     read_from_stub=True,
-                                                                    stub_path=os.path.join(args.stub_path, 'player_assignment_stub.pkl')
+                                                                    stub_path=stub_paths['player_assignment'],
+                                                                    checkpoint_path=checkpoint_paths.get('player_assignment')
                                                                     )
 
+    # Keep the stub cache within its size budget
+    if stage_cache is not None:
+        stage_cache.evict()
+
     # Ball Acquisition
     ball_aquisition_detector = BallAquisitionDetector()
     ball_aquisition = ball_aquisition_detector.detect_ball_possession(player_tracks,ball_tracks)
@@ -109,24 +314,25 @@ def main():
     team_ball_control_drawer = TeamBallControlDrawer()
     # Optional drawers removed for minimal run
 
+    # Drawers are chained lazily so each frame is drawn and written before the next one is decoded
     ## Draw object Tracks
-    output_video_frames = player_tracks_drawer.draw(video_frames, 
-                                                    player_tracks,
-                                                    player_assignment,
-                                                    ball_aquisition)
-    output_video_frames = ball_tracks_drawer.draw(output_video_frames, ball_tracks)
+    output_video_frames = player_tracks_drawer.draw_stream(video_frames, 
+                                                           player_tracks,
+                                                           player_assignment,
+                                                           ball_aquisition)
+    output_video_frames = ball_tracks_drawer.draw_stream(output_video_frames, ball_tracks, ball_aquisition)
 
     ## Draw KeyPoints
     # Optional: draw court keypoints if present
-    # output_video_frames = court_keypoint_drawer.draw(output_video_frames, court_keypoints_per_frame)
+    # output_video_frames = court_keypoint_drawer.draw_stream(output_video_frames, court_keypoints_per_frame)
 
     ## Draw Frame Number
     # Skip frame number overlay in minimal run
 
     # Draw Team Ball Control
-    output_video_frames = team_ball_control_drawer.draw(output_video_frames,
-                                                        player_assignment,
-                                                        ball_aquisition)
+    output_video_frames = team_ball_control_drawer.draw_stream(output_video_frames,
+                                                               player_assignment,
+                                                               ball_aquisition)
 
     # Draw Passes and Interceptions
     # Skip pass/interception overlay in minimal run
@@ -137,8 +343,19 @@ def main():
     ## Draw Tactical View
     # Skip tactical view overlay in minimal run
 
-    # Save video
-    save_video(output_video_frames, args.output_video)
+    # Save video at the input frame rate
+    encoder_options = {'preset': args.preset} if args.encoder == 'ffmpeg' else {}
+    save_video(output_video_frames, args.output_video,
+               fps=video_properties['fps'],
+               backend=args.encoder,
+               **encoder_options)
+
+    # Report decode metrics of the last pass (the drawing pass)
+    if args.stream and not args.frame_cache and video_frames.last_reader is not None:
+        metrics = video_frames.last_reader.metrics()
+        print(f"Decode: {metrics['decode_fps']:.1f} fps, "
+              f"mean queue depth {metrics['mean_queue_depth']:.1f}/{metrics['queue_size']}, "
+              f"consumer waited {metrics['consumer_wait_time']:.2f}s")
 
 if __name__ == '__main__':
     main()
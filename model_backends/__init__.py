@@ -0,0 +1 @@
+from .model_backends import BACKENDS, backend_model_path, load_detector
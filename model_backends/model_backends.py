@@ -0,0 +1,44 @@
+"""
+model_backends.py
+
+Backend-agnostic loading of the YOLO models.
+
+The stages only rely on ultralytics' `predict` API returning `Results`, and
+ultralytics runs both PyTorch weights (`.pt`) and ONNX graphs (`.onnx`,
+through ONNX Runtime) behind it. A backend is therefore a choice of weight
+file: `torch` uses the configured `.pt`, `onnx` the exported `.onnx` next to
+it and `onnx-int8` the statically quantized `.int8.onnx` (see onnx_export.py).
+
+Models are loaded lazily by the stages (see their `model` properties), so a
+run whose stubs are all cached never imports ultralytics or torch.
+"""
+
+import os
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+BACKEND_SUFFIXES = {"onnx": ".onnx", "onnx-int8": ".int8.onnx"}
+
+
+def backend_model_path(model_path: str, backend: str = "torch") -> str:
+    """
+    Weight file of `model_path` (a `.pt` path from configs) for `backend`.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if backend == "torch":
+        return model_path
+    return os.path.splitext(model_path)[0] + BACKEND_SUFFIXES[backend]
+
+
+def load_detector(model_path: str, task: str = None):
+    """
+    Loads a model from `.pt` or `.onnx` weights; all backends expose the same
+    `predict` API. `task` ('detect' or 'pose') avoids guessing it for ONNX files.
+    ultralytics is only imported here, when a model is actually needed.
+    """
+    from ultralytics import YOLO
+
+    if model_path.endswith(".onnx") and not os.path.exists(model_path):
+        raise FileNotFoundError(f"{model_path} not found, export it first with "
+                                f"`python -m model_backends.onnx_export`")
+    return YOLO(model_path, task=task)
@@ -0,0 +1,149 @@
+"""
+onnx_export.py
+
+Export of the YOLO models to ONNX and static INT8 quantization.
+
+Quantization is calibrated on frames sampled evenly from our own game videos,
+preprocessed exactly like at inference time (letterbox, RGB, [0, 1]). The
+quantized graph keeps the ultralytics metadata (class names, task, stride) of
+the float graph so it loads and predicts the same way.
+
+Usage:
+    python -m model_backends.onnx_export --calibration_videos input_videos/*.mp4
+"""
+
+import os
+import sys
+import glob
+import argparse
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.letterbox import letterbox_frames, to_nchw_rgb
+from configs import PLAYER_DETECTOR_PATH, BALL_DETECTOR_PATH, COURT_KEYPOINT_DETECTOR_PATH
+from .model_backends import backend_model_path
+
+
+def sample_calibration_frames(video_paths: List[str], num_frames: int = 256) -> List[np.ndarray]:
+    """
+    Frames sampled evenly across the given videos.
+    """
+    frames = []
+    per_video = max(num_frames // max(len(video_paths), 1), 1)
+    for video_path in video_paths:
+        cap = cv2.VideoCapture(video_path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(total - 1, 0), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    return frames
+
+
+class FrameCalibrationReader:
+    """
+    ONNX Runtime calibration data reader over preprocessed video frames.
+    """
+
+    def __init__(self, frames: List[np.ndarray], input_name: str, imgsz: int = 640, batch_size: int = 8):
+        self.frames = frames
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self._next = 0
+
+    def get_next(self) -> Optional[dict]:
+        if self._next >= len(self.frames):
+            return None
+        batch, _, _ = letterbox_frames(self.frames[self._next:self._next + self.batch_size], self.imgsz)
+        self._next += self.batch_size
+        return {self.input_name: to_nchw_rgb(batch).astype(np.float32) / 255.0}
+
+    def rewind(self) -> None:
+        self._next = 0
+
+
+def export_onnx(model_path: str, imgsz: int = 640) -> str:
+    """
+    Exports `.pt` weights to an ONNX graph with a dynamic batch next to them.
+    """
+    from ultralytics import YOLO
+    return YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+
+
+def quantize_int8(onnx_path: str,
+                  calibration_frames: List[np.ndarray],
+                  output_path: Optional[str] = None,
+                  imgsz: int = 640,
+                  per_channel: bool = True) -> str:
+    """
+    Statically quantizes an ONNX graph to INT8 (QDQ format, per-channel
+    weights) using `calibration_frames` to calibrate activation ranges.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if output_path is None:
+        output_path = os.path.splitext(onnx_path)[0] + ".int8.onnx"
+
+    float_model = onnx.load(onnx_path)
+    reader = FrameCalibrationReader(calibration_frames, float_model.graph.input[0].name, imgsz)
+
+    preprocessed_path = os.path.splitext(output_path)[0] + ".pre.onnx"
+    quant_pre_process(onnx_path, preprocessed_path)
+    try:
+        quantize_static(preprocessed_path, output_path, reader,
+                        quant_format=QuantFormat.QDQ,
+                        per_channel=per_channel,
+                        activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8)
+    finally:
+        os.remove(preprocessed_path)
+
+    # Keep the ultralytics metadata so the quantized graph loads like the float one
+    quantized_model = onnx.load(output_path)
+    del quantized_model.metadata_props[:]
+    quantized_model.metadata_props.extend(float_model.metadata_props)
+    onnx.save(quantized_model, output_path)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the YOLO models to ONNX (and INT8)')
+    parser.add_argument('--models', type=str, nargs='+',
+                        default=[PLAYER_DETECTOR_PATH, BALL_DETECTOR_PATH, COURT_KEYPOINT_DETECTOR_PATH],
+                        help='PyTorch weights to export')
+    parser.add_argument('--calibration_videos', type=str, nargs='+', default=None,
+                        help='Videos to sample calibration frames from (default: input_videos/*.mp4)')
+    parser.add_argument('--num_calibration_frames', type=int, default=256)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--no_int8', action='store_true', help='Only export float ONNX graphs')
+    args = parser.parse_args()
+
+    calibration_frames = None
+    if not args.no_int8:
+        video_paths = args.calibration_videos or sorted(glob.glob('input_videos/*.mp4'))
+        calibration_frames = sample_calibration_frames(video_paths, args.num_calibration_frames)
+        if not calibration_frames:
+            print("No calibration frames found, pass --calibration_videos or --no_int8")
+            return
+        print(f"Calibrating on {len(calibration_frames)} frames from {len(video_paths)} videos")
+
+    for model_path in args.models:
+        onnx_path = export_onnx(model_path, imgsz=args.imgsz)
+        print(f"Exported {model_path} -> {onnx_path}")
+        if calibration_frames is not None:
+            int8_path = quantize_int8(onnx_path, calibration_frames,
+                                      output_path=backend_model_path(model_path, "onnx-int8"),
+                                      imgsz=args.imgsz)
+            print(f"Quantized {onnx_path} -> {int8_path}")
+
+
+if __name__ == '__main__':
+    main()
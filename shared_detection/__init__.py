@@ -0,0 +1 @@
+from .shared_detection import SharedDetectionStage
@@ -0,0 +1,227 @@
+"""
+shared_detection.py
+
+Single-sweep detection stage for the player, ball and court keypoint models.
+
+Run separately, each model re-reads every frame and letterboxes / normalizes
+it on its own. Here each batch is read once, letterboxed once per model input
+size into a normalized tensor, and that tensor is passed to every model using
+that size. Boxes and keypoints come back in letterbox coordinates and are
+mapped back to the original frame before tracking.
+"""
+
+import sys
+sys.path.append('../')
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils import read_stub, save_stub, iter_batches, skip_frames, StageCheckpoint
+from utils.letterbox import letterbox_frames, to_nchw_rgb, unletterbox_boxes, unletterbox_points
+from trackers.detections import results_to_detections
+from Court_keypoint_detection.court_keypoint_detection import (results_to_keypoints, keypoints_array, empty_keypoints,
+                                                                is_keypoints_array)
+from shot_detection import track_shots
+
+if TYPE_CHECKING:
+    import torch
+    from shot_detection import Shots
+
+STAGES = ('player_tracks', 'ball_tracks', 'court_keypoints')
+# Per-frame output of each stage on skipped (non-court) frames
+EMPTY_OUTPUTS = {'player_tracks': dict, 'ball_tracks': dict, 'court_keypoints': empty_keypoints}
+STRIDE = 32
+
+
+def letterbox_batch(frames: List[np.ndarray], size: int, device) -> Tuple["torch.Tensor", float, Tuple[int, int]]:
+    """
+    Letterboxes a batch of BGR frames into one normalized RGB (B, 3, size, size)
+    tensor on `device`. Returns (tensor, gain, (pad_x, pad_y)).
+    """
+    import torch
+
+    batch, gain, pad = letterbox_frames(frames, size)
+    # uint8 is moved to the device before converting
+    tensor = torch.from_numpy(to_nchw_rgb(batch)).to(device).float() / 255.0
+    return tensor, gain, pad
+
+
+def model_input_size(model) -> int:
+    """
+    Square input size a YOLO model was trained at, rounded up to the stride.
+    """
+    imgsz = model.overrides.get('imgsz', 640)
+    if isinstance(imgsz, (list, tuple)):
+        imgsz = max(imgsz)
+    return int(np.ceil(imgsz / STRIDE) * STRIDE)
+
+
+class SharedDetectionStage:
+    """
+    Runs the player tracker, ball tracker and court keypoint detector in one
+    pass over the video, preprocessing each batch once per input size.
+    """
+
+    def __init__(self, player_tracker, ball_tracker, court_keypoint_detector, device=None):
+        self.player_tracker = player_tracker
+        self.ball_tracker = ball_tracker
+        self.court_keypoint_detector = court_keypoint_detector
+        self._device = device
+
+    @property
+    def device(self) -> "torch.device":
+        """
+        Device the preprocessed tensors are built on (torch is imported on first use).
+        """
+        import torch
+
+        if self._device is None:
+            self._device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        return torch.device(self._device)
+
+    def _tracker(self, stage: str):
+        """
+        Object holding the temporal state of one stage.
+        """
+        if stage == 'player_tracks':
+            return self.player_tracker
+        if stage == 'ball_tracks':
+            return self.ball_tracker
+        return self.court_keypoint_detector
+
+    def _model(self, stage: str) -> Tuple:
+        """
+        (model, confidence threshold) of one stage; only that stage's model is loaded.
+        """
+        if stage == 'player_tracks':
+            return self.player_tracker.model, self.player_tracker.conf
+        if stage == 'ball_tracks':
+            return self.ball_tracker.model, self.ball_tracker.conf
+        return self.court_keypoint_detector.model, self.court_keypoint_detector.conf_threshold
+
+    def _detect_boxes(self, stage: str, tensor: "torch.Tensor", gain: float, pad: Tuple[int, int],
+                      frame_shape: Tuple[int, ...]) -> List:
+        """
+        Runs a box model on a preprocessed tensor and returns per-frame
+        detections in frame coordinates.
+        """
+        model, conf = self._model(stage)
+        preds = model.predict(tensor, conf=conf)
+        detections = results_to_detections(preds, 'player' if stage == 'player_tracks' else 'Ball')
+        del preds
+        for detection in detections:
+            detection.xyxy = unletterbox_boxes(detection.xyxy, gain, pad, frame_shape)
+        return detections
+
+    def _stage_outputs(self, stage: str, frame_num: int, batch: List[np.ndarray], tensor: "torch.Tensor",
+                       gain: float, pad: Tuple[int, int]) -> List:
+        """
+        Per-frame outputs of one stage for a preprocessed batch starting at `frame_num`.
+        """
+        frame_shape = batch[0].shape
+        if stage == 'player_tracks':
+            # The player tracker picks the frames to detect (all of them, or keyframes)
+            def detect(indices):
+                indices = list(indices)
+                subset = tensor if len(indices) == len(tensor) else tensor[indices]
+                return self._detect_boxes(stage, subset, gain, pad, frame_shape)
+            return self.player_tracker.track_batch(frame_num, len(tensor), detect)
+
+        if stage == 'ball_tracks':
+            detections = self._detect_boxes(stage, tensor, gain, pad, frame_shape)
+            # Missed balls may get a high-resolution pass on crops of the original frames
+            return self.ball_tracker.track_batch(frame_num, batch, detections)
+
+        # The keypoint detector picks the frames to detect (all of them, or keyframes)
+        def detect_keypoints(indices):
+            indices = list(indices)
+            subset = tensor if len(indices) == len(tensor) else tensor[indices]
+            model, conf = self._model(stage)
+            return unletterbox_points(results_to_keypoints(model.predict(subset, conf=conf)), gain, pad)
+        return self.court_keypoint_detector.track_batch(frame_num, batch, detect_keypoints)
+
+    def detect(self,
+               frames,
+               read_from_stub: bool = False,
+               stub_paths: Optional[Dict[str, str]] = None,
+               batch_size: int = 20,
+               checkpoint_path: Optional[str] = None,
+               checkpoint_every: int = 500,
+               shots: Optional["Shots"] = None) -> Tuple[List, List, List]:
+        """
+        Returns (player_tracks, ball_tracks, court_keypoints) for a list (or any
+        iterable) of frames. Stages with a valid stub in `stub_paths` are
+        loaded instead of run; the others share one sweep over the frames and
+        save their stubs. With `checkpoint_path` the sweep can be resumed.
+        Court keypoints come back as one (frames, K, 3) x, y, confidence array.
+        With `shots` (see shot_detection), non-court frames are neither
+        preprocessed nor detected and every stage restarts at each cut.
+        """
+        stub_paths = stub_paths or {}
+        outputs = {}
+        for stage in STAGES:
+            cached = read_stub(read_from_stub, stub_paths.get(stage))
+            if stage == 'court_keypoints':
+                if is_keypoints_array(cached, len(frames)):
+                    outputs[stage] = cached
+            elif cached is not None and len(cached) == len(frames):
+                outputs[stage] = cached
+
+        pending = [stage for stage in STAGES if stage not in outputs]
+        if not pending:
+            return tuple(outputs[stage] for stage in STAGES)
+
+        # Models sharing an input size share one preprocessed tensor
+        size_groups = {}
+        for stage in pending:
+            size_groups.setdefault(model_input_size(self._model(stage)[0]), []).append(stage)
+
+        frame_outputs = []
+        start_frame = 0
+        checkpoint = None
+        if checkpoint_path:
+            checkpoint = StageCheckpoint(checkpoint_path, every=checkpoint_every)
+            frame_outputs, state, start_frame = checkpoint.load()
+            if state is not None:
+                player_state, ball_state, court_state = state
+                self.player_tracker.set_tracking_state(player_state)
+                self.ball_tracker.set_tracking_state(ball_state)
+                self.court_keypoint_detector.set_tracking_state(court_state)
+
+        frame_num = start_frame
+        for batch in iter_batches(skip_frames(frames, start_frame), batch_size):
+            batch_outputs = {}
+            court_in_batch = shots is None or shots.any_court(frame_num, len(batch))
+            for size, stages in size_groups.items():
+                tensor, gain, pad = letterbox_batch(batch, size, self.device) if court_in_batch else (None, None, None)
+                for stage in stages:
+                    def track_run(begin, end, stage=stage):
+                        return self._stage_outputs(stage, frame_num + begin, batch[begin:end],
+                                                   tensor[begin:end], gain, pad)
+                    batch_outputs[stage] = track_shots(shots, self._tracker(stage), frame_num, len(batch),
+                                                       track_run, EMPTY_OUTPUTS[stage])
+                del tensor
+            frame_num += len(batch)
+
+            for i in range(len(batch)):
+                frame_outputs.append(tuple(
+                    batch_outputs[stage][i] if stage in batch_outputs else None for stage in STAGES
+                ))
+
+            if checkpoint:
+                checkpoint.update(frame_outputs,
+                                  (self.player_tracker.get_tracking_state(),
+                                   self.ball_tracker.get_tracking_state(),
+                                   self.court_keypoint_detector.get_tracking_state()))
+
+        for index, stage in enumerate(STAGES):
+            if stage in pending:
+                outputs[stage] = [frame[index] for frame in frame_outputs]
+                if stage == 'court_keypoints':
+                    outputs[stage] = keypoints_array(outputs[stage])
+                if stub_paths.get(stage):
+                    save_stub(stub_paths[stage], outputs[stage])
+        if checkpoint:
+            checkpoint.clear()
+
+        return tuple(outputs[stage] for stage in STAGES)
@@ -0,0 +1 @@
+from .shot_detector import ShotDetector, Shots, track_shots, shot_slices
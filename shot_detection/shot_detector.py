@@ -0,0 +1,248 @@
+"""
+shot_detector.py
+
+Cheap shot-boundary and non-court detection pre-pass.
+
+Every frame is downscaled to a thumbnail and summarized by two hue /
+saturation histograms: one of the whole frame and one of its lower part,
+where the floor is in a court view. A cut is a large Hellinger distance
+between the whole-frame histograms of consecutive frames. The court is the
+dominant view of a broadcast, so the reference floor histogram is the
+per-bin median over all frames; a shot whose mean floor histogram is not
+similar enough to it (replay graphics, crowd shots, close-ups) is labeled
+non-court.
+
+The result is a `Shots` object (per-frame shot id and court flag) that the
+detection stages use to skip non-court frames and to reset their temporal
+state at cuts (see `track_shots`).
+"""
+
+import sys
+sys.path.append('../')
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils import read_stub, save_stub
+
+HUE_BINS = 16
+SATURATION_BINS = 8
+
+
+class Shots:
+    """
+    Per-frame shot ids (consecutive, from 0) and court flags of a video.
+    """
+
+    def __init__(self, shot_ids: np.ndarray, is_court: np.ndarray):
+        self.shot_ids = np.asarray(shot_ids, dtype=np.int64)
+        self.is_court = np.asarray(is_court, dtype=bool)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "Shots":
+        """
+        Rebuilds shots from the (frames, 2) array returned by `to_array`.
+        """
+        array = np.asarray(array)
+        return cls(array[:, 0], array[:, 1] != 0)
+
+    def to_array(self) -> np.ndarray:
+        """
+        (frames, 2) int32 array of shot id and court flag, the stub format.
+        """
+        return np.stack([self.shot_ids, self.is_court], axis=1).astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.shot_ids)
+
+    @property
+    def num_shots(self) -> int:
+        return int(self.shot_ids[-1]) + 1 if len(self.shot_ids) else 0
+
+    @property
+    def cuts(self) -> np.ndarray:
+        """
+        First frame of every shot but the first.
+        """
+        return np.flatnonzero(np.diff(self.shot_ids)) + 1
+
+    def shot_slices(self) -> List[slice]:
+        """
+        Frame slice of every shot, in order.
+        """
+        bounds = np.concatenate(([0], self.cuts, [len(self.shot_ids)])).tolist()
+        return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def runs(self, frame_num: int, batch_len: int) -> Iterator[Tuple[int, int, bool, bool]]:
+        """
+        Splits the batch of `batch_len` frames starting at video frame
+        `frame_num` into runs of one shot. Yields (begin, end, is_court, cut)
+        in batch indices, `cut` telling whether the run starts a new shot.
+        """
+        shot_ids = self.shot_ids[frame_num:frame_num + batch_len]
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(shot_ids)) + 1, [len(shot_ids)])).tolist()
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            frame = frame_num + begin
+            cut = frame > 0 and self.shot_ids[frame] != self.shot_ids[frame - 1]
+            yield begin, end, bool(self.is_court[frame]), bool(cut)
+
+    def any_court(self, frame_num: int, batch_len: int) -> bool:
+        return bool(self.is_court[frame_num:frame_num + batch_len].any())
+
+
+def shot_slices(shots: Optional[Shots], num_frames: int) -> List[slice]:
+    """
+    Frame slices of the shots, or one slice over the whole video without shots.
+    """
+    return shots.shot_slices() if shots is not None else [slice(0, num_frames)]
+
+
+def track_shots(shots: Optional[Shots], stage, frame_num: int, batch_len: int,
+                track_run: Callable[[int, int], List], empty_output: Callable[[], object]) -> List:
+    """
+    Per-frame outputs of a batch starting at video frame `frame_num`.
+
+    `track_run(begin, end)` returns the outputs of batch frames [begin, end)
+    and is only called on court runs; frames of non-court shots get
+    `empty_output()`. The stage's temporal state is reset at every cut, so
+    nothing is carried from one shot into the next.
+    """
+    if shots is None:
+        return list(track_run(0, batch_len))
+
+    outputs = []
+    for begin, end, is_court, cut in shots.runs(frame_num, batch_len):
+        if cut:
+            stage.reset_tracking_state()
+        if is_court:
+            outputs.extend(track_run(begin, end))
+        else:
+            outputs.extend(empty_output() for _ in range(begin, end))
+    return outputs
+
+
+def _hue_saturation_histograms(hsv: np.ndarray) -> np.ndarray:
+    """
+    Normalized hue / saturation histogram of an HSV image, flattened.
+    """
+    hist = cv2.calcHist([hsv], [0, 1], None, [HUE_BINS, SATURATION_BINS], [0, 180, 0, 256]).ravel()
+    return hist / max(hist.sum(), 1.0)
+
+
+def hellinger_distance(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Hellinger distance (0 to 1) between rows of normalized histograms.
+    """
+    coefficient = np.sqrt(p * q).sum(axis=-1)
+    return np.sqrt(np.clip(1.0 - coefficient, 0.0, 1.0))
+
+
+class ShotDetector:
+    """
+    Segments a video into shots and labels the shots that do not show the court.
+    """
+
+    def __init__(self,
+                 cut_threshold: float = 0.45,
+                 min_shot_length: int = 8,
+                 court_threshold: float = 0.5,
+                 floor_fraction: float = 0.5,
+                 thumbnail_width: int = 96):
+        """
+        `cut_threshold` is the histogram distance between consecutive frames
+        that makes a cut, `min_shot_length` the shortest shot kept (closer
+        cuts are ignored, and a flash whose frames return to the previous
+        view within that many frames is no cut), `court_threshold` the largest
+        distance of a shot's floor histogram to the reference floor for a
+        court shot, and `floor_fraction` the lower part of the frame used as
+        the floor.
+        """
+        self.cut_threshold = cut_threshold
+        self.min_shot_length = min_shot_length
+        self.court_threshold = court_threshold
+        self.floor_fraction = floor_fraction
+        self.thumbnail_width = thumbnail_width
+
+    def frame_histograms(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (whole-frame, floor) hue / saturation histograms of a BGR frame's thumbnail.
+        """
+        height, width = frame.shape[:2]
+        thumbnail_height = max(int(round(height * self.thumbnail_width / width)), 1)
+        thumbnail = cv2.resize(frame, (self.thumbnail_width, thumbnail_height), interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2HSV)
+        floor_top = int(thumbnail_height * (1 - self.floor_fraction))
+        return _hue_saturation_histograms(hsv), _hue_saturation_histograms(hsv[floor_top:])
+
+    def find_cuts(self, histograms: np.ndarray) -> np.ndarray:
+        """
+        First frames of new shots, from the whole-frame histograms.
+
+        A jump whose frames return to the pre-jump histogram within
+        `min_shot_length` frames (a flash, a few frames of graphics) is not a
+        cut, and neither are the jumps inside it. Cuts closer than
+        `min_shot_length` frames to the previous one are ignored.
+        """
+        distances = hellinger_distance(histograms[1:], histograms[:-1])
+        candidates = np.flatnonzero(distances > self.cut_threshold) + 1
+
+        cuts = []
+        last_cut = 0
+        transient_end = 0
+        for frame in candidates.tolist():
+            if frame <= transient_end:
+                continue
+            following = histograms[frame + 1:frame + self.min_shot_length]
+            returns = np.flatnonzero(hellinger_distance(following, histograms[frame - 1]) <= self.cut_threshold)
+            if len(returns):
+                transient_end = frame + 1 + int(returns[0])
+                continue
+            if frame - last_cut >= self.min_shot_length:
+                cuts.append(frame)
+                last_cut = frame
+        return np.array(cuts, dtype=np.int64)
+
+    def label_court_shots(self, floor_histograms: np.ndarray, shot_ids: np.ndarray) -> np.ndarray:
+        """
+        Court flag of every shot, comparing its mean floor histogram to the
+        reference (median) floor histogram of the video.
+        """
+        reference = np.median(floor_histograms, axis=0)
+        reference /= max(reference.sum(), 1e-9)
+
+        num_shots = int(shot_ids[-1]) + 1
+        shot_lengths = np.bincount(shot_ids, minlength=num_shots)
+        shot_histograms = np.zeros((num_shots, floor_histograms.shape[1]))
+        np.add.at(shot_histograms, shot_ids, floor_histograms)
+        shot_histograms /= shot_lengths[:, None]
+        return hellinger_distance(shot_histograms, reference) <= self.court_threshold
+
+    def detect_shots(self, frames, read_from_stub: bool = False, stub_path: Optional[str] = None) -> Shots:
+        """
+        Shots of a list (or any iterable) of frames, read once. The result is
+        cached in `stub_path` as a (frames, 2) array.
+        """
+        cached = read_stub(read_from_stub, stub_path)
+        if cached is not None and len(cached) == len(frames):
+            return Shots.from_array(cached)
+
+        histograms, floor_histograms = [], []
+        for frame in frames:
+            histogram, floor_histogram = self.frame_histograms(frame)
+            histograms.append(histogram)
+            floor_histograms.append(floor_histogram)
+
+        if not histograms:
+            return Shots(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+
+        histograms = np.array(histograms)
+        shot_ids = np.zeros(len(histograms), dtype=np.int64)
+        shot_ids[self.find_cuts(histograms)] = 1
+        shot_ids = np.cumsum(shot_ids)
+        is_court_shot = self.label_court_shots(np.array(floor_histograms), shot_ids)
+        shots = Shots(shot_ids, is_court_shot[shot_ids])
+
+        if stub_path:
+            save_stub(stub_path, shots.to_array())
+        return shots
@@ -1,9 +1,11 @@
 import os
 import sys
 import pathlib
+import numpy as np
 folder_path = pathlib.Path(__file__).parent.resolve()
 sys.path.append(os.path.join(folder_path,"../"))
 from utils import measure_distance
+from utils.track_store import TrackStore
 
 
 class SpeedAndDistanceCalculator:
@@ -23,21 +25,32 @@ class SpeedAndDistanceCalculator:
     def calculate_distance(self,
                             tactical_player_positions
                             ):
-        previous_players_position = {}
-        output_distances =[]
+        """
+        Distance in meters each player covered since their previous appearance,
+        computed per player track with array operations.
+        """
+        positions = tactical_player_positions
+        if not isinstance(positions, TrackStore):
+            positions = TrackStore.from_frame_dicts(positions)
 
-        for frame_number, tactical_player_position_frame in enumerate(tactical_player_positions):
-            output_distances.append({})
+        # Convert all positions to meters at once
+        scale = np.array([self.width_in_meters / self.width_in_pixels,
+                          self.height_in_meters / self.height_in_pixels])
+        meter_positions = positions.values * scale
 
-            for player_id, current_player_position in tactical_player_position_frame.items():
-                # Calculate distance
-                if player_id in previous_players_position:
-                    previous_position = previous_players_position[player_id]
-                    meter_distance = self.calculate_meter_distance(previous_position, current_player_position)
-                    output_distances[frame_number][player_id] = meter_distance
+        distances = np.full(len(meter_positions), np.nan)
+        for _, rows in positions.iter_tracks():
+            steps = np.diff(meter_positions[rows], axis=0)
+            distances[rows[1:]] = np.hypot(steps[:, 0], steps[:, 1]) * 0.4
+
+        # Players seen for the first time have no distance
+        output_distances = [{} for _ in range(len(positions))]
+        has_distance = ~np.isnan(distances)
+        frames = positions.frames[has_distance].tolist()
+        player_ids = positions.track_ids[has_distance].tolist()
+        for frame_number, player_id, meter_distance in zip(frames, player_ids, distances[has_distance].tolist()):
+            output_distances[frame_number][player_id] = meter_distance
 
-                previous_players_position[player_id]=current_player_position
-        
         return output_distances
 
     def calculate_meter_distance(self,previous_pixel_position, current_pixel_position):
@@ -71,42 +84,37 @@ class SpeedAndDistanceCalculator:
             list: List of dictionaries where each dictionary maps player_id to their
                 speed in km/h at that frame.
         """
-        speeds = []
         window_size = 5  # Look at last 5 frames for speed calculation
-        
-        # Calculate speed for each frame and player
-        for frame_idx in range(len(distances)):
-            speeds.append({})
-            # For each player in current frame
-            for player_id in distances[frame_idx].keys():
-                # Look back window_size frames or fewer if at the beginning
-                start_frame = max(0, frame_idx - (window_size * 3) + 1)
-                
-                total_distance = 0
-                frames_present = 0
-                last_frame_present = None
-                
-                # Calculate total distance in the window
-                for i in range(start_frame, frame_idx + 1):
-                    if player_id in distances[i]:
-                        if last_frame_present is not None:
-                            total_distance += distances[i][player_id]
-                            frames_present += 1
-                        last_frame_present = i
-                
-                # Calculate speed only if player was present in at least two frames
-                if frames_present >= window_size:
-                    # Calculate time in hours (convert frames to hours)
-                    time_in_seconds = frames_present / fps
-                    time_in_hours = time_in_seconds / 3600
-                    
-                    # Calculate speed in km/h
-                    if time_in_hours > 0:
-                        speed_kmh = (total_distance / 1000) / time_in_hours
-                        speeds[frame_idx][player_id] = speed_kmh
-                    else:
-                        speeds[frame_idx][player_id] = 0
-                else:
-                    speeds[frame_idx][player_id] = 0
-        
+
+        if not isinstance(distances, TrackStore):
+            distances = TrackStore.from_frame_dicts(distances)
+        values = distances.values[:, 0]
+        speed_values = np.zeros(len(values))
+
+        # For each player track, sum the distances inside the look-back window
+        # (window_size * 3 frames, fewer at the beginning) with a cumulative sum.
+        # The first appearance inside the window only marks the start, its own
+        # distance is not counted.
+        for _, rows in distances.iter_tracks():
+            track_frames = distances.frames[rows]
+            cumulative = np.concatenate([[0.0], np.cumsum(values[rows])])
+            window_starts = np.maximum(0, track_frames - (window_size * 3) + 1)
+            first_in_window = np.searchsorted(track_frames, window_starts, side='left')
+            positions = np.arange(len(rows))
+
+            frames_present = positions - first_in_window
+            total_distance = cumulative[positions + 1] - cumulative[first_in_window + 1]
+
+            # Calculate speed only if player was present in enough frames
+            enough = frames_present >= window_size
+            # Calculate time in hours (convert frames to hours), then speed in km/h
+            time_in_hours = frames_present[enough] / fps / 3600
+            speed_values[rows[enough]] = (total_distance[enough] / 1000) / time_in_hours
+
+        speeds = [{} for _ in range(len(distances))]
+        frames = distances.frames.tolist()
+        player_ids = distances.track_ids.tolist()
+        for frame_idx, player_id, speed_kmh in zip(frames, player_ids, speed_values.tolist()):
+            speeds[frame_idx][player_id] = speed_kmh
+
         return speeds
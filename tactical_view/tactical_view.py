@@ -3,12 +3,12 @@ import sys
 import pathlib
 import numpy as np
 import cv2
-from copy import deepcopy
 from .homography import Homography
 
 folder_path = pathlib.Path(__file__).parent.resolve()
 sys.path.append(os.path.join(folder_path, "../"))
-from utils import get_foot_position, measure_distance
+from utils import measure_distance
+from utils.track_store import TrackStore
 
 class TacticalViewConverter:
     """
@@ -58,12 +58,16 @@ class TacticalViewConverter:
         """
         Validate detected keypoints by comparing distances between points
         against expected court proportions to filter out invalid detections.
+
+        Takes per-frame (K, 2) or (K, 3) keypoints, e.g. the (frames, K, 3)
+        array of the court keypoint detector, and returns a copy of them as
+        an array with invalid keypoints zeroed.
         """
-        keypoints_list = deepcopy(keypoints_list)
+        keypoints_list = np.array(keypoints_list, dtype=np.float32)
 
         for frame_idx, frame_keypoints in enumerate(keypoints_list):
             # Convert keypoints to list of coordinate pairs for easier processing
-            frame_keypoints = frame_keypoints.xy.tolist()[0]
+            frame_keypoints = frame_keypoints[:, :2].tolist()
 
             # Indices of keypoints that have positive coordinates (likely detected)
             detected_indices = [i for i, kp in enumerate(frame_keypoints) if kp[0] > 0 and kp[1] > 0]
@@ -102,8 +106,7 @@ class TacticalViewConverter:
 
                     # If error is too high, mark the keypoint as invalid
                     if error > 0.8:  # 80% margin
-                        keypoints_list[frame_idx].xy[0][i] *= 0
-                        keypoints_list[frame_idx].xyn[0][i] *= 0
+                        keypoints_list[frame_idx, i] = 0
                         invalid_keypoints.append(i)
         
         return keypoints_list
@@ -112,14 +115,18 @@ class TacticalViewConverter:
         """
         Transform player positions from camera view to tactical (top-down) court coordinates
         by computing homography from detected keypoints.
+
+        `player_tracks` may be per-frame dicts or a TrackStore; all players of a
+        frame are projected with a single perspective transform.
         """
+        player_tracks = TrackStore.from_tracks(player_tracks)
         tactical_player_positions = []
         
-        for frame_idx, (frame_keypoints, frame_tracks) in enumerate(zip(keypoints_list, player_tracks)):
+        for frame_idx, frame_keypoints in enumerate(keypoints_list[:len(player_tracks)]):
             tactical_positions = {}
 
-            # Convert keypoints to list format
-            frame_keypoints = frame_keypoints.xy.tolist()[0]
+            # Convert keypoints to list format (x, y only)
+            frame_keypoints = np.asarray(frame_keypoints)[..., :2].tolist()
 
             if frame_keypoints is None or len(frame_keypoints) == 0:
                 tactical_player_positions.append(tactical_positions)
@@ -140,21 +147,20 @@ class TacticalViewConverter:
             try:
                 # Compute homography matrix mapping camera view to tactical view
                 homography = Homography(source_points, target_points)
-                
-                for player_id, player_data in frame_tracks.items():
-                    bbox = player_data["bbox"]
-                    # Extract player's foot position from bounding box
-                    player_position = np.array([get_foot_position(bbox)])
-                    # Apply homography transformation to player position
-                    tactical_position = homography.transform_points(player_position)
-
-                    x, y = tactical_position[0][0], tactical_position[0][1]
+
+                player_ids, bboxes = player_tracks.frame_arrays(frame_idx)
+                if len(player_ids) > 0:
+                    # Players' foot positions (bottom-center of the bbox, as get_foot_position)
+                    foot_positions = np.trunc(np.stack([(bboxes[:, 0] + bboxes[:, 2]) / 2, bboxes[:, 3]], axis=1))
+                    # Apply homography transformation to all players at once
+                    tactical_points = homography.transform_points(foot_positions)
+
                     # Ignore players outside the tactical court boundaries
-                    if x < 0 or x > self.width or y < 0 or y > self.height:
-                        continue
+                    x, y = tactical_points[:, 0], tactical_points[:, 1]
+                    inside = (x >= 0) & (x <= self.width) & (y >= 0) & (y <= self.height)
+                    for player_id, point in zip(player_ids[inside].tolist(), tactical_points[inside]):
+                        tactical_positions[player_id] = [point[0], point[1]]
 
-                    tactical_positions[player_id] = [x, y]
-                    
             except (ValueError, cv2.error):
                 # In case homography computation fails, return empty positions for this frame
                 tactical_player_positions.append(tactical_positions)
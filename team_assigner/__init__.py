@@ -1 +1,3 @@
 from .team_assigner import TeamAssigner
+from .color_team_assigner import ColorTeamAssigner
+from .onnx_team_assigner import OnnxTeamAssigner
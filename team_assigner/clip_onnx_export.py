@@ -0,0 +1,118 @@
+"""
+clip_onnx_export.py
+
+Export of the fashion-clip image encoder used by TeamAssigner to ONNX, its
+dynamic INT8 quantization, and the precomputed team text embeddings.
+
+The graph takes CLIP pixel values (N, 3, 224, 224) and returns normalized
+image embeddings, so classifying a crop is one matrix product with the text
+embeddings. Those are computed once for the two team prompts and saved with
+the image preprocessing constants of the CLIP processor to a small `.npz`
+file read by `OnnxTeamAssigner`. Weights are quantized dynamically (INT8
+weights, activations quantized on the fly), which needs no calibration data.
+
+Usage:
+    python -m team_assigner.clip_onnx_export --team_1 "white shirt" --team_2 "dark blue shirt"
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from configs import TEAM_CLIP_ENCODER_PATH, TEAM_TEXT_EMBEDDINGS_PATH
+from model_backends import backend_model_path
+from .team_assigner import TeamAssigner
+
+
+def export_text_embeddings(team_assigner: TeamAssigner, output_path: str = TEAM_TEXT_EMBEDDINGS_PATH) -> str:
+    """
+    Saves the normalized text embeddings of the two team prompts, the prompts
+    themselves and the image preprocessing constants of the CLIP processor.
+    """
+    team_assigner.load_model()
+    image_processor = team_assigner.processor.image_processor
+    np.savez(output_path,
+             classes=np.array([team_assigner.team_1_class_name, team_assigner.team_2_class_name]),
+             text_embeddings=team_assigner.text_embeddings.astype(np.float32),
+             image_size=np.int64(image_processor.crop_size["height"]),
+             image_mean=np.array(image_processor.image_mean, dtype=np.float32),
+             image_std=np.array(image_processor.image_std, dtype=np.float32))
+    return output_path
+
+
+def export_image_encoder(team_assigner: TeamAssigner, output_path: str = TEAM_CLIP_ENCODER_PATH,
+                         opset: int = 17) -> str:
+    """
+    Exports the image tower and projection of the CLIP model, followed by
+    L2 normalization, to an ONNX graph with a dynamic batch.
+    """
+    import torch
+
+    class ImageEncoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            embeddings = self.model.get_image_features(pixel_values=pixel_values)
+            return embeddings / embeddings.norm(dim=-1, keepdim=True)
+
+    team_assigner.load_model()
+    image_size = team_assigner.processor.image_processor.crop_size["height"]
+    dummy_input = torch.zeros(1, 3, image_size, image_size)
+    with torch.no_grad():
+        torch.onnx.export(ImageEncoder(team_assigner.model), dummy_input, output_path,
+                          input_names=["pixel_values"], output_names=["image_embeddings"],
+                          dynamic_axes={"pixel_values": {0: "batch"}, "image_embeddings": {0: "batch"}},
+                          opset_version=opset)
+    return output_path
+
+
+def quantize_dynamic_int8(onnx_path: str, output_path: str = None) -> str:
+    """
+    Dynamically quantizes the MatMul / Gemm weights of an ONNX graph to INT8
+    (the transformer layers hold nearly all of the encoder's compute).
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if output_path is None:
+        output_path = os.path.splitext(onnx_path)[0] + ".int8.onnx"
+
+    preprocessed_path = os.path.splitext(output_path)[0] + ".pre.onnx"
+    quant_pre_process(onnx_path, preprocessed_path)
+    try:
+        quantize_dynamic(preprocessed_path, output_path,
+                         op_types_to_quantize=["MatMul", "Gemm"],
+                         per_channel=True,
+                         weight_type=QuantType.QInt8)
+    finally:
+        os.remove(preprocessed_path)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the team CLIP image encoder to ONNX (and INT8)')
+    parser.add_argument('--team_1', type=str, default='white shirt', help='Jersey prompt of team 1')
+    parser.add_argument('--team_2', type=str, default='dark blue shirt', help='Jersey prompt of team 2')
+    parser.add_argument('--output', type=str, default=TEAM_CLIP_ENCODER_PATH, help='Float ONNX graph path')
+    parser.add_argument('--text_embeddings', type=str, default=TEAM_TEXT_EMBEDDINGS_PATH,
+                        help='Text embeddings file path')
+    parser.add_argument('--no_int8', action='store_true', help='Only export the float ONNX graph')
+    args = parser.parse_args()
+
+    team_assigner = TeamAssigner(args.team_1, args.team_2)
+    print(f"Saved team text embeddings -> {export_text_embeddings(team_assigner, args.text_embeddings)}")
+
+    onnx_path = export_image_encoder(team_assigner, args.output)
+    print(f"Exported CLIP image encoder -> {onnx_path}")
+    if not args.no_int8:
+        int8_path = quantize_dynamic_int8(onnx_path, backend_model_path(onnx_path, "onnx-int8"))
+        print(f"Quantized {onnx_path} -> {int8_path}")
+
+
+if __name__ == '__main__':
+    main()
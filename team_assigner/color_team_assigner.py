@@ -0,0 +1,143 @@
+"""
+color_team_assigner.py
+
+Jersey-color clustering backend of the team assigner.
+
+Separating two jersey colors does not need a vision-language model. Each
+player crop is reduced to its torso, shrunk to a thumbnail and described by a
+coarse Lab color histogram (square-rooted, so Euclidean distances between
+descriptors follow the Hellinger distance between histograms). A two-cluster
+k-means fitted on the players of the first frames gives the two teams; crops
+about equally close to both clusters fall back to CLIP.
+"""
+
+import cv2
+import numpy as np
+
+import sys
+sys.path.append('../')
+from utils import read_stub
+from .team_assigner import TeamAssigner
+
+LAB_BINS = 4
+
+
+def torso_descriptor(crop, torso_rows=(0.2, 0.5), torso_cols=(0.25, 0.75), size=12):
+    """
+    Square-rooted, normalized Lab histogram (LAB_BINS ** 3 values) of the
+    torso region of an RGB player crop.
+    """
+    height, width = crop.shape[:2]
+    top, bottom = int(height * torso_rows[0]), max(int(height * torso_rows[1]), int(height * torso_rows[0]) + 1)
+    left, right = int(width * torso_cols[0]), max(int(width * torso_cols[1]), int(width * torso_cols[0]) + 1)
+    torso = cv2.resize(crop[top:bottom, left:right], (size, size), interpolation=cv2.INTER_AREA)
+    lab = cv2.cvtColor(torso, cv2.COLOR_RGB2LAB)
+    hist = cv2.calcHist([lab], [0, 1, 2], None, [LAB_BINS] * 3, [0, 256] * 3).ravel()
+    return np.sqrt(hist / max(hist.sum(), 1.0))
+
+
+def two_means(descriptors, iterations=20):
+    """
+    Deterministic 2-means: starts from the descriptor farthest from the mean
+    and the one farthest from it, then runs Lloyd iterations.
+    Returns the (2, D) centers.
+    """
+    first = descriptors[np.argmax(np.linalg.norm(descriptors - descriptors.mean(axis=0), axis=1))]
+    second = descriptors[np.argmax(np.linalg.norm(descriptors - first, axis=1))]
+    centers = np.stack([first, second])
+    for _ in range(iterations):
+        labels = np.linalg.norm(descriptors[:, None] - centers[None], axis=2).argmin(axis=1)
+        new_centers = np.stack([
+            descriptors[labels == k].mean(axis=0) if np.any(labels == k) else centers[k] for k in range(2)
+        ])
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    return centers
+
+
+class ColorTeamAssigner(TeamAssigner):
+    """
+    TeamAssigner that clusters torso colors instead of running CLIP on
+    every crop. CLIP (and transformers) is only loaded if a crop is ambiguous.
+    """
+
+    def __init__(self,
+                 team_1_class_name="white shirt",
+                 team_2_class_name="dark blue shirt",
+                 fit_frames=100,
+                 ambiguity=0.15,
+                 clip_fallback=True,
+                 team_1_is_lighter=True,
+                 **kwargs):
+        """
+        `fit_frames` is the number of first frames whose players fit the
+        clusters, `ambiguity` the relative distance margin between the two
+        clusters under which a crop goes to CLIP (with `clip_fallback`).
+        Clusters are unlabeled: team 1 is the lighter cluster with
+        `team_1_is_lighter` (as with the default 'white shirt' / 'dark blue
+        shirt'), the darker one otherwise.
+        Other arguments are those of `TeamAssigner`.
+        """
+        super().__init__(team_1_class_name, team_2_class_name, **kwargs)
+        self.fit_frames = fit_frames
+        self.ambiguity = ambiguity
+        self.clip_fallback = clip_fallback
+        self.team_1_is_lighter = team_1_is_lighter
+        self.centers = None  # (2, D), row 0 is team 1
+
+    def fit(self, video_frames, player_tracks):
+        """
+        Fits the two team clusters on the players of the first `fit_frames` frames.
+        """
+        descriptors = []
+        for frame_num, frame in enumerate(video_frames):
+            if frame_num >= min(self.fit_frames, len(player_tracks)):
+                break
+            for track in player_tracks[frame_num].values():
+                descriptors.append(torso_descriptor(self.crop_player(frame, track['bbox'])))
+        if len(descriptors) < 2:
+            print("ColorTeamAssigner: not enough players in the first frames to fit team colors")
+            return
+
+        centers = two_means(np.array(descriptors))
+        # Mean lightness of each center's histogram (L is the slowest-varying bin axis)
+        lightness = (centers ** 2).reshape(2, LAB_BINS, -1).sum(axis=2) @ np.arange(LAB_BINS)
+        lighter_first = lightness[0] >= lightness[1]
+        if lighter_first != self.team_1_is_lighter:
+            centers = centers[::-1]
+        self.centers = centers
+
+    def classify_crops(self, crops):
+        """
+        Team ids (1 or 2) of RGB player crops from the nearest color cluster;
+        ambiguous crops are classified by CLIP with `clip_fallback`.
+        """
+        if self.centers is None:
+            return super().classify_crops(crops)
+
+        descriptors = np.array([torso_descriptor(crop) for crop in crops]).reshape(len(crops), -1)
+        distances = np.linalg.norm(descriptors[:, None] - self.centers[None], axis=2)
+        teams = distances.argmin(axis=1) + 1
+
+        if self.clip_fallback and len(crops):
+            near, far = distances.min(axis=1), distances.max(axis=1)
+            ambiguous = np.flatnonzero((far - near) < self.ambiguity * np.maximum(far + near, 1e-9))
+            if len(ambiguous):
+                teams[ambiguous] = super().classify_crops([crops[i] for i in ambiguous])
+        return teams
+
+    def get_player_teams_across_frames(self, video_frames, player_tracks, read_from_stub=False, stub_path=None,
+                                       **kwargs):
+        """
+        Same as `TeamAssigner.get_player_teams_across_frames`, fitting the
+        team colors on the first frames first.
+        """
+        player_assignment = read_stub(read_from_stub, stub_path)
+        if player_assignment is not None and len(player_assignment) == len(video_frames):
+            return player_assignment
+
+        if self.centers is None:
+            self.fit(video_frames, player_tracks)
+        return super().get_player_teams_across_frames(video_frames, player_tracks, read_from_stub=False,
+                                                      stub_path=stub_path, **kwargs)
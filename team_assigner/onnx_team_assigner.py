@@ -0,0 +1,117 @@
+"""
+onnx_team_assigner.py
+
+Team assignment with the CLIP image encoder exported to ONNX.
+
+Only the image tower of fashion-clip runs per crop; the two team prompts are
+embedded once at export time and stored in a small `.npz` file next to the
+graph, together with the image preprocessing constants. CLIP's preprocessing
+(shortest side resized to the input size with bicubic interpolation, center
+crop, scaling to [0, 1], per-channel mean / std) is reproduced with numpy and
+OpenCV, so neither transformers nor torch is imported at runtime, only
+onnxruntime. Export the files with `python -m team_assigner.clip_onnx_export`.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+import sys
+sys.path.append('../')
+from configs import TEAM_CLIP_ENCODER_PATH, TEAM_TEXT_EMBEDDINGS_PATH
+from model_backends import backend_model_path
+from .team_assigner import TeamAssigner
+
+
+def preprocess_crops(crops, image_size=224, mean=(0.48145466, 0.4578275, 0.40821073),
+                     std=(0.26862954, 0.26130258, 0.27577711)):
+    """
+    (N, 3, image_size, image_size) float32 CLIP input of RGB crops.
+    """
+    batch = np.empty((len(crops), image_size, image_size, 3), dtype=np.float32)
+    for index, crop in enumerate(crops):
+        height, width = crop.shape[:2]
+        if height <= width:
+            size = (int(image_size * width / height), image_size)
+        else:
+            size = (image_size, int(image_size * height / width))
+        resized = cv2.resize(crop, size, interpolation=cv2.INTER_CUBIC)
+        top, left = (size[1] - image_size) // 2, (size[0] - image_size) // 2
+        batch[index] = resized[top:top + image_size, left:left + image_size]
+
+    std = np.asarray(std, dtype=np.float32)
+    batch *= 1.0 / (255.0 * std)
+    batch -= np.asarray(mean, dtype=np.float32) / std
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+
+
+class OnnxTeamAssigner(TeamAssigner):
+    """
+    TeamAssigner running the exported CLIP image encoder with ONNX Runtime
+    against precomputed text embeddings.
+    """
+
+    def __init__(self,
+                 team_1_class_name="white shirt",
+                 team_2_class_name="dark blue shirt",
+                 backend="onnx-int8",
+                 encoder_path=TEAM_CLIP_ENCODER_PATH,
+                 text_embeddings_path=TEAM_TEXT_EMBEDDINGS_PATH,
+                 **kwargs):
+        """
+        `backend` is 'onnx' (float graph at `encoder_path`) or 'onnx-int8'
+        (its dynamically quantized `.int8.onnx` copy). `text_embeddings_path`
+        holds the team prompts' embeddings, which must be those of
+        `team_1_class_name` and `team_2_class_name`.
+        Other arguments are those of `TeamAssigner`.
+        """
+        super().__init__(team_1_class_name, team_2_class_name, **kwargs)
+        self.backend = backend
+        self.encoder_path = backend_model_path(encoder_path, backend)
+        self.text_embeddings_path = text_embeddings_path
+
+        self.image_size = None
+        self.image_mean = None
+        self.image_std = None
+
+    def load_model(self):
+        """
+        Opens the ONNX Runtime session and loads the text embeddings and
+        preprocessing constants saved at export time.
+        """
+        if self.model is not None:
+            return
+
+        for path in (self.encoder_path, self.text_embeddings_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} not found, export it first with "
+                                        f"`python -m team_assigner.clip_onnx_export`")
+
+        import onnxruntime as ort
+
+        with np.load(self.text_embeddings_path) as exported:
+            classes = exported["classes"].tolist()
+            if classes != [self.team_1_class_name, self.team_2_class_name]:
+                raise ValueError(f"{self.text_embeddings_path} embeds the prompts {classes}, re-export it with "
+                                 f"--team_1 '{self.team_1_class_name}' --team_2 '{self.team_2_class_name}'")
+            self.text_embeddings = exported["text_embeddings"]
+            self.image_size = int(exported["image_size"])
+            self.image_mean = exported["image_mean"]
+            self.image_std = exported["image_std"]
+
+        self.model = ort.InferenceSession(self.encoder_path, providers=["CPUExecutionProvider"])
+
+    def embed_crops(self, crops):
+        """
+        Normalized CLIP image embeddings (N, D float32 array) of RGB player
+        crops, `batch_size` crops per ONNX Runtime call.
+        """
+        self.load_model()
+        input_name = self.model.get_inputs()[0].name
+        embeddings = [np.zeros((0, self.text_embeddings.shape[1]), dtype=np.float32)]
+        for start in range(0, len(crops), self.batch_size):
+            pixel_values = preprocess_crops(crops[start:start + self.batch_size], self.image_size,
+                                            self.image_mean, self.image_std)
+            embeddings.append(self.model.run(None, {input_name: pixel_values})[0])
+        return np.concatenate(embeddings)
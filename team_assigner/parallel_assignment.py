@@ -0,0 +1,72 @@
+"""
+parallel_assignment.py
+
+Process-pool team assignment over frame-range shards.
+
+Teams are re-estimated every `RESET_INTERVAL` frames, so shards aligned to
+that interval are independent: a worker assigning frames [start, stop) gives
+exactly the teams a single process would. Workers map the decoded frames of
+a FrameCache entry (`open_frames`) instead of receiving pickled arrays, get
+only their shard's tracks, and load the classifier once per process. Shards
+are returned in frame order, so the merged output is deterministic.
+"""
+
+import os
+import sys
+sys.path.append('../')
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Dict, Iterator, List, Tuple
+
+from utils import open_frames
+
+RESET_INTERVAL = 50
+
+_worker_assigner = None
+_worker_frames = None
+
+
+def frame_shards(start_frame: int, num_frames: int, num_workers: int, shards_per_worker: int = 4) -> List[Tuple[int, int]]:
+    """
+    Frame ranges covering [start_frame, num_frames), each a multiple of
+    RESET_INTERVAL long, about `shards_per_worker` per worker for load balancing.
+    """
+    remaining = max(num_frames - start_frame, 0)
+    windows = -(-remaining // RESET_INTERVAL)
+    shard_windows = max(-(-windows // (num_workers * shards_per_worker)), 1)
+    shard_size = shard_windows * RESET_INTERVAL
+    return [(start, min(start + shard_size, num_frames)) for start in range(start_frame, num_frames, shard_size)]
+
+
+def _init_worker(assigner, entry_dir: str) -> None:
+    # One inference thread per process: the pool provides the parallelism
+    os.environ["OMP_NUM_THREADS"] = "1"
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+
+    global _worker_assigner, _worker_frames
+    assigner.num_workers = 1
+    _worker_assigner = assigner
+    _worker_frames = open_frames(entry_dir)
+
+
+def _assign_shard(shard: Tuple[int, int, List[Dict]]) -> List[Dict[int, int]]:
+    start, stop, tracks = shard
+    _worker_assigner.player_team_dict = {}
+    return _worker_assigner.get_player_teams_across_frames(_worker_frames[start:stop], tracks)
+
+
+def assign_teams_parallel(assigner, entry_dir: str, player_tracks, start_frame: int,
+                          num_workers: int) -> Iterator[List[Dict[int, int]]]:
+    """
+    Yields the per-frame team assignments of consecutive shards from
+    `start_frame` (a multiple of RESET_INTERVAL) to the end of `player_tracks`,
+    computed by `num_workers` processes reading the frames of `entry_dir`.
+    """
+    shards = frame_shards(start_frame, len(player_tracks), num_workers)
+    # spawn: workers must not inherit CUDA / thread pools of the parent
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                             initializer=_init_worker, initargs=(assigner, entry_dir)) as pool:
+        jobs = ((start, stop, player_tracks[start:stop]) for start, stop in shards)
+        yield from pool.map(_assign_shard, jobs)
@@ -1,55 +1,117 @@
-from PIL import Image
 import cv2
-from transformers import CLIPProcessor, CLIPModel
+import numpy as np
 
-import sys 
+import sys
 sys.path.append('../')
-from utils import read_stub, save_stub
+from utils import read_stub, save_stub, skip_frames, open_frames, StageCheckpoint, TrackStore
+from utils.frame_cache import frame_cache_dir
+from .parallel_assignment import RESET_INTERVAL, assign_teams_parallel
 
 
 class TeamAssigner:
     def __init__(self,
                  team_1_class_name="white shirt",
                  team_2_class_name="dark blue shirt",
+                 batch_size=64,
+                 track_voting=False,
+                 crops_per_track=5,
+                 num_workers=1,
                  ):
         """
         Initialize the TeamAssigner with specified team jersey descriptions.
+        `batch_size` is the number of player crops per CLIP forward pass.
+        With `track_voting`, each track is classified once from up to
+        `crops_per_track` sampled crops (see `get_track_teams`) instead of
+        being reclassified every 50 frames. With `num_workers` > 1 and frames
+        from a FrameCache, frame ranges are assigned by a process pool
+        (see parallel_assignment.py).
         """
         self.team_colors = {}
-        self.player_team_dict = {}        
+        self.player_team_dict = {}
 
         self.team_1_class_name = team_1_class_name
         self.team_2_class_name = team_2_class_name
+        self.batch_size = batch_size
+        self.track_voting = track_voting
+        self.crops_per_track = crops_per_track
+        self.track_teams = {}
+        self.num_workers = num_workers
+
+        self.model = None
+        self.processor = None
+        self.text_embeddings = None
+
+    def __getstate__(self):
+        # Worker processes load their own model instead of unpickling one
+        state = self.__dict__.copy()
+        state.update(model=None, processor=None, text_embeddings=None)
+        return state
 
     def load_model(self):
         """
-        Loads the pre-trained vision model for jersey color classification.
+        Loads the pre-trained vision model for jersey color classification and
+        embeds the two team prompts once.
+        transformers is only imported here, so cached runs never import it.
         """
-        self.model = CLIPModel.from_pretrained("patrickjohncyh/fashion-clip")
-        self.processor = CLIPProcessor.from_pretrained("patrickjohncyh/fashion-clip")
+        if self.model is not None:
+            return
 
-    def get_player_color(self, frame, bbox):
-        """
-        Analyzes the jersey color of a player within the given bounding box.
-        """
-        image = frame[int(bbox[1]):int(bbox[3]), int(bbox[0]):int(bbox[2])]
+        import torch
+        from transformers import CLIPProcessor, CLIPModel
 
-        # Convert to PIL Image
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_image)
-        image = pil_image
+        self.model = CLIPModel.from_pretrained("patrickjohncyh/fashion-clip").eval()
+        self.processor = CLIPProcessor.from_pretrained("patrickjohncyh/fashion-clip")
 
         classes = [self.team_1_class_name, self.team_2_class_name]
+        with torch.no_grad():
+            text_inputs = self.processor(text=classes, return_tensors="pt", padding=True)
+            text_embeddings = self.model.get_text_features(**text_inputs)
+        self.text_embeddings = (text_embeddings / text_embeddings.norm(dim=-1, keepdim=True)).numpy()
+
+    @staticmethod
+    def crop_player(frame, bbox):
+        """
+        RGB crop of a player's bounding box, clipped to the frame (at least 1x1 pixel).
+        """
+        height, width = frame.shape[:2]
+        x1 = min(max(int(bbox[0]), 0), width - 1)
+        y1 = min(max(int(bbox[1]), 0), height - 1)
+        x2 = max(min(int(bbox[2]), width), x1 + 1)
+        y2 = max(min(int(bbox[3]), height), y1 + 1)
+        return cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2RGB)
 
-        inputs = self.processor(text=classes, images=image, return_tensors="pt", padding=True)
+    def embed_crops(self, crops):
+        """
+        Normalized CLIP image embeddings (N, D float32 array) of RGB player
+        crops, run through the image encoder `batch_size` at a time.
+        """
+        import torch
 
-        outputs = self.model(**inputs)
-        logits_per_image = outputs.logits_per_image
-        probs = logits_per_image.softmax(dim=1)
+        self.load_model()
+        embeddings = [np.zeros((0, self.text_embeddings.shape[1]), dtype=np.float32)]
+        for start in range(0, len(crops), self.batch_size):
+            with torch.no_grad():
+                image_inputs = self.processor(images=crops[start:start + self.batch_size], return_tensors="pt")
+                image_embeddings = self.model.get_image_features(**image_inputs)
+            embeddings.append((image_embeddings / image_embeddings.norm(dim=-1, keepdim=True)).numpy())
+        return np.concatenate(embeddings)
 
-        class_name = classes[probs.argmax(dim=1)[0]]
+    def classify_crops(self, crops):
+        """
+        Team ids (1 or 2) of RGB player crops: the crops' embeddings are
+        classified with one matrix product against the cached text embeddings.
+        """
+        if len(crops) == 0:
+            return np.empty(0, dtype=np.int64)
+        similarity = self.embed_crops(crops) @ self.text_embeddings.T
+        return similarity.argmax(axis=1).astype(np.int64) + 1
 
-        return class_name
+    def get_player_color(self, frame, bbox):
+        """
+        Analyzes the jersey color of a player within the given bounding box.
+        """
+        team_id = self.classify_crops([self.crop_player(frame, bbox)])[0]
+        return self.team_1_class_name if team_id == 1 else self.team_2_class_name
 
     def get_player_team(self, frame, player_bbox, player_id):
         """
@@ -67,32 +129,185 @@ class TeamAssigner:
         self.player_team_dict[player_id] = team_id
         return team_id
 
-    def get_player_teams_across_frames(self, video_frames, player_tracks, read_from_stub=False, stub_path=None):
+    @staticmethod
+    def crop_quality(player_tracks):
+        """
+        Quality of every track row of a TrackStore as a crop to classify: the
+        box area times the fraction of it not covered by another player's box.
+        """
+        bboxes = player_tracks.bboxes
+        areas = np.clip(bboxes[:, 2] - bboxes[:, 0], 0, None) * np.clip(bboxes[:, 3] - bboxes[:, 1], 0, None)
+        visible = np.ones(len(bboxes))
+        for frame in np.flatnonzero(np.diff(player_tracks.frame_offsets) > 1).tolist():
+            rows = player_tracks.frame_slice(frame)
+            boxes = bboxes[rows]
+            top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+            bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+            overlap = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+            np.fill_diagonal(overlap, 0)
+            visible[rows] = 1 - np.clip(overlap.max(axis=1) / np.maximum(areas[rows], 1e-9), 0, 1)
+        return areas * visible
+
+    def sample_track_crops(self, player_tracks):
+        """
+        Rows of a TrackStore to classify: each track's rows are split into up
+        to `crops_per_track` consecutive segments spread over its lifetime,
+        and the best-quality row of each segment is taken. Sorted by frame.
+        """
+        quality = self.crop_quality(player_tracks)
+        rows = []
+        for _, track_rows in player_tracks.iter_tracks():
+            for segment in np.array_split(track_rows, min(self.crops_per_track, len(track_rows))):
+                rows.append(segment[np.argmax(quality[segment])])
+        rows = np.array(rows, dtype=np.int64)
+        return rows[np.argsort(player_tracks.frames[rows], kind='stable')], quality
+
+    def get_track_teams(self, video_frames, player_tracks):
+        """
+        One team per track id, voted from the track's sampled crops (ties go
+        to the best-quality crop). Frames are walked once, up to the last
+        sampled frame, and CLIP runs once per sampled crop, so its cost grows
+        with the number of tracks instead of frames.
+        """
+        player_tracks = TrackStore.from_tracks(player_tracks)
+        rows, quality = self.sample_track_crops(player_tracks)
+        if len(rows) == 0:
+            return {}
+
+        # Crops are classified as soon as a batch is full, so at most one batch is held
+        sample_frames = player_tracks.frames[rows]
+        crops, teams = [], []
+        next_sample = 0
+        for frame_num, frame in enumerate(video_frames):
+            while next_sample < len(rows) and sample_frames[next_sample] == frame_num:
+                crops.append(self.crop_player(frame, player_tracks.bboxes[rows[next_sample]]))
+                next_sample += 1
+            if len(crops) >= self.batch_size:
+                teams.extend(self.classify_crops(crops).tolist())
+                crops = []
+            if next_sample == len(rows):
+                break
+        if crops:
+            teams.extend(self.classify_crops(crops).tolist())
+        teams = np.array(teams, dtype=np.int64)
+
+        # Majority vote per track; ties go to the team of the best-quality crop
+        track_ids, inverse = np.unique(player_tracks.track_ids[rows], return_inverse=True)
+        team_1_votes = np.bincount(inverse, weights=teams == 1, minlength=len(track_ids))
+        num_votes = np.bincount(inverse, minlength=len(track_ids))
+        best = np.lexsort((-quality[rows], inverse))
+        best_teams = teams[best[np.searchsorted(inverse[best], np.arange(len(track_ids)))]]
+        voted = np.where(2 * team_1_votes > num_votes, 1, np.where(2 * team_1_votes < num_votes, 2, best_teams))
+        track_teams = dict(zip(track_ids.tolist(), voted.tolist()))
+        return track_teams
+
+    def get_player_teams_across_frames(self, video_frames, player_tracks, read_from_stub=False, stub_path=None,
+                                       checkpoint_path=None, checkpoint_every=500):
         """
         Processes all video frames to assign teams to players, with optional caching.
+
+        `video_frames` may be a list or any iterable of frames; it is walked in
+        step with `player_tracks`, so frames are never indexed randomly.
+        Each player is classified on its first frame of every 50-frame window;
+        those crops are gathered across frames and players and classified
+        `batch_size` at a time, then the teams are filled in.
+        With `checkpoint_path`, assignments and the team cache are checkpointed
+        so an interrupted run resumes from the last checkpoint.
+        With `track_voting`, every track gets one team (see `get_track_teams`).
+        With `num_workers` > 1, frames opened from a FrameCache are split into
+        shards aligned to the 50-frame windows and assigned in parallel.
         """
         player_assignment = read_stub(read_from_stub, stub_path)
         if player_assignment is not None:
             if len(player_assignment) == len(video_frames):
                 return player_assignment
 
-        self.load_model()
+        if self.track_voting:
+            # The team is a per-track attribute, spread to every frame of the track
+            player_tracks = TrackStore.from_tracks(player_tracks)
+            self.track_teams = self.get_track_teams(video_frames, player_tracks)
+            player_assignment = [
+                {track_id: self.track_teams[track_id] for track_id in player_tracks.frame_arrays(frame)[0].tolist()}
+                for frame in range(len(player_tracks))
+            ]
+            if stub_path:
+                save_stub(stub_path, player_assignment)
+            return player_assignment
 
         player_assignment = []
-        for frame_num, player_track in enumerate(player_tracks):        
+        start_frame = 0
+        checkpoint = None
+        if checkpoint_path:
+            checkpoint = StageCheckpoint(checkpoint_path, every=checkpoint_every)
+            player_assignment, state, start_frame = checkpoint.load()
+            if state is not None:
+                self.player_team_dict = state
+
+        entry_dir = frame_cache_dir(video_frames) if self.num_workers > 1 else None
+        if self.num_workers > 1 and (entry_dir is None or len(open_frames(entry_dir)) != len(video_frames)):
+            print("TeamAssigner: parallel assignment needs the frames of a whole FrameCache entry "
+                  "(--frame_cache); assigning teams in one process")
+            entry_dir = None
+        if entry_dir is not None:
+            # Shards start on window boundaries, where the team cache is empty: a checkpoint
+            # left mid-window by a single-process run resumes from the start of that window
+            start_frame -= start_frame % RESET_INTERVAL
+            del player_assignment[start_frame:]
+            self.player_team_dict = {}
+            for shard_assignment in assign_teams_parallel(self, entry_dir, player_tracks, start_frame,
+                                                          self.num_workers):
+                player_assignment.extend(shard_assignment)
+                if checkpoint:
+                    checkpoint.update(player_assignment)
+            if stub_path:
+                save_stub(stub_path, player_assignment)
+            if checkpoint:
+                checkpoint.clear()
+            return player_assignment
+
+        pending_crops = []    # crops waiting for the next batch
+        pending_players = {}  # player_id -> index in pending_crops, current window
+        unresolved = []       # (frame_num, player_id, index in pending_crops)
+
+        def classify_pending():
+            teams = self.classify_crops(pending_crops).tolist()
+            for frame_num, player_id, index in unresolved:
+                player_assignment[frame_num][player_id] = teams[index]
+            for player_id, index in pending_players.items():
+                self.player_team_dict[player_id] = teams[index]
+            pending_crops.clear()
+            pending_players.clear()
+            unresolved.clear()
+
+        frames_and_tracks = zip(skip_frames(video_frames, start_frame), player_tracks[start_frame:])
+        for frame_num, (frame, player_track) in enumerate(frames_and_tracks, start=start_frame):
             player_assignment.append({})
 
-            if frame_num % 50 == 0:
+            if frame_num % RESET_INTERVAL == 0:
                 self.player_team_dict = {}
+                pending_players.clear()
 
             for player_id, track in player_track.items():
-                team = self.get_player_team(
-                    video_frames[frame_num],   
-                    track['bbox'],
-                    player_id
-                )
-                player_assignment[frame_num][player_id] = team
-
-        save_stub(stub_path, player_assignment)
+                if player_id in self.player_team_dict:
+                    player_assignment[frame_num][player_id] = self.player_team_dict[player_id]
+                    continue
+                if player_id not in pending_players:
+                    pending_players[player_id] = len(pending_crops)
+                    pending_crops.append(self.crop_player(frame, track['bbox']))
+                unresolved.append((frame_num, player_id, pending_players[player_id]))
+
+            if len(pending_crops) >= self.batch_size:
+                classify_pending()
+                # Every frame so far is resolved: safe to checkpoint
+                if checkpoint:
+                    checkpoint.update(player_assignment, self.player_team_dict)
+
+        if pending_crops:
+            classify_pending()
+
+        if stub_path:
+            save_stub(stub_path, player_assignment)
+        if checkpoint:
+            checkpoint.clear()
 
         return player_assignment
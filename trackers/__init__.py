@@ -1,2 +1,3 @@
 from .player_tracker import PlayerTracker
 from .ball_tracker import BallTracker
+from .online_ball_tracker import OnlineBallTracker
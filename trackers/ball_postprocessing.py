@@ -0,0 +1,143 @@
+"""
+ball_postprocessing.py
+
+Array operations behind the ball tracker's per-video post-processing.
+
+Ball tracks hold at most one box per frame, so the whole video fits in one
+(frames, 4) bbox array with NaN rows for frames without a ball. Candidate
+selection, outlier removal and interpolation work on such arrays instead of
+walking the per-frame dicts in Python.
+"""
+
+from itertools import chain
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BALL_TRACK_ID = 1
+_NO_BBOX = [np.nan] * 4
+_NO_TRACK = {'bbox': _NO_BBOX}
+
+
+def ball_bbox_array(ball_positions: List[Dict[int, Dict[str, Any]]]) -> np.ndarray:
+    """
+    (frames, 4) float array of ball bboxes, NaN where there is no ball.
+    """
+    rows = [(frame.get(BALL_TRACK_ID) or _NO_TRACK).get('bbox') or _NO_BBOX for frame in ball_positions]
+    return np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=4 * len(rows)).reshape(-1, 4)
+
+
+def ball_positions_from_array(bboxes: np.ndarray) -> List[Dict[int, Dict[str, List[float]]]]:
+    """
+    Per-frame ball tracks from a (frames, 4) bbox array with NaN rows.
+    """
+    present = ~np.isnan(bboxes).any(axis=1)
+    return [{BALL_TRACK_ID: {'bbox': bbox}} if has_ball else {}
+            for has_ball, bbox in zip(present.tolist(), bboxes.tolist())]
+
+
+def best_detection_per_frame(frame_indices: np.ndarray, confidence: np.ndarray, num_frames: int) -> np.ndarray:
+    """
+    Index of the most confident detection of every frame (-1 without any),
+    given the frame of each detection. Ties keep the first detection.
+    """
+    best = np.full(num_frames, -1, dtype=np.int64)
+    if len(frame_indices) == 0:
+        return best
+    order = np.lexsort((-confidence, frame_indices))
+    sorted_frames = frame_indices[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_frames[1:] != sorted_frames[:-1]
+    best[sorted_frames[first]] = order[first]
+    return best
+
+
+def _distances(points: np.ndarray, origin: np.ndarray) -> np.ndarray:
+    offset = points - origin
+    return np.sqrt(offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1])
+
+
+def _first_within_reach(points: np.ndarray, frames: np.ndarray, anchor: int, begin: int,
+                        max_dist_per_frame: float) -> int:
+    """
+    First detection from `begin` on close enough to detection `anchor` for
+    the frames between them, searched in growing windows.
+    """
+    size = 64
+    while begin < len(points):
+        end = min(begin + size, len(points))
+        reachable = _distances(points[begin:end], points[anchor]) <= max_dist_per_frame * (frames[begin:end] - frames[anchor])
+        hits = np.flatnonzero(reachable)
+        if len(hits):
+            return begin + int(hits[0])
+        begin = end
+        size *= 2
+    return len(points)
+
+
+def find_wrong_detections(bboxes: np.ndarray, max_dist_per_frame: float = 25) -> np.ndarray:
+    """
+    Boolean mask of frames whose ball moved farther from the last accepted
+    ball than `max_dist_per_frame` times the frames between them.
+
+    Consecutive detections are tested all at once. Only at a rejection does
+    the last accepted detection stay the anchor, and the following
+    detections are tested against it until one is within reach.
+    """
+    rejected = np.zeros(len(bboxes), dtype=bool)
+    detected = np.flatnonzero(~np.isnan(bboxes[:, 0]))
+    if len(detected) < 2:
+        return rejected
+
+    points = bboxes[detected, :2]
+    step = points[1:] - points[:-1]
+    step_lengths = np.sqrt(step[:, 0] * step[:, 0] + step[:, 1] * step[:, 1])
+    failures = np.flatnonzero(step_lengths > max_dist_per_frame * np.diff(detected)) + 1
+
+    # Detections before `start` are settled; pairs from `start - 1` on are both accepted
+    start = 1
+    while True:
+        i = np.searchsorted(failures, start)
+        if i == len(failures):
+            break
+        first_rejected = int(failures[i])
+        anchor = first_rejected - 1
+        accepted = _first_within_reach(points, detected, anchor, first_rejected + 1, max_dist_per_frame)
+        rejected[detected[first_rejected:accepted]] = True
+        start = accepted + 1
+
+    return rejected
+
+
+def missing_run_lengths(present: np.ndarray) -> np.ndarray:
+    """
+    For every frame, the length of the run of missing frames it belongs to
+    (0 for frames that are present).
+    """
+    missing = ~present
+    edges = np.diff(np.concatenate(([0], missing.astype(np.int8), [0])))
+    run_lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    lengths = np.zeros(len(present), dtype=np.int64)
+    lengths[missing] = np.repeat(run_lengths, run_lengths)
+    return lengths
+
+
+def interpolate_bboxes(bboxes: np.ndarray, max_gap: Optional[int] = None) -> np.ndarray:
+    """
+    Linearly interpolates the NaN rows of a (frames, 4) bbox array, holding
+    the first / last box before / after the first / last detection. Runs of
+    more than `max_gap` missing frames are left missing.
+    """
+    present = ~np.isnan(bboxes).any(axis=1)
+    if not present.any():
+        return bboxes.copy()
+
+    frames = np.arange(len(bboxes))
+    known = np.flatnonzero(present)
+    interpolated = np.empty_like(bboxes, dtype=np.float64)
+    for column in range(bboxes.shape[1]):
+        interpolated[:, column] = np.interp(frames, known, bboxes[known, column])
+
+    if max_gap is not None:
+        interpolated[missing_run_lengths(present) > max_gap] = np.nan
+    return interpolated
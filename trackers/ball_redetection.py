@@ -0,0 +1,57 @@
+"""
+ball_redetection.py
+
+Crop geometry for the ball tracker's high-resolution second stage.
+
+The ball is a few pixels wide once a full frame is downscaled to the model
+input size. On frames where it was missed or detected with low confidence,
+the second stage runs the model on native-resolution crops instead: one
+window around the predicted ball position, or overlapping tiles covering
+the frame when there is no prediction.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def roi_window(center: Tuple[float, float], frame_shape: Tuple[int, ...], size: int) -> Tuple[int, int]:
+    """
+    Top-left corner of a `size` x `size` window centered on `center`, kept inside the frame.
+    """
+    height, width = frame_shape[:2]
+    x0 = int(round(center[0] - size / 2))
+    y0 = int(round(center[1] - size / 2))
+    return int(np.clip(x0, 0, max(width - size, 0))), int(np.clip(y0, 0, max(height - size, 0)))
+
+
+def _tile_starts(length: int, size: int, overlap: float) -> List[int]:
+    if length <= size:
+        return [0]
+    step = size * (1 - overlap)
+    count = int(np.ceil((length - size) / step)) + 1
+    return np.linspace(0, length - size, count).round().astype(int).tolist()
+
+
+def tile_windows(frame_shape: Tuple[int, ...], size: int, overlap: float = 0.2) -> List[Tuple[int, int]]:
+    """
+    Top-left corners of overlapping `size` x `size` tiles covering the frame.
+    """
+    height, width = frame_shape[:2]
+    return [(x0, y0) for y0 in _tile_starts(height, size, overlap) for x0 in _tile_starts(width, size, overlap)]
+
+
+def predict_center(recent_balls: List[Tuple[int, np.ndarray]], frame_num: int, max_age: int) -> Optional[np.ndarray]:
+    """
+    Ball center expected at `frame_num` from the last (at most two) detected
+    balls `(frame, center)`, extrapolated at constant velocity. None when
+    there is no detection from the last `max_age` frames.
+    """
+    if not recent_balls or frame_num - recent_balls[-1][0] > max_age:
+        return None
+    last_frame, last_center = recent_balls[-1]
+    if len(recent_balls) == 1:
+        return last_center
+    previous_frame, previous_center = recent_balls[-2]
+    velocity = (last_center - previous_center) / (last_frame - previous_frame)
+    return last_center + velocity * (frame_num - last_frame)
@@ -1,137 +1,298 @@
 import sys
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Any, Iterator, List, Dict, Optional, Tuple
 
 import numpy as np
-import pandas as pd
-from ultralytics import YOLO
-import supervision as sv  # Uses ByteTrack for tracking
 
 from utils.stubs_utils import save_stub, read_stub
+from utils.video_utils import iter_batches, skip_frames
+from utils.checkpoint import StageCheckpoint
+from model_backends import load_detector
+from .detections import results_to_detections
+from .ball_postprocessing import (
+    ball_bbox_array,
+    ball_positions_from_array,
+    best_detection_per_frame,
+    find_wrong_detections,
+    interpolate_bboxes,
+)
+from .ball_redetection import predict_center, roi_window, tile_windows
+from shot_detection import track_shots, shot_slices
 
 sys.path.append("..")
 
+if TYPE_CHECKING:
+    import supervision as sv
+    from shot_detection import Shots
+
 
 class BallTracker:
-    def __init__(self, model_path: str):
+    def __init__(
+        self,
+        model_path: str,
+        conf: float = 0.5,
+        roi_redetection: bool = False,
+        low_confidence: float = 0.6,
+        roi_size: int = 640,
+        tile_overlap: float = 0.2,
+        max_prediction_age: int = 15
+    ):
         """
         Initializes the YOLO-based ball tracker.
 
         Args:
-            model_path (str): Path to the trained YOLO model.
+            model_path (str): Path to the trained YOLO model (.pt or exported .onnx).
+            conf (float): Detection confidence threshold.
+            roi_redetection (bool): Re-detect missed or low-confidence balls on
+                native-resolution crops (see `redetect_balls`).
+            low_confidence (float): Balls below this confidence are re-detected.
+            roi_size (int): Side of the crops, in frame pixels.
+            tile_overlap (float): Overlap of the tiles used without a prediction.
+            max_prediction_age (int): Frames after the last ball during which
+                its position is still predicted; later the frame is tiled.
+        """
+        self.model_path = model_path
+        self._model = None
+        self.conf = conf
+        self.roi_redetection = roi_redetection
+        self.low_confidence = low_confidence
+        self.roi_size = roi_size
+        self.tile_overlap = tile_overlap
+        self.max_prediction_age = max_prediction_age
+        self.recent_balls = []  # last (frame, center) detections, for ROI prediction
+
+    @property
+    def model(self):
         """
-        self.model = YOLO(model_path)
+        YOLO model, loaded on first use so cached runs never load it.
+        """
+        if self._model is None:
+            self._model = load_detector(self.model_path, task="detect")
+        return self._model
 
-    def detect_frames(self, frames: List, conf: float = 0.5, batch_size: int = 20):
+    def detect_frames(self, frames: List, conf: Optional[float] = None, batch_size: int = 20) -> Iterator["sv.Detections"]:
         """
         Detects objects in video frames using YOLO in batches.
+
+        Yields one compact `sv.Detections` per frame (balls only); each
+        batch's Results objects are released as soon as they are converted.
         """
-        detections = []
-        for i in range(0, len(frames), batch_size):
-            batch = frames[i:i + batch_size]
+        if conf is None:
+            conf = self.conf
+        for batch in iter_batches(frames, batch_size):
             preds = self.model.predict(batch, conf=conf)
-            detections.extend(preds)
-        return detections
+            detections = results_to_detections(preds, "Ball")
+            del preds
+            yield from detections
+
+    def best_balls(self, detections: List["sv.Detections"]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Most confident ball of each frame, for a list of frames at once (one
+        argmax per frame over the concatenated detections). Returns a
+        (frames, 4) bbox array with NaN rows and the confidences (0 if none).
+        """
+        bboxes = np.full((len(detections), 4), np.nan)
+        best_confidence = np.zeros(len(detections))
+        counts = [len(detection) for detection in detections]
+        if sum(counts) == 0:
+            return bboxes, best_confidence
+
+        frame_indices = np.repeat(np.arange(len(detections)), counts)
+        confidence = np.concatenate([detection.confidence for detection in detections])
+        xyxy = np.concatenate([detection.xyxy for detection in detections])
+
+        best = best_detection_per_frame(frame_indices, confidence, len(detections))
+        found = best >= 0
+        bboxes[found] = xyxy[best[found]]
+        best_confidence[found] = confidence[best[found]]
+        return bboxes, best_confidence
+
+    def select_balls(self, detections: List["sv.Detections"]) -> List[Dict[int, Dict[str, List[float]]]]:
+        """
+        Keeps the most confident ball detection of each frame.
+        """
+        bboxes, _ = self.best_balls(detections)
+        return ball_positions_from_array(bboxes)
+
+    def _remember_balls(self, frame_num: int, bboxes: np.ndarray) -> None:
+        """
+        Keeps the last two detected ball centers of a batch starting at `frame_num`.
+        """
+        for i in np.flatnonzero(~np.isnan(bboxes[:, 0]))[-2:].tolist():
+            center = np.array([(bboxes[i, 0] + bboxes[i, 2]) / 2, (bboxes[i, 1] + bboxes[i, 3]) / 2])
+            self.recent_balls = self.recent_balls[-1:] + [(frame_num + i, center)]
+
+    def redetect_balls(self, frame_num: int, frames: List[np.ndarray], bboxes: np.ndarray,
+                       confidence: np.ndarray) -> None:
+        """
+        Second stage for frames whose ball was missed or below `low_confidence`:
+        runs the model on a native-resolution window around the predicted ball,
+        or on overlapping tiles without a prediction, and keeps the crop
+        detection if it is more confident. Updates `bboxes` / `confidence` in place.
+
+        Predictions use the balls detected confidently up to each frame; all
+        crops of the batch go through the model together.
+        """
+        crops, owners, origins = [], [], []
+        for i, frame in enumerate(frames):
+            if confidence[i] >= self.low_confidence:
+                self._remember_balls(frame_num + i, bboxes[i:i + 1])
+                continue
+
+            center = predict_center(self.recent_balls, frame_num + i, self.max_prediction_age)
+            if center is not None:
+                windows = [roi_window(center, frame.shape, self.roi_size)]
+            else:
+                windows = tile_windows(frame.shape, self.roi_size, self.tile_overlap)
+            for x0, y0 in windows:
+                crops.append(frame[y0:y0 + self.roi_size, x0:x0 + self.roi_size])
+                owners.append(i)
+                origins.append((x0, y0))
+
+        if not crops:
+            return
+
+        crop_detections = []
+        for batch in iter_batches(crops, len(frames)):
+            preds = self.model.predict(batch, conf=self.conf)
+            crop_detections.extend(results_to_detections(preds, "Ball"))
+            del preds
+
+        # Back to frame coordinates
+        counts = [len(detection) for detection in crop_detections]
+        if sum(counts) == 0:
+            return
+        offsets = np.repeat(np.array(origins, dtype=np.float64), counts, axis=0)
+        xyxy = np.concatenate([detection.xyxy for detection in crop_detections]) + np.tile(offsets, 2)
+        crop_confidence = np.concatenate([detection.confidence for detection in crop_detections])
+        frame_indices = np.repeat(np.array(owners), counts)
+
+        best = best_detection_per_frame(frame_indices, crop_confidence, len(frames))
+        improved = np.flatnonzero((best >= 0) & (crop_confidence[np.maximum(best, 0)] > confidence))
+        bboxes[improved] = xyxy[best[improved]]
+        confidence[improved] = crop_confidence[best[improved]]
+
+    def track_batch(self, frame_num: int, frames: List[np.ndarray],
+                    detections: List["sv.Detections"]) -> List[Dict[int, Dict[str, List[float]]]]:
+        """
+        Ball tracks of a batch of frames starting at video frame `frame_num`,
+        given the full-frame detections of the batch.
+        """
+        bboxes, confidence = self.best_balls(detections)
+        if self.roi_redetection:
+            recent_balls = list(self.recent_balls)
+            self.redetect_balls(frame_num, frames, bboxes, confidence)
+            # Predictions for the next batch also use the re-detected balls
+            self.recent_balls = recent_balls
+        self._remember_balls(frame_num, bboxes)
+        return ball_positions_from_array(bboxes)
+
+    def get_tracking_state(self) -> Any:
+        """
+        Temporal state to checkpoint (recent balls used for ROI prediction).
+        """
+        return self.recent_balls
+
+    def set_tracking_state(self, state: Any) -> None:
+        """
+        Restores a state returned by `get_tracking_state`.
+        """
+        self.recent_balls = state
+
+    def reset_tracking_state(self) -> None:
+        """
+        Forgets the recent balls (e.g. at a cut).
+        """
+        self.recent_balls = []
 
     def get_object_tracks(
         self,
         frames: List,
         read_from_stub: bool = False,
-        stub_path: Optional[str] = None
+        stub_path: Optional[str] = None,
+        batch_size: int = 20,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_every: int = 500,
+        shots: Optional["Shots"] = None
     ) -> List[Dict[int, Dict[str, List[float]]]]:
         """
         Detects and tracks the 'Ball' object across frames using YOLO + ByteTrack.
+
+        Frames may be a list or any iterable (e.g. a streamed video); they are
+        consumed one batch at a time so only `batch_size` frames are held.
+        With `checkpoint_path`, progress is checkpointed every
+        `checkpoint_every` frames and an interrupted run resumes from there.
+        With `roi_redetection`, missed or low-confidence balls get a second,
+        high-resolution pass (see `redetect_balls`).
+        With `shots` (see shot_detection), non-court frames are skipped and
+        the temporal state is reset at every cut.
         """
         tracks = read_stub(read_from_stub, stub_path)
         if tracks is not None and len(tracks) == len(frames):
             return tracks
 
-        detections = self.detect_frames(frames)
         tracks = []
+        start_frame = 0
+        checkpoint = None
+        if checkpoint_path:
+            checkpoint = StageCheckpoint(checkpoint_path, every=checkpoint_every)
+            tracks, state, start_frame = checkpoint.load()
+            if state is not None:
+                self.set_tracking_state(state)
 
-        for frame_num, detection in enumerate(detections):
-            class_names = detection.names
-            class_id_map = {v: k for k, v in class_names.items()}
-
-            sv_detections = sv.Detections.from_ultralytics(detection)
-            tracks.append({})
-            chosen_bbox = None
-            max_confidence = 0
-
-            for detection_item in sv_detections:
-                bbox = detection_item[0].tolist()
-                confidence = detection_item[2]
-                cls_id = detection_item[3]
+        frame_num = start_frame
+        for batch in iter_batches(skip_frames(frames, start_frame), batch_size):
+            def track_run(begin, end):
+                detections = list(self.detect_frames(batch[begin:end], batch_size=batch_size))
+                return self.track_batch(frame_num + begin, batch[begin:end], detections)
+            tracks.extend(track_shots(shots, self, frame_num, len(batch), track_run, dict))
+            frame_num += len(batch)
 
-                if cls_id == class_id_map.get("Ball"):
-                    if confidence > max_confidence:
-                        max_confidence = confidence
-                        chosen_bbox = bbox
-
-            if chosen_bbox is not None:
-                tracks[frame_num][1] = {'bbox': chosen_bbox}
+            if checkpoint:
+                checkpoint.update(tracks, self.get_tracking_state())
 
         if stub_path:
             save_stub(stub_path, tracks)
+        if checkpoint:
+            checkpoint.clear()
 
         return tracks
 
     def remove_wrong_detections(
         self, 
         ball_positions: List[Dict[int, Dict[str, List[float]]]], 
-        max_dist_per_frame: float = 25
+        max_dist_per_frame: float = 25,
+        shots: Optional["Shots"] = None
     ) -> List[Dict[int, Dict[str, List[float]]]]:
         """
-        Removes implausible ball detections based on motion constraints.
+        Removes implausible ball detections based on motion constraints: a ball
+        farther from the last accepted ball than `max_dist_per_frame` times the
+        frame gap is dropped. Runs on the whole video as one bbox array, or
+        shot by shot with `shots`.
         """
-        last_good_frame_index = -1
-
-        for i in range(len(ball_positions)):
-            current_bbox = ball_positions[i].get(1, {}).get('bbox', [])
-            if not current_bbox:
-                continue
-
-            if last_good_frame_index == -1:
-                last_good_frame_index = i
-                continue
-
-            last_bbox = ball_positions[last_good_frame_index].get(1, {}).get('bbox', [])
-            frame_gap = i - last_good_frame_index
-            allowed_distance = max_dist_per_frame * frame_gap
-
-            if np.linalg.norm(np.array(current_bbox[:2]) - np.array(last_bbox[:2])) > allowed_distance:
-                ball_positions[i] = {}
-            else:
-                last_good_frame_index = i
+        bboxes = ball_bbox_array(ball_positions)
+        wrong_frames = np.zeros(len(bboxes), dtype=bool)
+        for shot in shot_slices(shots, len(bboxes)):
+            wrong_frames[shot] = find_wrong_detections(bboxes[shot], max_dist_per_frame)
+        for i in np.flatnonzero(wrong_frames).tolist():
+            ball_positions[i] = {}
 
         return ball_positions
 
     def interpolate_ball_positions(
         self, 
-        ball_positions: List[Dict[int, Dict[str, List[float]]]]
+        ball_positions: List[Dict[int, Dict[str, List[float]]]],
+        max_gap: Optional[int] = None,
+        shots: Optional["Shots"] = None
     ) -> List[Dict[int, Dict[str, List[float]]]]:
         """
-        Fills in missing ball detections by interpolating and backfilling bounding boxes.
+        Fills in missing ball detections by interpolating bounding boxes
+        (`np.interp` over the whole video), holding the first / last box at
+        the ends. Gaps of more than `max_gap` frames (e.g. a replay or a
+        close-up) are left empty instead of inventing a ball across them.
+        With `shots`, each shot is interpolated on its own, so no ball is
+        carried across a cut.
         """
-
-        # On remplace None par une liste de np.nan de la bonne taille
-        bboxes = []
-        for frame in ball_positions:
-            bbox = frame.get(1, {}).get('bbox', None)
-            if bbox is None:
-                bboxes.append([np.nan, np.nan, np.nan, np.nan])  # 4 valeurs nan
-            else:
-                bboxes.append(bbox)
-
-        df = pd.DataFrame(bboxes)
-
-        # Interpolation et remplissage
-        df = df.interpolate(limit_direction='both').bfill()
-
-        # Reconstruction du format initial
-        interpolated = []
-        for row in df.to_numpy().tolist():
-            if any(pd.isna(coord) for coord in row):
-                interpolated.append({})
-            else:
-                interpolated.append({1: {'bbox': row}})
-        return interpolated
+        bboxes = ball_bbox_array(ball_positions)
+        for shot in shot_slices(shots, len(bboxes)):
+            bboxes[shot] = interpolate_bboxes(bboxes[shot], max_gap)
+        return ball_positions_from_array(bboxes)
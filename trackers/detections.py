@@ -0,0 +1,43 @@
+"""
+detections.py
+
+Conversion of ultralytics `Results` into compact per-frame detections.
+
+Each `Results` object keeps a reference to its input image plus device
+tensors, so holding them for a whole video roughly doubles peak memory.
+Batches are converted to small `sv.Detections` (NumPy boxes, confidences and
+class ids, filtered to one class) as soon as they come back from the model,
+and the `Results` are dropped.
+"""
+
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import supervision as sv
+
+
+def results_to_detections(results: List, class_name: str) -> List["sv.Detections"]:
+    """
+    Converts a batch of ultralytics Results into one sv.Detections per frame,
+    keeping only detections of `class_name`.
+    """
+    import supervision as sv
+
+    detections = []
+    for result in results:
+        class_id = {name: idx for idx, name in result.names.items()}.get(class_name)
+        boxes = result.boxes
+
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+        confidence = boxes.conf.cpu().numpy().astype(np.float32)
+        class_ids = boxes.cls.cpu().numpy().astype(int)
+
+        keep = class_ids == class_id
+        detections.append(sv.Detections(
+            xyxy=xyxy[keep],
+            confidence=confidence[keep],
+            class_id=class_ids[keep],
+        ))
+    return detections
@@ -0,0 +1,83 @@
+"""
+motion_propagation.py
+
+Constant-velocity propagation of player boxes between keyframes.
+
+Players move a few pixels per frame, so boxes between two detected keyframes
+can be predicted instead of detected. Each track keeps its last detected box,
+a per-frame velocity (alpha-beta filter: the velocity is corrected by the
+innovation at every keyframe) and a smoothed velocity error, which gives an
+uncertainty that grows with the number of frames since the last detection.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+
+class ConstantVelocityPropagator:
+    """
+    Per-track constant-velocity state updated on keyframes and queried in between.
+    """
+
+    def __init__(self, beta: float = 0.5, initial_error: float = 2.0):
+        """
+        `beta` is the velocity correction gain, `initial_error` the assumed
+        velocity error (pixels / frame) of a newly seen track.
+        """
+        self.beta = beta
+        self.initial_error = initial_error
+        self.tracks = {}
+        self.num_keyframes = 0
+
+    def update(self, frame_tracks: Dict[int, Dict[str, Any]], frame_num: int) -> None:
+        """
+        Corrects the motion state with the tracks detected at keyframe `frame_num`.
+        Tracks missing from the keyframe are dropped, as the tracker dropped them.
+        """
+        states = {}
+        for track_id, track in frame_tracks.items():
+            bbox = np.asarray(track["bbox"], dtype=np.float64)
+            previous = self.tracks.get(track_id)
+            if previous is None:
+                states[track_id] = {
+                    "frame": frame_num,
+                    "bbox": bbox,
+                    "velocity": np.zeros(4),
+                    "error": self.initial_error,
+                }
+                continue
+
+            gap = max(frame_num - previous["frame"], 1)
+            predicted = previous["bbox"] + previous["velocity"] * gap
+            innovation = (bbox - predicted) / gap
+            center_error = float(np.hypot(innovation[0] + innovation[2], innovation[1] + innovation[3]) / 2)
+            states[track_id] = {
+                "frame": frame_num,
+                "bbox": bbox,
+                "velocity": previous["velocity"] + self.beta * innovation,
+                "error": (1 - self.beta) * previous["error"] + self.beta * center_error,
+            }
+
+        self.tracks = states
+        self.num_keyframes += 1
+
+    def predict(self, frame_num: int) -> Dict[int, Dict[str, list]]:
+        """
+        Propagated tracks at `frame_num`, in the stage's output format.
+        """
+        return {
+            track_id: {"bbox": (state["bbox"] + state["velocity"] * (frame_num - state["frame"])).tolist()}
+            for track_id, state in self.tracks.items()
+        }
+
+    def uncertainty(self, frame_num: int) -> float:
+        """
+        Largest expected drift at `frame_num` over all tracks, as a fraction
+        of the box height.
+        """
+        drift = 0.0
+        for state in self.tracks.values():
+            height = max(state["bbox"][3] - state["bbox"][1], 1.0)
+            drift = max(drift, (frame_num - state["frame"]) * state["error"] / height)
+        return drift
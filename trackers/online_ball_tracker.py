@@ -0,0 +1,194 @@
+"""
+online_ball_tracker.py
+
+Online ball tracking with a constant-acceleration Kalman filter.
+
+`BallTracker` needs the whole video before it can drop outliers and fill
+gaps. `OnlineBallTracker` produces each frame's ball as soon as the frame's
+detections are known, in constant time. The filter predicts the ball center,
+only detections within a Mahalanobis gate of the prediction can update it,
+and the prediction is reported for a few frames when the ball is not seen.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from .ball_tracker import BallTracker
+
+if TYPE_CHECKING:
+    import supervision as sv
+
+# 99% quantile of the chi-square distribution with 2 degrees of freedom
+CHI2_2DOF_99 = 9.21
+
+
+class ConstantAccelerationKalman:
+    """
+    Kalman filter on the ball center with state (x, vx, ax, y, vy, ay), one
+    step per frame, driven by white-noise jerk.
+    """
+
+    def __init__(self, center: np.ndarray, measurement_std: float = 3.0, jerk_std: float = 2.0,
+                 initial_velocity_std: float = 30.0, initial_acceleration_std: float = 5.0):
+        axis_transition = np.array([[1.0, 1.0, 0.5],
+                                    [0.0, 1.0, 1.0],
+                                    [0.0, 0.0, 1.0]])
+        self.F = np.kron(np.eye(2), axis_transition)
+        jerk_gain = np.array([1 / 6, 1 / 2, 1.0])
+        self.Q = np.kron(np.eye(2), np.outer(jerk_gain, jerk_gain) * jerk_std ** 2)
+        self.H = np.zeros((2, 6))
+        self.H[0, 0] = self.H[1, 3] = 1.0
+        self.R = np.eye(2) * measurement_std ** 2
+
+        self.x = np.zeros(6)
+        self.x[[0, 3]] = center
+        self.P = np.kron(np.eye(2), np.diag([measurement_std ** 2,
+                                             initial_velocity_std ** 2,
+                                             initial_acceleration_std ** 2]))
+
+    @property
+    def center(self) -> np.ndarray:
+        return self.x[[0, 3]]
+
+    def predict(self) -> None:
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+    def mahalanobis(self, centers: np.ndarray) -> np.ndarray:
+        """
+        Squared Mahalanobis distances of (N, 2) measured centers to the prediction.
+        """
+        innovations = centers - self.center
+        S = self.H @ self.P @ self.H.T + self.R
+        return np.einsum('ni,ij,nj->n', innovations, np.linalg.inv(S), innovations)
+
+    def update(self, center: np.ndarray) -> None:
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (center - self.center)
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+
+class OnlineBallTracker(BallTracker):
+    """
+    Drop-in replacement of `BallTracker` whose output needs no full-video
+    post-processing (`remove_wrong_detections` / `interpolate_ball_positions`).
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        conf: float = 0.5,
+        gate: float = CHI2_2DOF_99,
+        max_coast: int = 10,
+        init_confidence: float = 0.6,
+        size_smoothing: float = 0.3,
+        **kwargs
+    ):
+        """
+        Args:
+            gate (float): Squared Mahalanobis distance above which a detection
+                cannot update the track.
+            max_coast (int): Frames the predicted ball is reported without
+                a gated detection before the track is dropped.
+            init_confidence (float): Minimum confidence to start a new track.
+            size_smoothing (float): Smoothing factor of the box size.
+        Other arguments are those of `BallTracker`.
+        """
+        super().__init__(model_path, conf=conf, **kwargs)
+        self.gate = gate
+        self.max_coast = max_coast
+        self.init_confidence = init_confidence
+        self.size_smoothing = size_smoothing
+        self.kalman = None
+        self.size = None
+        self.frames_since_update = 0
+
+    def _bbox(self) -> List[float]:
+        center = self.kalman.center
+        half = self.size / 2
+        return [center[0] - half[0], center[1] - half[1], center[0] + half[0], center[1] + half[1]]
+
+    def update(self, xyxy: np.ndarray, confidence: np.ndarray) -> Dict[int, Dict[str, List[float]]]:
+        """
+        Advances the track by one frame given that frame's ball candidates
+        ((N, 4) boxes and their confidences) and returns the frame's ball
+        (empty when there is no track).
+        """
+        xyxy = np.asarray(xyxy, dtype=np.float64)
+        confidence = np.asarray(confidence)
+        centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        sizes = xyxy[:, 2:] - xyxy[:, :2]
+
+        if self.kalman is not None:
+            self.kalman.predict()
+            self.frames_since_update += 1
+            if len(centers):
+                distances = self.kalman.mahalanobis(centers)
+                best = int(distances.argmin())
+                if distances[best] <= self.gate:
+                    self.kalman.update(centers[best])
+                    self.size = (1 - self.size_smoothing) * self.size + self.size_smoothing * sizes[best]
+                    self.frames_since_update = 0
+            if self.frames_since_update > self.max_coast:
+                self.kalman = None
+
+        if self.kalman is None:
+            confident = np.flatnonzero(confidence >= self.init_confidence)
+            if len(confident) == 0:
+                return {}
+            best = confident[int(confidence[confident].argmax())]
+            self.kalman = ConstantAccelerationKalman(centers[best])
+            self.size = sizes[best]
+            self.frames_since_update = 0
+
+        return {1: {'bbox': self._bbox()}}
+
+    def track_batch(self, frame_num: int, frames: List[np.ndarray],
+                    detections: List["sv.Detections"]) -> List[Dict[int, Dict[str, List[float]]]]:
+        """
+        Ball tracks of a batch of frames, updated frame by frame.
+
+        With `roi_redetection`, frames whose ball was missed or not confident
+        first go through `BallTracker.redetect_balls`, and a more confident
+        re-detected ball is added to the frame's candidates.
+        """
+        candidates = [(detection.xyxy, detection.confidence) for detection in detections]
+        if self.roi_redetection:
+            bboxes, confidence = self.best_balls(detections)
+            redetected, redetected_confidence = bboxes.copy(), confidence.copy()
+            recent_balls = list(self.recent_balls)
+            self.redetect_balls(frame_num, frames, redetected, redetected_confidence)
+            self.recent_balls = recent_balls
+            self._remember_balls(frame_num, redetected)
+
+            for i in np.flatnonzero(redetected_confidence > confidence).tolist():
+                xyxy, frame_confidence = candidates[i]
+                candidates[i] = (np.vstack([xyxy, redetected[i:i + 1]]),
+                                 np.append(frame_confidence, redetected_confidence[i]))
+
+        return [self.update(xyxy, confidence) for xyxy, confidence in candidates]
+
+    def get_tracking_state(self) -> Any:
+        """
+        Temporal state to checkpoint (recent balls for ROI prediction, the
+        filter and the box size).
+        """
+        return super().get_tracking_state(), self.kalman, self.size, self.frames_since_update
+
+    def set_tracking_state(self, state: Any) -> None:
+        """
+        Restores a state returned by `get_tracking_state`.
+        """
+        recent_balls, self.kalman, self.size, self.frames_since_update = state
+        super().set_tracking_state(recent_balls)
+
+    def reset_tracking_state(self) -> None:
+        """
+        Drops the ball track (e.g. at a cut).
+        """
+        super().reset_tracking_state()
+        self.kalman = None
+        self.size = None
+        self.frames_since_update = 0
@@ -1,70 +1,246 @@
 import sys
-from typing import List, Dict, Optional
-
-from ultralytics import YOLO
-import supervision as sv  # Uses ByteTrack for tracking
+import importlib
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Dict, Optional, Sequence
 
 from utils.stubs_utils import save_stub, read_stub
+from utils.video_utils import iter_batches, skip_frames
+from utils.checkpoint import StageCheckpoint
+from model_backends import load_detector
+from .detections import results_to_detections
+from .motion_propagation import ConstantVelocityPropagator
+from shot_detection import track_shots
 
 sys.path.append("..")
 
+if TYPE_CHECKING:
+    import supervision as sv  # Uses ByteTrack for tracking
+    from shot_detection import Shots
+
+
+# Classes that number ByteTrack tracks with class-level counters in supervision
+# releases before per-instance `IdCounter`s
+_TRACK_COUNTER_CLASSES = (
+    ("supervision.tracker.byte_tracker.basetrack", "BaseTrack"),
+    ("supervision.tracker.byte_tracker.single_object_track", "STrack"),
+    ("supervision.tracker.byte_tracker.core", "STrack"),
+)
+
+
+def class_track_counters() -> Dict[Any, int]:
+    """
+    Values of supervision's class-level track id counters, keyed by
+    (class, attribute). Pickling a ByteTrack does not save them, so they are
+    checkpointed next to it. Empty when ids are counted per tracker instance.
+    """
+    counters = {}
+    for module_name, class_name in _TRACK_COUNTER_CLASSES:
+        try:
+            cls = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            continue
+        for name, value in vars(cls).items():
+            if name.endswith("count") and isinstance(value, int):
+                counters[(cls, name)] = value
+    return counters
+
 
 class PlayerTracker:
-    def __init__(self, model_path: str):
+    def __init__(
+        self,
+        model_path: str,
+        conf: float = 0.5,
+        keyframe_interval: int = 1,
+        max_uncertainty: Optional[float] = None
+    ):
         """
         Initializes the PlayerTracker with a YOLO model and ByteTrack tracker.
+
+        With `keyframe_interval` N > 1 players are only detected every N
+        frames and boxes in between are propagated with a constant-velocity
+        model. With `max_uncertainty`, a frame is also detected as soon as the
+        expected drift of a propagated box exceeds that fraction of its height.
+        """
+        self.model_path = model_path
+        self._model = None
+        self._tracker = None
+        self.conf = conf
+        self.keyframe_interval = max(int(keyframe_interval), 1)
+        self.max_uncertainty = max_uncertainty
+        self.propagator = ConstantVelocityPropagator()
+        # Added to ByteTrack's ids so tracks restarted at a cut get new ids
+        self.track_id_offset = 0
+        self.max_track_id = 0
+
+    @property
+    def model(self):
+        """
+        YOLO model, loaded on first use so cached runs never load it.
         """
-        self.model = YOLO(model_path)
-        self.tracker = sv.ByteTrack()
+        if self._model is None:
+            self._model = load_detector(self.model_path, task="detect")
+        return self._model
 
-    def detect_frames(self, frames: List, conf: float = 0.5, batch_size: int = 20):
+    @property
+    def tracker(self) -> "sv.ByteTrack":
+        """
+        ByteTrack tracker, created on first use.
+        """
+        if self._tracker is None:
+            import supervision as sv
+            self._tracker = sv.ByteTrack()
+        return self._tracker
+
+    @tracker.setter
+    def tracker(self, tracker: "sv.ByteTrack") -> None:
+        self._tracker = tracker
+
+    @property
+    def keyframe_mode(self) -> bool:
+        return self.keyframe_interval > 1 or self.max_uncertainty is not None
+
+    def detect_frames(self, frames: List, conf: Optional[float] = None, batch_size: int = 20) -> Iterator["sv.Detections"]:
         """
         Detects players in video frames using YOLO in batches.
+
+        Yields one compact `sv.Detections` per frame (players only); each
+        batch's Results objects are released as soon as they are converted.
         """
-        detections = []
-        for i in range(0, len(frames), batch_size):
-            batch = frames[i:i + batch_size]
+        if conf is None:
+            conf = self.conf
+        for batch in iter_batches(frames, batch_size):
             preds = self.model.predict(batch, conf=conf)
-            detections.extend(preds)
-        return detections
+            detections = results_to_detections(preds, "player")
+            del preds
+            yield from detections
+
+    def track_detections(self, detection: "sv.Detections") -> Dict[int, Dict[str, List[float]]]:
+        """
+        Feeds one frame of player detections to ByteTrack and returns its tracks.
+        """
+        tracked = self.tracker.update_with_detections(detection)
+
+        frame_tracks = {}
+        for bbox, track_id in zip(tracked.xyxy.tolist(), tracked.tracker_id.tolist()):
+            track_id += self.track_id_offset
+            frame_tracks[track_id] = {"bbox": bbox}
+            self.max_track_id = max(self.max_track_id, track_id)
+        return frame_tracks
+
+    def track_batch(
+        self,
+        frame_num: int,
+        batch_len: int,
+        detect: Callable[[Sequence[int]], List["sv.Detections"]]
+    ) -> List[Dict[int, Dict[str, List[float]]]]:
+        """
+        Tracks a batch of `batch_len` frames starting at video frame `frame_num`.
+
+        `detect(indices)` returns the detections of the given batch indices. In
+        keyframe mode the scheduled keyframes of the batch are detected
+        together, extra keyframes are detected one by one when the propagated
+        boxes become too uncertain, and the other frames are propagated. The
+        first frame after a reset (start or cut) is always detected, so a shot
+        never starts with propagated, empty tracks.
+        """
+        if not self.keyframe_mode:
+            return [self.track_detections(detection) for detection in detect(range(batch_len))]
+
+        scheduled = [i for i in range(batch_len) if (frame_num + i) % self.keyframe_interval == 0]
+        keyframe_detections = dict(zip(scheduled, detect(scheduled))) if scheduled else {}
+
+        batch_tracks = []
+        for i in range(batch_len):
+            detection = keyframe_detections.get(i)
+            if detection is None and (self.propagator.num_keyframes == 0 or (
+                    self.max_uncertainty is not None
+                    and self.propagator.uncertainty(frame_num + i) > self.max_uncertainty)):
+                detection = detect([i])[0]
+
+            if detection is not None:
+                frame_tracks = self.track_detections(detection)
+                self.propagator.update(frame_tracks, frame_num + i)
+            else:
+                frame_tracks = self.propagator.predict(frame_num + i)
+            batch_tracks.append(frame_tracks)
+        return batch_tracks
+
+    def get_tracking_state(self) -> Any:
+        """
+        Temporal state to checkpoint (ByteTrack with supervision's class-level
+        id counters, the keyframe propagator and the track id offset).
+        """
+        tracker = self.tracker
+        return tracker, class_track_counters(), self.propagator, self.track_id_offset, self.max_track_id
+
+    def set_tracking_state(self, state: Any) -> None:
+        """
+        Restores a state returned by `get_tracking_state`, so a resumed
+        process keeps numbering tracks where the interrupted one stopped.
+        """
+        self.tracker, counters, self.propagator, self.track_id_offset, self.max_track_id = state
+        for (cls, name), value in counters.items():
+            setattr(cls, name, value)
+
+    def reset_tracking_state(self) -> None:
+        """
+        Starts tracking from scratch (e.g. at a cut); later tracks get new ids.
+        """
+        self._tracker = None
+        self.propagator = ConstantVelocityPropagator()
+        self.track_id_offset = self.max_track_id
 
     def get_object_tracks(
         self,
         frames: List,
         read_from_stub: bool = False,
-        stub_path: Optional[str] = None
+        stub_path: Optional[str] = None,
+        batch_size: int = 20,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_every: int = 500,
+        shots: Optional["Shots"] = None
     ) -> List[Dict[int, Dict[str, List[float]]]]:
         """
         Tracks player objects across video frames using ByteTrack.
+
+        Frames may be a list or any iterable (e.g. a streamed video); they are
+        consumed one batch at a time so only `batch_size` frames are held.
+        With `checkpoint_path`, progress and tracker state are checkpointed every
+        `checkpoint_every` frames and an interrupted run resumes from there.
+        In keyframe mode only keyframes are detected (see `track_batch`).
+        With `shots` (see shot_detection), non-court frames are skipped and
+        tracking restarts at every cut.
         """
         # Load cached tracks if available
         tracks = read_stub(read_from_stub, stub_path)
         if tracks is not None and len(tracks) == len(frames):
             return tracks
 
-        detections = self.detect_frames(frames)
         tracks = []
+        start_frame = 0
+        checkpoint = None
+        if checkpoint_path:
+            checkpoint = StageCheckpoint(checkpoint_path, every=checkpoint_every)
+            tracks, state, start_frame = checkpoint.load()
+            if state is not None:
+                self.set_tracking_state(state)
 
-        for frame_num, detection in enumerate(detections):
-            class_names = detection.names
-            class_id_map = {v: k for k, v in class_names.items()}
-
-            sv_detections = sv.Detections.from_ultralytics(detection)
-            tracked = self.tracker.update_with_detections(sv_detections)
-
-            frame_tracks = {}
-            for det in tracked:
-                bbox = det[0].tolist()
-                cls_id = det[3]
-                track_id = det[4]
-
-                if cls_id == class_id_map.get("player"):
-                    frame_tracks[track_id] = {"bbox": bbox}
+        # Detections are tracked as each batch comes back from the model
+        frame_num = start_frame
+        for batch in iter_batches(skip_frames(frames, start_frame), batch_size):
+            def track_run(begin, end):
+                detect = lambda indices: list(self.detect_frames([batch[begin + i] for i in indices],
+                                                                 batch_size=batch_size))
+                return self.track_batch(frame_num + begin, end - begin, detect)
+            tracks.extend(track_shots(shots, self, frame_num, len(batch), track_run, dict))
+            frame_num += len(batch)
 
-            tracks.append(frame_tracks)
+            if checkpoint:
+                checkpoint.update(tracks, self.get_tracking_state())
 
         # Save to stub
         if stub_path:
             save_stub(stub_path, tracks)
+        if checkpoint:
+            checkpoint.clear()
 
         return tracks
@@ -1,3 +1,17 @@
-from .video_utils import read_video, save_video
+from .video_utils import (
+    read_video,
+    save_video,
+    stream_video,
+    iter_batches,
+    skip_frames,
+    get_video_properties,
+    VideoFrames,
+    PrefetchVideoReader,
+)
+from .video_writer import VideoWriter
+from .frame_cache import FrameCache, open_frames
+from .stage_cache import StageCache
+from .checkpoint import StageCheckpoint
+from .track_store import TrackStore
 from .stubs_utils import save_stub, read_stub
 from .bbox_utils import get_center_bbox, get_width_bbox, measure_distance
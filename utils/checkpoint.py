@@ -0,0 +1,90 @@
+"""
+checkpoint.py
+
+Append-only checkpoints for long-running stages.
+
+Every `every` frames a stage appends the outputs produced since the last
+checkpoint together with its serialized temporal state (e.g. the ByteTrack
+tracker). A restarted run loads the log, restores the state and resumes from
+the first unprocessed frame, so it produces the same output (including track
+IDs) as an uninterrupted run. A record cut short by a crash is dropped.
+"""
+
+import os
+import pickle
+from typing import Any, List, Optional, Tuple
+
+
+class StageCheckpoint:
+    """
+    Append-only checkpoint log of one stage.
+    """
+
+    def __init__(self, path: str, every: int = 500):
+        self.path = path
+        self.every = every
+        self.saved_frames = 0
+
+    def load(self) -> Tuple[List[Any], Optional[Any], int]:
+        """
+        Replays the log and returns (outputs, last state, next frame to process).
+        """
+        outputs = []
+        state = None
+        if not os.path.exists(self.path):
+            return outputs, state, 0
+
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    chunk, state_blob = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception:
+                    # Torn write from a crash: keep everything before it
+                    break
+                outputs.extend(chunk)
+                state = state_blob
+                valid_size = f.tell()
+
+        if valid_size != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+
+        self.saved_frames = len(outputs)
+        return outputs, pickle.loads(state) if state is not None else None, self.saved_frames
+
+    def append(self, outputs: List[Any], state: Any = None) -> None:
+        """
+        Appends the outputs produced since the last checkpoint and the current state.
+        """
+        chunk = outputs[self.saved_frames:]
+        if not chunk:
+            return
+
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+
+        state_blob = pickle.dumps(state) if state is not None else None
+        with open(self.path, 'ab') as f:
+            pickle.dump((chunk, state_blob), f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.saved_frames = len(outputs)
+
+    def update(self, outputs: List[Any], state: Any = None) -> None:
+        """
+        Appends a checkpoint if at least `every` frames were produced since the last one.
+        """
+        if len(outputs) - self.saved_frames >= self.every:
+            self.append(outputs, state)
+
+    def clear(self) -> None:
+        """
+        Removes the log once the stage output has been saved.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.saved_frames = 0
@@ -0,0 +1,199 @@
+"""
+columnar_stubs.py
+
+Compact columnar on-disk format for stage outputs.
+
+Per-frame structures (`List[Dict[int, ...]]`) are flattened into NumPy
+structured arrays with one row per (frame, track) plus a `frame_offsets`
+array, so frame `i` owns rows `frame_offsets[i]:frame_offsets[i + 1]`:
+- tracks:      frame, track_id, x1, y1, x2, y2, conf
+- assignments: frame, track_id, team
+Court keypoints are stored as one dense (frames x keypoints x dims) array.
+
+A stub in this format is a directory ending in `.cols` containing `.npy`
+files, which load memory-mapped in milliseconds. The directory is written
+under a temporary name and renamed into place, so an interrupted save never
+leaves a partial stub behind.
+"""
+
+import os
+import shutil
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+COLUMNAR_SUFFIX = ".cols"
+
+TRACK_DTYPE = np.dtype([
+    ("frame", "<i4"),
+    ("track_id", "<i4"),
+    ("x1", "<f4"),
+    ("y1", "<f4"),
+    ("x2", "<f4"),
+    ("y2", "<f4"),
+    ("conf", "<f4"),
+])
+
+ASSIGNMENT_DTYPE = np.dtype([
+    ("frame", "<i4"),
+    ("track_id", "<i4"),
+    ("team", "<i1"),
+])
+
+RECORDS_FILE = "records.npy"
+OFFSETS_FILE = "frame_offsets.npy"
+KEYPOINTS_FILE = "keypoints.npy"
+
+
+def is_columnar_path(stub_path: str) -> bool:
+    return stub_path.endswith(COLUMNAR_SUFFIX)
+
+
+def _frame_offsets(num_rows_per_frame: List[int]) -> np.ndarray:
+    offsets = np.zeros(len(num_rows_per_frame) + 1, dtype=np.int64)
+    np.cumsum(num_rows_per_frame, out=offsets[1:])
+    return offsets
+
+
+def tracks_to_records(tracks: List[Dict[int, Dict[str, Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flattens per-frame tracks into (records, frame_offsets).
+    """
+    counts = [len(frame_tracks) for frame_tracks in tracks]
+    records = np.empty(sum(counts), dtype=TRACK_DTYPE)
+    if len(records) == 0:
+        return records, _frame_offsets(counts)
+
+    records["frame"] = np.repeat(np.arange(len(counts)), counts)
+    records["track_id"] = [track_id for frame_tracks in tracks for track_id in frame_tracks]
+    rows = [track for frame_tracks in tracks for track in frame_tracks.values()]
+    bboxes = np.array([track["bbox"] for track in rows], dtype=np.float32).reshape(-1, 4)
+    records["x1"], records["y1"], records["x2"], records["y2"] = bboxes.T
+    records["conf"] = [track.get("conf", np.nan) for track in rows]
+
+    return records, _frame_offsets(counts)
+
+
+def records_to_tracks(records: np.ndarray, frame_offsets: np.ndarray) -> List[Dict[int, Dict[str, Any]]]:
+    """
+    Rebuilds per-frame tracks from (records, frame_offsets).
+    """
+    track_ids = records["track_id"].tolist()
+    bboxes = np.stack([records["x1"], records["y1"], records["x2"], records["y2"]], axis=1).tolist()
+    has_conf = ~np.isnan(records["conf"])
+    bounds = zip(frame_offsets[:-1].tolist(), frame_offsets[1:].tolist())
+
+    if not has_conf.any():
+        return [
+            {track_id: {"bbox": bbox} for track_id, bbox in zip(track_ids[start:stop], bboxes[start:stop])}
+            for start, stop in bounds
+        ]
+
+    tracks_rows = [{"bbox": bbox} for bbox in bboxes]
+    for row, conf in zip(np.flatnonzero(has_conf).tolist(), records["conf"][has_conf].tolist()):
+        tracks_rows[row]["conf"] = conf
+    return [dict(zip(track_ids[start:stop], tracks_rows[start:stop])) for start, stop in bounds]
+
+
+def assignments_to_records(player_assignment: List[Dict[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flattens per-frame team assignments into (records, frame_offsets).
+    """
+    records = np.empty(sum(len(frame_teams) for frame_teams in player_assignment), dtype=ASSIGNMENT_DTYPE)
+
+    row = 0
+    for frame_num, frame_teams in enumerate(player_assignment):
+        for track_id, team in frame_teams.items():
+            records[row] = (frame_num, track_id, team)
+            row += 1
+
+    return records, _frame_offsets([len(frame_teams) for frame_teams in player_assignment])
+
+
+def records_to_assignments(records: np.ndarray, frame_offsets: np.ndarray) -> List[Dict[int, int]]:
+    """
+    Rebuilds per-frame team assignments from (records, frame_offsets).
+    """
+    track_ids = records["track_id"].tolist()
+    teams = records["team"].tolist()
+    return [
+        dict(zip(track_ids[start:stop], teams[start:stop]))
+        for start, stop in zip(frame_offsets[:-1].tolist(), frame_offsets[1:].tolist())
+    ]
+
+
+def _infer_kind(obj: Any) -> str:
+    for item in obj:
+        if isinstance(item, dict):
+            for value in item.values():
+                return "tracks" if isinstance(value, dict) else "assignments"
+        else:
+            return "keypoints"
+    return "tracks"
+
+
+def _write_columnar(dir_path: str, obj: Any) -> None:
+    kind = _infer_kind(obj)
+
+    if kind == "keypoints":
+        np.save(os.path.join(dir_path, KEYPOINTS_FILE), np.asarray(obj, dtype=np.float32))
+        return
+
+    if kind == "tracks":
+        records, frame_offsets = tracks_to_records(obj)
+    else:
+        records, frame_offsets = assignments_to_records(obj)
+    np.save(os.path.join(dir_path, RECORDS_FILE), records)
+    np.save(os.path.join(dir_path, OFFSETS_FILE), frame_offsets)
+
+
+def save_columnar(stub_path: str, obj: Any) -> None:
+    """
+    Saves tracks, team assignments or court keypoints in columnar form.
+    The arrays are written to a temporary directory that then replaces
+    `stub_path`, so the stub is either complete or absent.
+    """
+    stub_path = stub_path.rstrip(os.sep)
+    tmp_path = stub_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    _write_columnar(tmp_path, obj)
+
+    if not os.path.exists(stub_path):
+        os.replace(tmp_path, stub_path)
+        return
+    # A directory can only be renamed over an empty one: move the old stub aside first
+    old_path = stub_path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    os.replace(stub_path, old_path)
+    os.replace(tmp_path, stub_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def load_columnar_arrays(stub_path: str, mmap: bool = True) -> Tuple[np.ndarray, ...]:
+    """
+    Loads the raw arrays of a columnar stub without converting them:
+    `(keypoints,)` for keypoints, `(records, frame_offsets)` otherwise.
+    """
+    mmap_mode = "r" if mmap else None
+    keypoints_path = os.path.join(stub_path, KEYPOINTS_FILE)
+    if os.path.exists(keypoints_path):
+        return (np.load(keypoints_path, mmap_mode=mmap_mode),)
+
+    records = np.load(os.path.join(stub_path, RECORDS_FILE), mmap_mode=mmap_mode)
+    frame_offsets = np.load(os.path.join(stub_path, OFFSETS_FILE), mmap_mode=mmap_mode)
+    return records, frame_offsets
+
+
+def load_columnar(stub_path: str, mmap: bool = True) -> Any:
+    """
+    Loads a columnar stub back into the structure the stages produce.
+    """
+    arrays = load_columnar_arrays(stub_path, mmap=mmap)
+    if len(arrays) == 1:
+        return arrays[0]
+
+    records, frame_offsets = arrays
+    if records.dtype == TRACK_DTYPE:
+        return records_to_tracks(records, frame_offsets)
+    return records_to_assignments(records, frame_offsets)
@@ -0,0 +1,115 @@
+"""
+frame_cache.py
+
+Decode-once cache of raw video frames stored as a memory-mapped uint8 array.
+
+The first time a video is seen its frames are decoded into a flat
+`frames.u8` file (frames x H x W x 3, BGR) next to a small `meta.json`.
+Later runs, re-renders and worker processes open that file with `np.memmap`,
+which skips decoding entirely and lets every process share the same page
+cache instead of holding private copies of the frames.
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from .video_utils import stream_video
+
+FRAMES_FILE = "frames.u8"
+META_FILE = "meta.json"
+
+
+def open_frames(entry_dir: str, mode: str = "r") -> np.memmap:
+    """
+    Opens a decoded frame file as a (frames, H, W, 3) memory-mapped array.
+
+    This is all a worker process needs: pass it the entry directory and it
+    maps the same file without copying the frames.
+    """
+    with open(os.path.join(entry_dir, META_FILE)) as f:
+        meta = json.load(f)
+
+    return np.memmap(
+        os.path.join(entry_dir, FRAMES_FILE),
+        dtype=np.uint8,
+        mode=mode,
+        shape=tuple(meta["shape"]),
+    )
+
+
+def frame_cache_dir(frames) -> Optional[str]:
+    """
+    Entry directory of frames opened from a FrameCache (or a slice of them),
+    which worker processes can map with `open_frames`; None for other frames.
+    """
+    filename = getattr(frames, "filename", None) if isinstance(frames, np.memmap) else None
+    if not filename or os.path.basename(filename) != FRAMES_FILE:
+        return None
+    return os.path.dirname(filename)
+
+
+class FrameCache:
+    """
+    Directory of decoded videos, one entry per (path, size, mtime) of the source file.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def entry_dir(self, video_path: str) -> str:
+        """
+        Returns the cache entry directory for a video, whether it exists or not.
+        """
+        stat = os.stat(video_path)
+        key = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(self.cache_dir, f"{name}-{digest}")
+
+    def is_cached(self, video_path: str) -> bool:
+        return os.path.exists(os.path.join(self.entry_dir(video_path), META_FILE))
+
+    def open(self, video_path: str, prefetch: int = 0) -> np.memmap:
+        """
+        Returns the frames of `video_path` as a read-only memory-mapped array,
+        decoding them into the cache first if needed.
+        """
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video not found: {video_path}")
+
+        entry_dir = self.entry_dir(video_path)
+        if not self.is_cached(video_path):
+            self._decode(video_path, entry_dir, prefetch)
+        return open_frames(entry_dir)
+
+    def _decode(self, video_path: str, entry_dir: str, prefetch: int) -> None:
+        """
+        Streams decoded frames to disk; meta.json is written last so a crashed
+        decode never looks like a complete entry.
+        """
+        os.makedirs(entry_dir, exist_ok=True)
+
+        shape: Optional[tuple] = None
+        num_frames = 0
+        with open(os.path.join(entry_dir, FRAMES_FILE), "wb") as f:
+            for frame in stream_video(video_path, prefetch=prefetch):
+                if shape is None:
+                    shape = frame.shape
+                f.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+                num_frames += 1
+
+        if shape is None:
+            raise ValueError(f"No frames could be decoded from {video_path}")
+
+        meta = {
+            "video_path": os.path.abspath(video_path),
+            "shape": [num_frames, *shape],
+        }
+        tmp_path = os.path.join(entry_dir, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(entry_dir, META_FILE))
@@ -0,0 +1,71 @@
+"""
+letterbox.py
+
+Letterbox geometry shared by the model preprocessing paths.
+
+Frames are resized to fit a square model input keeping their aspect ratio
+and padded with gray (114), as ultralytics does, so predictions can be mapped
+back to frame coordinates with the returned gain and padding.
+"""
+
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+LETTERBOX_VALUE = 114
+
+
+def letterbox_geometry(frame_shape: Tuple[int, ...], size: int) -> Tuple[float, Tuple[int, int], Tuple[int, int]]:
+    """
+    Returns (gain, resized (width, height), (pad_x, pad_y)) fitting a frame
+    into a `size` x `size` square.
+    """
+    height, width = frame_shape[:2]
+    gain = min(size / height, size / width)
+    new_width, new_height = int(round(width * gain)), int(round(height * gain))
+    pad_x = int(round((size - new_width) / 2 - 0.1))
+    pad_y = int(round((size - new_height) / 2 - 0.1))
+    return gain, (new_width, new_height), (pad_x, pad_y)
+
+
+def letterbox_frames(frames: List[np.ndarray], size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Letterboxes same-sized BGR frames into one (B, size, size, 3) uint8 array.
+    Returns (batch, gain, (pad_x, pad_y)).
+    """
+    gain, (new_width, new_height), (pad_x, pad_y) = letterbox_geometry(frames[0].shape, size)
+    batch = np.full((len(frames), size, size, 3), LETTERBOX_VALUE, dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        batch[i, pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+            frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    return batch, gain, (pad_x, pad_y)
+
+
+def to_nchw_rgb(batch: np.ndarray) -> np.ndarray:
+    """
+    (B, H, W, 3) BGR -> contiguous (B, 3, H, W) RGB, keeping the dtype.
+    """
+    return np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2))
+
+
+def unletterbox_boxes(xyxy: np.ndarray, gain: float, pad: Tuple[int, int], frame_shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Maps (N, 4) boxes from letterbox to original frame coordinates.
+    """
+    boxes = (xyxy - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=xyxy.dtype)) / gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_shape[0])
+    return boxes
+
+
+def unletterbox_points(points: np.ndarray, gain: float, pad: Tuple[int, int]) -> np.ndarray:
+    """
+    Maps (..., 2+) points from letterbox to original frame coordinates in
+    place (extra columns such as confidence are kept). Undetected points at
+    (0, 0) stay at (0, 0).
+    """
+    xy = points[..., :2]
+    detected = np.any(xy != 0, axis=-1)
+    xy[detected] = (xy[detected] - np.array(pad, dtype=points.dtype)) / gain
+    return points
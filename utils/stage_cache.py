@@ -0,0 +1,209 @@
+"""
+stage_cache.py
+
+Content-addressed cache for stage outputs (stubs).
+
+Each stage output is stored under a key hashed from everything that can
+change it: the input video content, the model weight file, the stage
+parameters and the source code of the stage (its package and the repository
+packages it imports from). Swapping a model or changing a threshold
+therefore produces a new key instead of silently returning stale
+tracks, and many games / model versions can be cached side by side. The
+cache is bounded in size and evicts least recently used entries.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_files(obj: Any) -> List[str]:
+    """
+    Source files the output of `obj` (a class, function or instance) can
+    depend on: every module of the packages defining it and its base
+    classes, and of the repository packages those modules import from
+    (e.g. trackers -> shot_detection, utils, model_backends), transitively.
+    Third-party and standard library packages are left out.
+    """
+    if not inspect.isclass(obj) and not inspect.isfunction(obj):
+        obj = type(obj)
+    classes = inspect.getmro(obj) if inspect.isclass(obj) else (obj,)
+    pending = [cls.__module__ for cls in classes if cls.__module__ != "builtins"]
+
+    root = None
+    seen = set()
+    files = set()
+    while pending:
+        package_name = pending.pop().split(".")[0]
+        if package_name in seen:
+            continue
+        seen.add(package_name)
+        package = sys.modules.get(package_name)
+        if package is None or not getattr(package, "__file__", None):
+            continue
+        if not hasattr(package, "__path__"):
+            # Top-level module: only the defining module itself is hashed
+            if not files:
+                files.add(os.path.abspath(package.__file__))
+            continue
+
+        package_dir = os.path.dirname(os.path.abspath(package.__file__))
+        if root is None:
+            root = os.path.dirname(package_dir)
+        elif os.path.dirname(package_dir) != root:
+            continue
+
+        for dir_path, _, names in os.walk(package_dir):
+            files.update(os.path.join(dir_path, name) for name in names if name.endswith(".py"))
+        for module_name, module in list(sys.modules.items()):
+            if module_name.split(".")[0] != package_name or module is None:
+                continue
+            for value in list(vars(module).values()):
+                if inspect.ismodule(value):
+                    pending.append(value.__name__)
+                elif isinstance(getattr(value, "__module__", None), str):
+                    pending.append(value.__module__)
+    return sorted(files)
+
+
+def code_version(obj: Any) -> str:
+    """
+    Hash of the source files `obj` depends on (see `code_files`), so editing
+    a stage or any helper module it uses invalidates its cached outputs.
+    """
+    files = code_files(obj)
+    root = os.path.commonpath(files) if files else ""
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.relpath(path, root).encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def _entry_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path)
+
+
+class StageCache:
+    """
+    Size-bounded, content-addressed stub directory.
+
+    `stub_path` returns a path usable with `read_stub` / `save_stub`; call
+    `evict` after saving to bring the cache back under `max_bytes`.
+    """
+
+    HASH_INDEX_FILE = "file_hashes.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 5 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._hash_index_path = os.path.join(cache_dir, self.HASH_INDEX_FILE)
+        self._hash_index = {}
+        if os.path.exists(self._hash_index_path):
+            with open(self._hash_index_path) as f:
+                self._hash_index = json.load(f)
+
+    def file_hash(self, path: str) -> str:
+        """
+        Content hash of a file, memoized by (path, size, mtime) so large
+        videos and weights are only hashed once.
+        """
+        stat = os.stat(path)
+        index_key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        if index_key not in self._hash_index:
+            self._hash_index[index_key] = hash_file(path)
+            tmp_path = self._hash_index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._hash_index, f)
+            os.replace(tmp_path, self._hash_index_path)
+        return self._hash_index[index_key]
+
+    def key(
+        self,
+        stage: str,
+        video_path: str,
+        model_path: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        code: Any = None,
+    ) -> str:
+        """
+        Cache key of one stage output.
+
+        `params` holds the stage parameters and may include the keys of
+        upstream stages the output depends on. `code` is the stage object or
+        class whose source file is hashed as the code version.
+        """
+        parts = {
+            "stage": stage,
+            "video": self.file_hash(video_path),
+            "model": self.file_hash(model_path) if model_path else None,
+            "params": params or {},
+            "code": code_version(code) if code is not None else None,
+        }
+        encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def stub_path(self, stage: str, key: str, extension: str = ".pkl") -> str:
+        """
+        Path of the stub for `key`. Existing entries are touched so they
+        count as recently used.
+        """
+        path = os.path.join(self.cache_dir, stage, key + extension)
+        if os.path.exists(path):
+            os.utime(path)
+        return path
+
+    def entries(self) -> List[str]:
+        """
+        All stored stage outputs, least recently used first.
+        """
+        paths = []
+        for stage in os.listdir(self.cache_dir):
+            stage_dir = os.path.join(self.cache_dir, stage)
+            if os.path.isdir(stage_dir):
+                paths.extend(os.path.join(stage_dir, name) for name in os.listdir(stage_dir))
+        return sorted(paths, key=os.path.getmtime)
+
+    def evict(self) -> List[str]:
+        """
+        Removes least recently used entries until the cache fits in `max_bytes`.
+        """
+        entries = self.entries()
+        sizes = {path: _entry_size(path) for path in entries}
+        total = sum(sizes.values())
+
+        removed = []
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            total -= sizes[path]
+            removed.append(path)
+        return removed
@@ -4,21 +4,29 @@ stubs_utils.py
 Utility functions for caching and loading intermediate results using pickle.
 
 Useful for avoiding recomputation during object tracking or preprocessing.
+Stub paths ending in `.cols` use the columnar format of columnar_stubs.py
+instead of pickle.
 """
 
 import os
 import pickle
 from typing import Any, Optional
 
+from .columnar_stubs import is_columnar_path, save_columnar, load_columnar
+
 
 def save_stub(stub_path: str, obj: Any) -> None:
     """
-    Save a Python object to a pickle file.
+    Save a Python object to a pickle file (or a columnar `.cols` stub).
     """
     dir_name = os.path.dirname(stub_path)
     if not os.path.exists(dir_name):
         os.makedirs(dir_name, exist_ok=True)
 
+    if is_columnar_path(stub_path):
+        save_columnar(stub_path, obj)
+        return
+
     with open(stub_path, 'wb') as f:
         pickle.dump(obj, f)
 
@@ -28,6 +36,8 @@ def read_stub(read_from_stub: bool, stub_path: Optional[str]) -> Optional[Any]:
     Load a pickled object from a file, if allowed and file exists.
     """
     if read_from_stub and stub_path and os.path.exists(stub_path):
+        if is_columnar_path(stub_path):
+            return load_columnar(stub_path)
         with open(stub_path, 'rb') as f:
             return pickle.load(f)
     return None
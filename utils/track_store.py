@@ -0,0 +1,176 @@
+"""
+track_store.py
+
+Array-backed store of per-frame tracks.
+
+All rows (one per track per frame) live in contiguous NumPy arrays, with a
+frame-offset index (frame `i` owns rows `frame_offsets[i]:frame_offsets[i + 1]`)
+and a track index (rows of each track, in frame order). This gives O(1)
+slicing by frame range or by track and vectorized access to every bbox.
+
+A `TrackStore` still behaves like the `List[Dict[int, Dict[str, list]]]`
+structure the stages produce (`len`, indexing, iteration), so modules that
+have not been converted keep working unchanged.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .columnar_stubs import TRACK_DTYPE, load_columnar_arrays
+
+
+class TrackStore:
+    """
+    Contiguous track rows with frame and track indexes.
+
+    `values` holds one row of numbers per (frame, track): a bbox for tracks,
+    an (x, y) position for tactical positions, a single number for distances.
+    `key` is the dict key the values are exposed under when the store is used
+    like a list of per-frame dicts ('bbox' for tracks, None for plain values).
+    """
+
+    def __init__(self,
+                 frame_offsets: np.ndarray,
+                 track_ids: np.ndarray,
+                 values: np.ndarray,
+                 key: Optional[str] = "bbox"):
+        self.frame_offsets = np.asarray(frame_offsets, dtype=np.int64)
+        self.track_ids = np.asarray(track_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 2:
+            values = values.reshape(len(self.track_ids), -1) if len(self.track_ids) else values.reshape(0, 1)
+        self.values = values
+        self.key = key
+
+        num_frames = len(self.frame_offsets) - 1
+        self.frames = np.repeat(np.arange(num_frames), np.diff(self.frame_offsets))
+
+        # Track index: rows sorted by track id, frame order kept within a track
+        self._track_rows = np.argsort(self.track_ids, kind="stable")
+        unique_ids, starts = np.unique(self.track_ids[self._track_rows], return_index=True)
+        self.unique_track_ids = unique_ids
+        self._track_offsets = np.append(starts, len(self.track_ids))
+        self._track_lookup = {track_id: i for i, track_id in enumerate(unique_ids.tolist())}
+
+    @classmethod
+    def from_records(cls, records: np.ndarray, frame_offsets: np.ndarray) -> "TrackStore":
+        """
+        Builds a store from columnar track records (see columnar_stubs.py).
+        """
+        bboxes = np.stack([records["x1"], records["y1"], records["x2"], records["y2"]], axis=1)
+        return cls(frame_offsets, records["track_id"], bboxes)
+
+    @classmethod
+    def from_tracks(cls, tracks: List[Dict[int, Dict[str, Any]]]) -> "TrackStore":
+        """
+        Builds a store from per-frame tracks (`{track_id: {'bbox': [...]}}`).
+        """
+        if isinstance(tracks, TrackStore):
+            return tracks
+        counts = [len(frame_tracks) for frame_tracks in tracks]
+        frame_offsets = np.zeros(len(tracks) + 1, dtype=np.int64)
+        np.cumsum(counts, out=frame_offsets[1:])
+
+        track_ids = [track_id for frame_tracks in tracks for track_id in frame_tracks]
+        bboxes = [track["bbox"] for frame_tracks in tracks for track in frame_tracks.values()]
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(len(track_ids), 4)
+        return cls(frame_offsets, track_ids, bboxes)
+
+    @classmethod
+    def from_frame_dicts(cls, per_frame: List[Dict[int, Any]]) -> "TrackStore":
+        """
+        Builds a store from per-frame `{track_id: value}` dicts, e.g. tactical
+        positions (`[x, y]`) or distances (a number).
+        """
+        counts = [len(frame_dict) for frame_dict in per_frame]
+        frame_offsets = np.zeros(len(per_frame) + 1, dtype=np.int64)
+        np.cumsum(counts, out=frame_offsets[1:])
+
+        track_ids = [track_id for frame_dict in per_frame for track_id in frame_dict]
+        values = [value for frame_dict in per_frame for value in frame_dict.values()]
+        return cls(frame_offsets, track_ids, values, key=None)
+
+    @classmethod
+    def load(cls, stub_path: str) -> "TrackStore":
+        """
+        Opens a columnar track stub (`.cols`) directly, without building dicts.
+        """
+        records, frame_offsets = load_columnar_arrays(stub_path)
+        if records.dtype != TRACK_DTYPE:
+            raise ValueError(f"{stub_path} does not contain tracks")
+        return cls.from_records(records, frame_offsets)
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        """
+        All bboxes as an (rows, 4) array.
+        """
+        return self.values
+
+    def frame_slice(self, frame: int) -> slice:
+        """
+        Row slice of one frame.
+        """
+        return slice(self.frame_offsets[frame], self.frame_offsets[frame + 1])
+
+    def frame_range(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (frames, track_ids, values) of all rows in frames [start, stop), as views.
+        """
+        rows = slice(self.frame_offsets[start], self.frame_offsets[stop])
+        return self.frames[rows], self.track_ids[rows], self.values[rows]
+
+    def frame_arrays(self, frame: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (track_ids, values) of one frame, as views.
+        """
+        rows = self.frame_slice(frame)
+        return self.track_ids[rows], self.values[rows]
+
+    def track(self, track_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (frames, values) of one track, in frame order.
+        """
+        index = self._track_lookup.get(int(track_id))
+        if index is None:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.values.shape[1]))
+        rows = self._track_rows[self._track_offsets[index]:self._track_offsets[index + 1]]
+        return self.frames[rows], self.values[rows]
+
+    def iter_tracks(self):
+        """
+        Yields (track_id, rows) for every track, rows being indices into the arrays.
+        """
+        for i, track_id in enumerate(self.unique_track_ids.tolist()):
+            yield track_id, self._track_rows[self._track_offsets[i]:self._track_offsets[i + 1]]
+
+    def _frame_dict(self, frame: int) -> Dict[int, Any]:
+        track_ids, values = self.frame_arrays(frame)
+        if self.key is not None:
+            return {track_id: {self.key: value} for track_id, value in zip(track_ids.tolist(), values.tolist())}
+        if values.shape[1] == 1:
+            return dict(zip(track_ids.tolist(), values[:, 0].tolist()))
+        return dict(zip(track_ids.tolist(), values.tolist()))
+
+    def __len__(self) -> int:
+        return len(self.frame_offsets) - 1
+
+    def __getitem__(self, frame):
+        if isinstance(frame, slice):
+            return [self._frame_dict(i) for i in range(*frame.indices(len(self)))]
+        if frame < 0:
+            frame += len(self)
+        if not 0 <= frame < len(self):
+            raise IndexError(frame)
+        return self._frame_dict(frame)
+
+    def __iter__(self):
+        for frame in range(len(self)):
+            yield self._frame_dict(frame)
+
+    def to_frame_dicts(self) -> List[Dict[int, Any]]:
+        """
+        Converts back to the per-frame dict structure.
+        """
+        return list(self)
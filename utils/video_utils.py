@@ -2,11 +2,25 @@
 video_utils.py
 
 Utility functions for reading and saving videos using OpenCV.
+
+Besides the eager `read_video`, this module provides a streaming mode:
+`stream_video` returns a lazily decoded, re-iterable frame sequence and
+`iter_batches` groups any frame iterable into bounded-size windows, so peak
+memory depends on the batch size instead of the video length.
+`PrefetchVideoReader` decodes on a background thread into a bounded queue so
+decoding overlaps with inference and rendering, and `save_video` encodes on a
+background thread through `VideoWriter` (see video_writer.py).
 """
 
 import cv2
+import itertools
 import os
-from typing import List
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .video_writer import VideoWriter
 
 
 def read_video(video_path: str) -> List:
@@ -29,23 +43,276 @@ def read_video(video_path: str) -> List:
     return frames
 
 
-def save_video(output_frames, output_path):
-    dir_name = os.path.dirname(output_path)
-    if not os.path.exists(dir_name):
-        os.mkdir(dir_name)
+def get_video_properties(video_path: str) -> Dict[str, Any]:
+    """
+    Reads fps, resolution and frame count from the video container.
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video not found: {video_path}")
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    properties = {
+        'fps': fps if fps and fps > 0 else 24.0,
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'num_frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+    cap.release()
+    return properties
+
+
+class PrefetchVideoReader:
+    """
+    Decodes a video on a worker thread into a bounded queue.
+
+    OpenCV releases the GIL while decoding, so the consumer (YOLO inference,
+    drawing) runs while the next frames are being decoded. The queue bound
+    keeps memory at `queue_size` frames.
+    """
+
+    _END = object()
+
+    def __init__(self, video_path: str, queue_size: int = 64, start: int = 0):
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video not found: {video_path}")
+
+        self.video_path = video_path
+        self.queue_size = queue_size
+        self.start = start
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+
+        # Metrics
+        self.frames_decoded = 0
+        self.decode_time = 0.0
+        self.consumer_wait_time = 0.0
+        self._queue_depth_sum = 0
+        self._queue_depth_samples = 0
+
+    def _decode_loop(self) -> None:
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            for _ in range(self.start):
+                if not cap.grab():
+                    break
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                self.decode_time += time.perf_counter() - start
+                if not ret:
+                    break
+                self.frames_decoded += 1
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(frame, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:  # surfaced to the consumer
+            self._error = e
+        finally:
+            cap.release()
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(self._END, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def __iter__(self) -> Iterator:
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                self._queue_depth_sum += self._queue.qsize()
+                self._queue_depth_samples += 1
+
+                start = time.perf_counter()
+                frame = self._queue.get()
+                self.consumer_wait_time += time.perf_counter() - start
+
+                if frame is self._END:
+                    break
+                yield frame
+        finally:
+            self.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        """
+        Stops the decode thread and drops any frames still queued.
+        """
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of decoded frames currently waiting in the queue.
+        """
+        return self._queue.qsize()
+
+    @property
+    def decode_fps(self) -> float:
+        """
+        Decode throughput of the worker thread, excluding time blocked on a full queue.
+        """
+        if self.decode_time == 0:
+            return 0.0
+        return self.frames_decoded / self.decode_time
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Snapshot of the reader metrics.
+
+        A mean queue depth close to zero together with a large consumer wait
+        time means decoding is the bottleneck; a queue that stays full means
+        the consumer is.
+        """
+        mean_depth = 0.0
+        if self._queue_depth_samples:
+            mean_depth = self._queue_depth_sum / self._queue_depth_samples
+        return {
+            'frames_decoded': self.frames_decoded,
+            'decode_fps': self.decode_fps,
+            'queue_depth': self.queue_depth,
+            'mean_queue_depth': mean_depth,
+            'queue_size': self.queue_size,
+            'consumer_wait_time': self.consumer_wait_time,
+        }
 
-    # Use 'mp4v' codec for MP4 format
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
 
+class VideoFrames:
+    """
+    Lazily decoded, re-iterable sequence of video frames.
+
+    Each iteration re-opens the video and decodes frames one at a time, so
+    several stages can consume the same video without keeping it in memory.
+    With `prefetch > 0`, each pass decodes on a background thread through a
+    `PrefetchVideoReader` of that queue size. `start` skips the first frames.
+
+    The length is the number of frames actually decoded: the container's
+    frame count is only an estimate for many formats, and stubs are
+    validated against `len(frames)`. It is recorded by the first complete
+    pass, or counted by `len()` (one grab-only pass) if that comes first.
+    """
+
+    def __init__(self, video_path: str, prefetch: int = 0, start: int = 0):
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video not found: {video_path}")
+
+        self.video_path = video_path
+        self.prefetch = prefetch
+        self.start = start
+        self.last_reader: Optional[PrefetchVideoReader] = None
+        self.num_frames: Optional[int] = None
+
+    def __len__(self) -> int:
+        if self.num_frames is None:
+            cap = cv2.VideoCapture(self.video_path)
+            count = 0
+            while cap.grab():
+                count += 1
+            cap.release()
+            self.num_frames = max(count - self.start, 0)
+        return self.num_frames
+
+    def __iter__(self) -> Iterator:
+        count = 0
+        if self.prefetch > 0:
+            self.last_reader = PrefetchVideoReader(self.video_path, queue_size=self.prefetch, start=self.start)
+            for frame in self.last_reader:
+                count += 1
+                yield frame
+            self.num_frames = count
+            return
+
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            # grab() skips frames without converting them
+            for _ in range(self.start):
+                if not cap.grab():
+                    self.num_frames = 0
+                    return
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                count += 1
+                yield frame
+            self.num_frames = count
+        finally:
+            cap.release()
+
+
+def stream_video(video_path: str, prefetch: int = 0) -> VideoFrames:
+    """
+    Returns a lazily decoded frame sequence for the given video file.
+
+    `prefetch` is the size of the background decode queue (0 decodes inline).
+    """
+    return VideoFrames(video_path, prefetch=prefetch)
+
+
+def skip_frames(frames: Iterable, start: int) -> Iterable:
+    """
+    Returns the frames from index `start` on, without materializing them.
+    """
+    if start == 0:
+        return frames
+    if isinstance(frames, VideoFrames):
+        return VideoFrames(frames.video_path, prefetch=frames.prefetch, start=frames.start + start)
+    if hasattr(frames, '__getitem__'):
+        # Lists and (memory-mapped) arrays
+        return frames[start:]
+    return itertools.islice(frames, start, None)
+
+
+def iter_batches(frames: Iterable, batch_size: int) -> Iterator[List]:
+    """
+    Groups frames from any iterable (list, generator, VideoFrames) into lists
+    of at most `batch_size` frames.
+    """
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def save_video(output_frames: Iterable,
+               output_path: str,
+               fps: float = 24.0,
+               backend: str = "opencv",
+               **encoder_options) -> None:
+    """
+    Writes frames to an MP4 file as they are produced.
+
+    `output_frames` may be a list or any iterable/generator of frames. Encoding
+    runs on a background thread, so it overlaps with producing the frames.
+    `backend` is 'opencv' or 'ffmpeg'; extra options (e.g. `preset`, `crf`,
+    `codec`) are passed to the encoder.
+    """
     # Ensure the output_path ends with .mp4
     if not output_path.endswith('.mp4'):
         output_path += '.mp4'
 
-    height, width = output_frames[0].shape[:2]
-    out = cv2.VideoWriter(output_path, fourcc, 24.0, (width, height))
-
-    for frame in output_frames:
-        out.write(frame)
-    out.release()
+    with VideoWriter(output_path, fps=fps, backend=backend, **encoder_options) as writer:
+        for frame in output_frames:
+            writer.write(frame)
 
     print(f"Video saved to {output_path}")
@@ -0,0 +1,187 @@
+"""
+video_writer.py
+
+Asynchronous video writer with pluggable encoder backends.
+
+Frames are handed to `VideoWriter.write` as they are drawn and encoded on a
+background thread, so encoding overlaps with drawing. Two backends are
+available:
+- `opencv`: cv2.VideoWriter with a fourcc codec (default 'mp4v')
+- `ffmpeg`: raw BGR frames piped to a local ffmpeg process (libx264 presets)
+"""
+
+import cv2
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from typing import Optional, Tuple
+
+
+class OpenCVEncoder:
+    """
+    Encodes frames with cv2.VideoWriter.
+    """
+
+    def __init__(self, output_path: str, fps: float, frame_size: Tuple[int, int], codec: str = "mp4v", **_):
+        self.output_path = output_path
+        fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.writer = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+        if not self.writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {output_path} (codec '{codec}')")
+
+    def write(self, frame) -> None:
+        self.writer.write(frame)
+
+    def close(self) -> None:
+        self.writer.release()
+
+
+# Presets for the ffmpeg backend, from fastest to smallest output
+FFMPEG_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+
+
+class FFmpegEncoder:
+    """
+    Pipes raw BGR frames to a local ffmpeg process.
+    """
+
+    def __init__(self,
+                 output_path: str,
+                 fps: float,
+                 frame_size: Tuple[int, int],
+                 codec: str = "libx264",
+                 preset: str = "veryfast",
+                 crf: int = 23,
+                 ffmpeg_bin: str = "ffmpeg",
+                 **_):
+        if preset not in FFMPEG_PRESETS:
+            raise ValueError(f"Unknown ffmpeg preset '{preset}', expected one of {FFMPEG_PRESETS}")
+        if shutil.which(ffmpeg_bin) is None:
+            raise RuntimeError(f"ffmpeg executable not found: {ffmpeg_bin}")
+
+        self.output_path = output_path
+        width, height = frame_size
+        command = [
+            ffmpeg_bin, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+            "-an",
+            "-c:v", codec, "-preset", preset, "-crf", str(crf),
+            "-pix_fmt", "yuv420p",
+            output_path,
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame) -> None:
+        self.process.stdin.write(frame.tobytes())
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode}")
+
+
+ENCODER_BACKENDS = {
+    "opencv": OpenCVEncoder,
+    "ffmpeg": FFmpegEncoder,
+}
+
+class VideoWriter:
+    """
+    Accepts frames incrementally and encodes them on a background thread.
+
+    The encoder is opened on the first frame, so the frame size defaults to
+    that of the drawn frames. The queue is bounded so a slow encoder applies
+    back-pressure instead of buffering the whole video.
+    """
+
+    _END = object()
+
+    def __init__(self,
+                 output_path: str,
+                 fps: float = 24.0,
+                 frame_size: Optional[Tuple[int, int]] = None,
+                 backend: str = "opencv",
+                 queue_size: int = 32,
+                 **encoder_options):
+        if backend not in ENCODER_BACKENDS:
+            raise ValueError(f"Unknown encoder backend '{backend}', expected one of {list(ENCODER_BACKENDS)}")
+
+        dir_name = os.path.dirname(output_path)
+        if dir_name and not os.path.exists(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.backend = backend
+        self.encoder_options = encoder_options
+        self.frames_written = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
+
+    def _encode_loop(self, first_frame) -> None:
+        encoder = None
+        frame = first_frame
+        try:
+            height, width = first_frame.shape[:2]
+            frame_size = self.frame_size or (width, height)
+            encoder = ENCODER_BACKENDS[self.backend](self.output_path, self.fps, frame_size, **self.encoder_options)
+
+            while frame is not self._END:
+                if (frame.shape[1], frame.shape[0]) != frame_size:
+                    frame = cv2.resize(frame, frame_size)
+                encoder.write(frame)
+                self.frames_written += 1
+                frame = self._queue.get()
+        except Exception as e:  # surfaced on the next write() or close()
+            self._error = e
+            # Keep draining so the producer never blocks on a dead writer
+            while frame is not self._END:
+                frame = self._queue.get()
+        finally:
+            if encoder is not None:
+                try:
+                    encoder.close()
+                except Exception as e:
+                    self._error = self._error or e
+
+    def write(self, frame) -> None:
+        """
+        Queues a frame for encoding.
+        """
+        if self._error is not None:
+            raise self._error
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._encode_loop, args=(frame,), daemon=True)
+            self._thread.start()
+        else:
+            self._queue.put(frame)
+
+    def close(self) -> None:
+        """
+        Flushes queued frames and finalizes the output file.
+        """
+        if self._thread is None:
+            raise ValueError("No frames to save.")
+
+        self._queue.put(self._END)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._thread is not None:
+            self._queue.put(self._END)
+            self._thread.join()